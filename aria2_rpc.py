@@ -0,0 +1,142 @@
+import os
+import itertools
+import subprocess
+import socket
+import secrets
+import threading
+import time
+import requests
+
+# =========================================================
+# KONFIGURASI ARIA2 RPC
+# =========================================================
+
+ARIA2_MAX_CONCURRENT = int(os.environ.get("ARIA2_MAX_CONCURRENT", "4"))
+ARIA2_CONNECTIONS = int(os.environ.get("ARIA2_CONNECTIONS", "16"))
+ARIA2_STARTUP_TIMEOUT = 10
+ARIA2_STATUS_KEYS = [
+    "gid", "status", "totalLength", "completedLength", "downloadSpeed",
+    "connections", "numPieces", "bitfield", "errorCode", "errorMessage",
+]
+
+class Aria2Error(Exception):
+    """Error dari aria2 (RPC gagal atau unduhan berstatus error/removed)."""
+
+# =========================================================
+# DAEMON ARIA2 DENGAN JSON-RPC
+# =========================================================
+
+class Aria2RPC:
+    """
+    Menjalankan satu daemon aria2c dengan RPC aktif (hanya localhost, dengan secret)
+    dan mengendalikannya lewat JSON-RPC: addUri, tellStatus, remove. Satu daemon
+    bisa menjalankan beberapa unduhan paralel sekaligus.
+    """
+
+    def __init__(self):
+        self.port = None
+        self.process = None
+        self._secret = secrets.token_hex(16)
+        self._session = requests.Session()
+        self._request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _free_port(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def start(self):
+        """Menjalankan daemon (sekali saja) dan menunggu RPC siap."""
+        with self._lock:
+            if self.process and self.process.poll() is None:
+                return
+            self.port = self._free_port()
+            command = [
+                'aria2c', '--enable-rpc', '--rpc-listen-all=false', f'--rpc-listen-port={self.port}',
+                f'--rpc-secret={self._secret}', f'--stop-with-process={os.getpid()}',
+                f'--max-concurrent-downloads={ARIA2_MAX_CONCURRENT}', '--continue', '--allow-overwrite=true',
+                '--auto-file-renaming=false', '--file-allocation=falloc', '--async-dns=false',
+                '--summary-interval=0', '--console-log-level=warn', '--log-level=warn',
+            ]
+            self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + ARIA2_STARTUP_TIMEOUT
+        while time.time() < deadline:
+            try:
+                version = self.call("aria2.getVersion")
+                print(f"✅ aria2c RPC siap (versi {version.get('version')}, port {self.port}).")
+                return
+            except (requests.exceptions.RequestException, Aria2Error):
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.2)
+        self.shutdown()
+        raise Aria2Error("Daemon aria2c gagal dijalankan atau RPC tidak merespons.")
+
+    def call(self, method, *params):
+        """Memanggil satu metode JSON-RPC aria2 dan mengembalikan field 'result'."""
+        payload = {
+            "jsonrpc": "2.0", "id": str(next(self._request_ids)), "method": method,
+            "params": [f"token:{self._secret}", *params],
+        }
+        response = self._session.post(f"http://127.0.0.1:{self.port}/jsonrpc", json=payload, timeout=10)
+        body = response.json()
+        if "error" in body:
+            raise Aria2Error(body["error"].get("message", str(body["error"])))
+        return body.get("result")
+
+    def add_uri(self, urls, directory, filename, headers=None):
+        """
+        Menambah unduhan; semua URL dianggap mirror dari file yang sama. headers (dict)
+        dikirim di setiap request unduhan ini saja (mis. cookie Gofile). Mengembalikan GID.
+        """
+        options = {
+            "dir": directory,
+            "out": filename,
+            "split": str(ARIA2_CONNECTIONS),
+            "max-connection-per-server": str(min(ARIA2_CONNECTIONS, 16)),
+            "min-split-size": "1M",
+        }
+        if headers:
+            options["header"] = [f"{name}: {value}" for name, value in headers.items()]
+        return self.call("aria2.addUri", list(urls), options)
+
+    def tell_status(self, gid):
+        return self.call("aria2.tellStatus", gid, ARIA2_STATUS_KEYS)
+
+    def remove(self, gid):
+        """Menghentikan unduhan dan membuang hasilnya dari daftar daemon (abaikan jika sudah selesai)."""
+        for method in ("aria2.forceRemove", "aria2.removeDownloadResult"):
+            try:
+                self.call(method, gid)
+            except (requests.exceptions.RequestException, Aria2Error):
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            if self.process and self.process.poll() is None:
+                try:
+                    self.call("aria2.shutdown")
+                    self.process.wait(timeout=5)
+                except Exception:
+                    self.process.kill()
+            self.process = None
+
+def count_completed_pieces(bitfield):
+    """Menghitung piece yang sudah selesai dari bitfield heksadesimal tellStatus."""
+    if not bitfield:
+        return 0
+    return bin(int(bitfield, 16)).count("1")
+
+_daemon = None
+_daemon_lock = threading.Lock()
+
+def get_aria2_daemon():
+    """Mengembalikan daemon aria2 bersama untuk proses ini (dijalankan saat pertama dipakai)."""
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = Aria2RPC()
+        _daemon.start()
+        return _daemon
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from utils import DownloaderBot
+from browser_pool import get_browser_pool
+from telemetry import get_telemetry
+
+# =========================================================
+# KONFIGURASI MODE BATCH
+# =========================================================
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "4"))
+# Batas job bersamaan per host agar satu rombongan link MediaFire tidak terkena rate limit
+BATCH_PER_HOST = int(os.environ.get("BATCH_PER_HOST", "2"))
+BATCH_BROWSERS = int(os.environ.get("BATCH_BROWSERS", "2"))
+BATCH_OUTPUT_DIR = os.environ.get("BATCH_OUTPUT_DIR", "batch_output")
+BATCH_MANIFEST = os.environ.get("BATCH_MANIFEST", "batch_manifest.json")
+# Host yang diselesaikan tanpa Chrome (tidak perlu menghangatkan pool browser)
+BROWSERLESS_HOSTS = ("mega.nz", "pixeldrain", "mediafire", "gofile")
+
+def read_batch_urls(source):
+    """Membaca daftar URL dari file (atau stdin jika source '-'); baris kosong dan '#' diabaikan."""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, "r") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+def host_key(url):
+    """Kunci batas per host: domain tanpa 'www.' dan subdomain (download123.mediafire.com -> mediafire.com)."""
+    host = urlparse(url).netloc.lower().split(":")[0]
+    parts = host.split(".")
+    return ".".join(parts[-2:]) if len(parts) > 2 else host
+
+class BatchRunner:
+    """
+    Menjalankan banyak DownloaderBot dalam satu proses: batas global BATCH_WORKERS,
+    batas per host BATCH_PER_HOST, satu direktori kerja per job, dan manifest JSON yang
+    diperbarui setiap kali job selesai. Session HTTP, pool Chrome, dan daemon aria2
+    adalah singleton proses sehingga hanya disiapkan sekali untuk seluruh batch.
+    """
+
+    def __init__(self, urls, output_dir=BATCH_OUTPUT_DIR, manifest_path=BATCH_MANIFEST,
+                 workers=BATCH_WORKERS, per_host=BATCH_PER_HOST):
+        self.urls = urls
+        self.output_dir = output_dir
+        self.manifest_path = manifest_path
+        self.workers = max(workers, 1)
+        self.per_host = max(per_host, 1)
+        self._lock = threading.Lock()
+        self._results = [{"url": url, "status": "pending"} for url in urls]
+
+    def _write_manifest(self):
+        with self._lock:
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"jobs": self._results, "updated_at": time.time()}, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _run_job(self, index, url):
+        job_dir = os.path.join(self.output_dir, f"job-{index:03d}")
+        result = {"url": url, "output_dir": job_dir}
+        started = time.time()
+        print(f"▶️ [{index}] Mulai: {url}")
+        try:
+            downloader = DownloaderBot(url, output_dir=job_dir)
+            with get_telemetry().phase("job", url=url, index=index) as span:
+                downloaded_filename = downloader.run()
+                if not downloaded_filename and not downloader.cache_hit:
+                    span.fail("download tidak menghasilkan file")
+            if downloader.cache_hit:
+                result.update(status="cached")
+            elif downloaded_filename:
+                file_info = downloader.file_info or {}
+                result.update(
+                    status="ok", filename=downloaded_filename,
+                    size=file_info.get("size") or os.path.getsize(downloaded_filename),
+                    md5=file_info.get("md5"), mime_type=file_info.get("mime_type"),
+                )
+            else:
+                result.update(status="failed", error="Unduhan tidak menghasilkan file.")
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        result["elapsed"] = round(time.time() - started, 2)
+        print(f"{'❌' if result['status'] == 'failed' else '✅'} [{index}] {result['status']}: {url} ({result['elapsed']} detik)")
+        with self._lock:
+            self._results[index] = result
+        self._write_manifest()
+        return result
+
+    def run(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._write_manifest()
+        if any(not any(host in url for host in BROWSERLESS_HOSTS) for url in self.urls):
+            # Chrome dinyalakan di background sekali untuk seluruh batch
+            pool = get_browser_pool()
+            pool.size = max(pool.size, min(BATCH_BROWSERS, self.workers))
+            pool.warm()
+
+        # Penjadwal: job hanya dikirim ke pool jika host-nya masih di bawah batas, sehingga
+        # slot worker tidak habis oleh job yang sekadar menunggu giliran host yang sama
+        pending = list(enumerate(self.urls))
+        running = {}
+        host_counts = {}
+        results = [None] * len(self.urls)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-job") as executor:
+            while pending or running:
+                for item in list(pending):
+                    if len(running) >= self.workers:
+                        break
+                    key = host_key(item[1])
+                    if host_counts.get(key, 0) < self.per_host:
+                        pending.remove(item)
+                        host_counts[key] = host_counts.get(key, 0) + 1
+                        running[executor.submit(self._run_job, *item)] = (item[0], key)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, key = running.pop(future)
+                    host_counts[key] -= 1
+                    results[index] = future.result()
+
+        succeeded = sum(1 for result in results if result["status"] != "failed")
+        print(f"📋 Batch selesai: {succeeded}/{len(results)} berhasil. Manifest: {self.manifest_path}")
+        return results
+
+def run_batch(source):
+    """Titik masuk mode batch (main.py --batch <file|->). Mengembalikan True jika semua job berhasil."""
+    urls = read_batch_urls(source)
+    if not urls:
+        print("❌ Daftar URL batch kosong.")
+        return False
+    results = BatchRunner(urls).run()
+    return all(result["status"] != "failed" for result in results)
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.standins import StandIns, LinkProfile
+from benchmarks.scenarios import RESULT_PREFIX
+
+# =========================================================
+# HARNESS BENCHMARK END-TO-END (OFFLINE)
+# =========================================================
+# Pemakaian (dari root repo):
+#   python -m benchmarks.run                          semua skenario, file 64 MB, tanpa batas bandwidth
+#   python -m benchmarks.run --size-mb 256 --bandwidth-mbps 4 --latency-ms 40 --max-connections 8
+#   python -m benchmarks.run --scenarios download-native-pixeldrain,drive-upload --repeat 3
+# Hasil setiap skenario ditambahkan ke BENCHMARK_RESULTS (per commit) dan dibandingkan
+# dengan hasil terakhir dari commit lain dengan ukuran file dan profil jaringan yang sama.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_RESULTS = os.environ.get("BENCHMARK_RESULTS", os.path.join(REPO_ROOT, "benchmarks", "results.jsonl"))
+BENCHMARK_TIMEOUT = 600
+
+# Skenario: env tambahan untuk proses benchmark, halaman yang dibuka DownloaderBot, dan binary yang dibutuhkan
+SCENARIOS = {
+    "download-native-pixeldrain": {"env": {"DOWNLOAD_ENGINE": "native"}, "page": "pixeldrain"},
+    "download-aria2c-pixeldrain": {"env": {"DOWNLOAD_ENGINE": "aria2c"}, "page": "pixeldrain", "requires": "aria2c"},
+    "download-native-mediafire": {"env": {"DOWNLOAD_ENGINE": "native"}, "page": "mediafire"},
+    "download-mega": {"env": {}, "page": "mega"},
+    "drive-upload": {"env": {}},
+    "drive-stream": {"env": {"DOWNLOAD_ENGINE": "native"}, "page": "pixeldrain"},
+    "notifier-burst": {"env": {}},
+}
+
+def git_revision():
+    """Commit saat ini (ditandai '+dirty' jika ada perubahan yang belum di-commit)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{commit}+dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _page_url(standins, page):
+    if page == "pixeldrain":
+        return standins.pixeldrain_url()
+    if page == "mediafire":
+        return standins.mediafire_url()
+    if page == "mega":
+        return standins.mega_url()
+    return None
+
+def _phase_seconds(telemetry_path):
+    """Durasi per fase dari event 'summary' telemetry.jsonl proses benchmark."""
+    phases = {}
+    if not os.path.exists(telemetry_path):
+        return phases
+    with open(telemetry_path, "r") as f:
+        for line in f:
+            event = json.loads(line)
+            if event.get("event") == "summary":
+                for name, stat in event["phases"].items():
+                    phases[name] = round(phases.get(name, 0) + stat["seconds"], 3)
+    return phases
+
+def run_scenario(standins, name, verbose=False):
+    """Menjalankan satu skenario di proses terpisah dan menggabungkan hasilnya dengan statistik server."""
+    spec = SCENARIOS[name]
+    page_url = _page_url(standins, spec.get("page"))
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("PAYLOAD_MODE", "DRIVE_STREAM", "MEDIAFIRE_PAGE_URL", "TELEMETRY_FILE")}
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+        "BOT_TOKEN": "bench-token",
+        "PAYLOAD_SENDER": "1000",
+        "OWNER_ID": "1000",
+        "DRIVE_REFRESH_TOKEN": "bench-refresh-token",
+        "TELEGRAM_API_BASE": standins.base_url,
+        "PIXELDRAIN_BASE_URL": standins.base_url,
+        "MEGA_API_URL": standins.base_url,
+        "TELEMETRY_RUN_ID": f"bench-{name}",
+        **spec["env"],
+    })
+    args = [sys.executable, "-m", "benchmarks.scenarios", name, standins.base_url,
+            str(standins.file_size), str(standins.seed)] + ([page_url] if page_url else [])
+
+    standins.reset_stats()
+    try:
+        process = subprocess.run(args, cwd=work_dir, env=env, capture_output=True, text=True, timeout=BENCHMARK_TIMEOUT)
+        result_lines = [line for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+        if verbose or process.returncode != 0 or not result_lines:
+            print(process.stdout[-4000:])
+            print(process.stderr[-4000:])
+        if not result_lines:
+            return {"scenario": name, "ok": False, "error": f"proses benchmark keluar dengan kode {process.returncode}"}
+        result = json.loads(result_lines[-1][len(RESULT_PREFIX):])
+        phases = _phase_seconds(os.path.join(work_dir, "telemetry.jsonl"))
+    except subprocess.TimeoutExpired:
+        return {"scenario": name, "ok": False, "error": f"timeout {BENCHMARK_TIMEOUT} detik"}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stats = standins.snapshot()
+    seconds = max(result["finished"] - result["started"], 1e-6)
+    verified = result.get("md5") == standins.file_md5() if "md5" in result else None
+    first_byte_at = stats["first_byte_at"]
+    return {
+        "scenario": name,
+        "ok": result["ok"] and verified is not False,
+        "verified": verified,
+        "seconds": round(seconds, 3),
+        "throughput_mb_s": round(result["bytes"] / seconds / 1024 / 1024, 2) if result["bytes"] else None,
+        "ttfb_ms": round((first_byte_at - result["started"]) * 1000, 1) if first_byte_at else None,
+        "peak_rss_mb": result["peak_rss_mb"],
+        "peak_rss_children_mb": result["peak_rss_children_mb"],
+        "requests": stats["requests"],
+        "telegram_calls": stats["telegram"],
+        "telegram_429": stats["telegram_429"],
+        "rejected_503": stats["rejected_503"],
+        "dropped": stats["dropped"],
+        "peak_connections": stats["peak_connections"],
+        "phases": phases,
+        **({"enqueue_seconds": result["enqueue_seconds"]} if "enqueue_seconds" in result else {}),
+    }
+
+def _median_run(runs):
+    finished = [run for run in runs if run.get("ok")] or runs
+    return sorted(finished, key=lambda run: run.get("seconds") or 0)[len(finished) // 2]
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def find_baseline(history, record):
+    """Hasil terakhir skenario yang sama dari commit lain, dengan ukuran file dan profil jaringan yang sama."""
+    for previous in reversed(history):
+        if previous["scenario"] == record["scenario"] and previous["commit"] != record["commit"] \
+                and previous["size"] == record["size"] and previous["profile"] == record["profile"] and previous.get("ok"):
+            return previous
+    return None
+
+def _delta(current, previous, lower_is_better=False):
+    if current is None or not previous:
+        return ""
+    change = (current - previous) / previous * 100
+    worse = change > 5 if lower_is_better else change < -5
+    return f" ({change:+.0f}%{' ⚠️' if worse else ''})"
+
+def print_report(records, history):
+    print(f"\n{'skenario':<28} {'status':<7} {'detik':>8} {'MB/s':>14} {'TTFB ms':>14} {'RSS MB':>14}")
+    for record in records:
+        baseline = find_baseline(history, record) or {}
+        status = "ok" if record.get("ok") else "GAGAL"
+        if not record.get("seconds"):
+            print(f"{record['scenario']:<28} {status:<7} {record.get('error', '')}")
+            continue
+        throughput = record.get("throughput_mb_s")
+        print(
+            f"{record['scenario']:<28} {status:<7} "
+            f"{record['seconds']:>8.2f} "
+            f"{(f'{throughput:.1f}' if throughput else '-') + _delta(throughput, baseline.get('throughput_mb_s')):>14} "
+            f"{(str(record['ttfb_ms']) if record['ttfb_ms'] is not None else '-') + _delta(record['ttfb_ms'], baseline.get('ttfb_ms'), True):>14} "
+            f"{str(record['peak_rss_mb']) + _delta(record['peak_rss_mb'], baseline.get('peak_rss_mb'), True):>14}"
+        )
+        if baseline:
+            print(f"{'':<28} dibanding {baseline['commit']}: {baseline['seconds']:.2f} detik")
+    print()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end offline dengan server pengganti lokal.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Daftar skenario dipisah koma.")
+    parser.add_argument("--size-mb", type=int, default=64, help="Ukuran file benchmark (MB).")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="Bandwidth per koneksi (MB/s, 0 = tanpa batas).")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latensi sebelum setiap respons (ms).")
+    parser.add_argument("--max-connections", type=int, default=0, help="Batas koneksi file bersamaan (0 = tanpa batas).")
+    parser.add_argument("--drop-rate", type=float, default=0, help="Peluang koneksi file diputus di tengah body.")
+    parser.add_argument("--repeat", type=int, default=1, help="Jumlah pengulangan per skenario (dicatat median).")
+    parser.add_argument("--results", default=BENCHMARK_RESULTS, help="File JSONL riwayat hasil.")
+    parser.add_argument("--no-save", action="store_true", help="Jangan tambahkan hasil ke riwayat.")
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan output proses benchmark.")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Skenario tidak dikenal: {', '.join(unknown)}")
+
+    profile = LinkProfile(bandwidth=int(args.bandwidth_mbps * 1024 * 1024), latency=args.latency_ms / 1000,
+                          max_connections=args.max_connections, drop_rate=args.drop_rate)
+    standins = StandIns(args.size_mb * 1024 * 1024, profile).start()
+    commit = git_revision()
+    history = load_results(args.results)
+    records = []
+    try:
+        for name in names:
+            required = SCENARIOS[name].get("requires")
+            if required and not shutil.which(required):
+                print(f"⏭️ {name}: dilewati ({required} tidak terpasang).")
+                continue
+            runs = []
+            for attempt in range(max(args.repeat, 1)):
+                print(f"▶️ {name} ({attempt + 1}/{max(args.repeat, 1)})...")
+                runs.append(run_scenario(standins, name, verbose=args.verbose))
+            record = dict(_median_run(runs), commit=commit, timestamp=round(time.time(), 3),
+                          size=standins.file_size, profile=profile.as_dict(), repeat=len(runs))
+            records.append(record)
+    finally:
+        standins.stop()
+
+    print_report(records, history)
+    if not args.no_save and records:
+        os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+        with open(args.results, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"📋 Hasil disimpan di {args.results} (commit {commit}).")
+    return all(record.get("ok") for record in records)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
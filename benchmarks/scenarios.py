@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import resource
+
+# =========================================================
+# WORKLOAD BENCHMARK (SATU SKENARIO PER PROSES)
+# =========================================================
+# Dijalankan oleh benchmarks/run.py sebagai proses terpisah dengan cwd sementara,
+# sehingga peak RSS, cache (.cache), dan telemetry.jsonl terpisah per skenario.
+# Env (BOT_TOKEN, TELEGRAM_API_BASE, PIXELDRAIN_BASE_URL, MEGA_API_URL, DOWNLOAD_ENGINE)
+# sudah diarahkan ke server pengganti oleh run.py sebelum modul repo di-import.
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+def _md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+def fake_drive_service(base_url):
+    """Service Drive v3 dari dokumen discovery bawaan dengan rootUrl diarahkan ke server pengganti."""
+    import googleapiclient
+    from googleapiclient.discovery import build_from_document
+    from httplib2 import Http
+    path = os.path.join(os.path.dirname(googleapiclient.__file__), "discovery_cache", "documents", "drive.v3.json")
+    with open(path, "r") as f:
+        document = json.load(f)
+    document["rootUrl"] = f"{base_url}/"
+    document["baseUrl"] = f"{base_url}/drive/v3/"
+    return build_from_document(document, http=Http())
+
+def run_download(page_url):
+    """DownloaderBot.run() penuh: resolusi, probe, engine download, dan notifikasi."""
+    from utils import DownloaderBot
+    bot = DownloaderBot(page_url, output_dir="out")
+    started = time.time()
+    filename = bot.run()
+    finished = time.time()
+    return {"started": started, "finished": finished, "ok": bool(filename),
+            "bytes": os.path.getsize(filename) if filename else 0,
+            "md5": _md5(filename) if filename else None}
+
+def run_drive_upload(base_url, file_size, seed):
+    """upload_file_to_drive() dari file lokal: MD5, sesi resumable, chunk adaptif, batch publik."""
+    from benchmarks.standins import write_bench_file
+    from upload import upload_file_to_drive
+    write_bench_file("bench.bin", file_size, seed)
+    service = fake_drive_service(base_url)
+    started = time.time()
+    ok = upload_file_to_drive(service, "bench.bin")
+    finished = time.time()
+    return {"started": started, "finished": finished, "ok": bool(ok), "bytes": file_size}
+
+def run_drive_stream(base_url, page_url):
+    """Mode pipeline (DRIVE_STREAM): segmen download langsung diteruskan ke sesi resumable Drive."""
+    from utils import DownloaderBot
+    from upload import DriveStreamTarget
+    bot = DownloaderBot(page_url, output_dir="out")
+    bot.stream_target = DriveStreamTarget(fake_drive_service(base_url), source_url=page_url)
+    started = time.time()
+    filename = bot.run()
+    ok = bool(filename) and bot.stream_target.completed and bot.stream_target.succeeded
+    finished = time.time()
+    return {"started": started, "finished": finished, "ok": ok, "bytes": (bot.file_info or {}).get("size") or 0}
+
+def run_notifier(edits):
+    """Semburan edit progres ke satu pesan: berapa request yang benar-benar terkirim dan berapa lama flush."""
+    from notifier import get_notifier
+    notifier = get_notifier(os.environ["BOT_TOKEN"])
+    chat_id = os.environ["PAYLOAD_SENDER"]
+    started = time.time()
+    handle = notifier.send(chat_id, "benchmark")
+    for index in range(edits):
+        notifier.edit(chat_id, handle, f"progres {index}")
+        time.sleep(0.002)
+    enqueued = time.time()
+    notifier.flush(timeout=60)
+    finished = time.time()
+    return {"started": started, "finished": finished, "ok": handle.message_id is not None, "bytes": 0,
+            "enqueue_seconds": round(enqueued - started, 4)}
+
+def main():
+    scenario, base_url, file_size, seed = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+    page_url = sys.argv[5] if len(sys.argv) > 5 else None
+    if scenario.startswith("download-"):
+        result = run_download(page_url)
+    elif scenario == "drive-upload":
+        result = run_drive_upload(base_url, file_size, seed)
+    elif scenario == "drive-stream":
+        result = run_drive_stream(base_url, page_url)
+    elif scenario == "notifier-burst":
+        result = run_notifier(int(os.environ.get("BENCH_NOTIFIER_EDITS", "200")))
+    else:
+        raise SystemExit(f"Skenario tidak dikenal: {scenario}")
+    mega_client = sys.modules.get("mega_client")
+    if mega_client and mega_client._decrypt_pool is not None:
+        # Tunggu pool dekripsi berhenti agar RSS proses anaknya ikut tercatat di RUSAGE_CHILDREN
+        mega_client._decrypt_pool.shutdown(wait=True)
+    # ru_maxrss dalam KiB di Linux; anak proses (mis. pool dekripsi MEGA, aria2c) dihitung terpisah
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result["peak_rss_children_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+if __name__ == "__main__":
+    main()
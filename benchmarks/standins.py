@@ -0,0 +1,461 @@
+import re
+import json
+import time
+import email
+import base64
+import random
+import struct
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from Crypto.Cipher import AES
+
+# =========================================================
+# SERVER PENGGANTI LOKAL UNTUK BENCHMARK
+# =========================================================
+# Satu ThreadingHTTPServer di 127.0.0.1 yang meniru semua host yang dipakai pipeline:
+#   /files/<nama>                      file besar dengan dukungan Range
+#   /api/file/<id>[/info]              API Pixeldrain (PIXELDRAIN_BASE_URL)
+#   /mediafire/file/<key>/<nama>/file  halaman MediaFire dengan #downloadButton
+#   /cs, /mega-dl/<h>/<awal>-<akhir>   API dan server data MEGA (MEGA_API_URL)
+#   /drive/v3/..., /upload/..., /batch/drive/v3   Google Drive (resumable upload, izin, batch)
+#   /bot<token>/<metode>               Telegram Bot API (TELEGRAM_API_BASE)
+# Isi file deterministik (pola acak dari seed yang diulang) sehingga proses benchmark
+# bisa membuat salinan lokal yang identik tanpa mengirim file lewat jaringan.
+
+PATTERN_SIZE = 1024 * 1024
+WRITE_BLOCK = 64 * 1024
+BENCH_FILE_NAME = "bench.bin"
+BENCH_MEGA_HANDLE = "benchfile"
+
+def pattern_bytes(seed, offset, length):
+    """Byte [offset, offset+length) dari file benchmark: pola PATTERN_SIZE byte yang diulang."""
+    pattern = _pattern(seed)
+    out = bytearray()
+    while length > 0:
+        start = offset % PATTERN_SIZE
+        piece = pattern[start:start + length]
+        out += piece
+        offset += len(piece)
+        length -= len(piece)
+    return bytes(out)
+
+_patterns = {}
+
+def _pattern(seed):
+    if seed not in _patterns:
+        _patterns[seed] = random.Random(seed).randbytes(PATTERN_SIZE)
+    return _patterns[seed]
+
+def write_bench_file(path, size, seed=1):
+    """Menulis salinan lokal file benchmark (untuk skenario upload)."""
+    with open(path, "wb") as f:
+        for offset in range(0, size, PATTERN_SIZE):
+            f.write(pattern_bytes(seed, offset, min(PATTERN_SIZE, size - offset)))
+
+class LinkProfile:
+    """
+    Kondisi jaringan yang ditiru: bandwidth per koneksi (byte/detik, 0 = tanpa batas),
+    latensi sebelum respons (detik), batas koneksi file bersamaan (lebih dari itu dibalas
+    503), peluang koneksi diputus di tengah body, dan jeda minimum antar pesan Telegram
+    per chat (lebih cepat dari itu dibalas 429).
+    """
+
+    def __init__(self, bandwidth=0, latency=0.0, max_connections=0, drop_rate=0.0, telegram_interval=1.0):
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.max_connections = max_connections
+        self.drop_rate = drop_rate
+        self.telegram_interval = telegram_interval
+
+    def as_dict(self):
+        return dict(vars(self))
+
+class StandIns:
+    """Semua host pengganti dalam satu server; statistik per skenario direset dengan reset_stats()."""
+
+    def __init__(self, file_size, profile=None, seed=1):
+        self.file_size = file_size
+        self.profile = profile or LinkProfile()
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._drive_sessions = {}
+        self._drive_counter = 0
+        self._telegram_last = {}
+        self._telegram_counter = 0
+        self._init_mega()
+        self.reset_stats()
+        handler = type("StandInHandler", (_Handler,), {"standins": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="standins", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": {}, "first_byte_at": None, "bytes_sent": 0, "bytes_received": 0,
+                          "rejected_503": 0, "dropped": 0, "telegram": {}, "telegram_429": 0, "peak_connections": 0}
+            self._active = 0
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    def count(self, route):
+        with self._lock:
+            self.stats["requests"][route] = self.stats["requests"].get(route, 0) + 1
+
+    def file_md5(self):
+        if not hasattr(self, "_md5"):
+            md5 = hashlib.md5()
+            for offset in range(0, self.file_size, PATTERN_SIZE):
+                md5.update(pattern_bytes(self.seed, offset, min(PATTERN_SIZE, self.file_size - offset)))
+            self._md5 = md5.hexdigest()
+        return self._md5
+
+    # --- URL halaman untuk DownloaderBot ---
+
+    def pixeldrain_url(self):
+        # Mengandung 'pixeldrain.com/u/<id>' sehingga jalur Pixeldrain DownloaderBot yang dipilih
+        return f"{self.base_url}/pixeldrain.com/u/bench"
+
+    def mediafire_url(self):
+        return f"{self.base_url}/mediafire/file/benchkey/{BENCH_FILE_NAME}/file"
+
+    def mega_url(self):
+        self.prepare_mega()
+        return f"https://mega.nz/file/{BENCH_MEGA_HANDLE}#{self._mega_link_key}"
+
+    # --- MEGA: kunci dan meta-MAC untuk isi file yang sama ---
+
+    def _init_mega(self):
+        rng = random.Random(self.seed + 1)
+        self._mega_key = rng.randbytes(16)
+        self._mega_nonce = rng.randbytes(8)
+        self._mega_link_key = None
+
+    def prepare_mega(self):
+        """Menghitung meta-MAC isi file (sekali) dan link MEGA yang sesuai."""
+        if self._mega_link_key:
+            return
+        from mega_client import chunk_boundaries, condense_macs
+        macs = []
+        for start, end in chunk_boundaries(self.file_size):
+            block = pattern_bytes(self.seed, start, end - start)
+            block += b"\0" * (-len(block) % 16)
+            macs.append(AES.new(self._mega_key, AES.MODE_CBC, iv=self._mega_nonce * 2).encrypt(block)[-16:])
+        meta_mac = condense_macs(self._mega_key, macs)
+        words = struct.unpack(">4I", self._mega_key) + struct.unpack(">2I", self._mega_nonce) + struct.unpack(">2I", meta_mac)
+        link_key = struct.pack(">8I", *(words[i] ^ words[i + 4] for i in range(4)), *words[4:])
+        self._mega_link_key = base64.urlsafe_b64encode(link_key).decode().rstrip("=")
+        attributes = b"MEGA" + json.dumps({"n": BENCH_FILE_NAME}).encode()
+        attributes += b"\0" * (-len(attributes) % 16)
+        encrypted = AES.new(self._mega_key, AES.MODE_CBC, iv=b"\0" * 16).encrypt(attributes)
+        self._mega_attributes = base64.urlsafe_b64encode(encrypted).decode().rstrip("=")
+
+    def mega_bytes(self, offset, length):
+        aligned = offset - offset % 16
+        plain = pattern_bytes(self.seed, aligned, length + offset - aligned)
+        cipher = AES.new(self._mega_key, AES.MODE_CTR, nonce=self._mega_nonce, initial_value=aligned // 16)
+        return cipher.encrypt(plain)[offset - aligned:]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standins = None
+
+    def log_message(self, *args):
+        pass
+
+    # --- utilitas ---
+
+    def _latency(self):
+        if self.standins.profile.latency:
+            time.sleep(self.standins.profile.latency)
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """Membaca body request dengan batas bandwidth yang sama seperti arah download."""
+        length = int(self.headers.get("Content-Length") or 0)
+        bandwidth = self.standins.profile.bandwidth
+        started = time.time()
+        chunks, received = [], 0
+        while received < length:
+            chunk = self.rfile.read(min(WRITE_BLOCK, length - received))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            received += len(chunk)
+            if bandwidth:
+                delay = received / bandwidth - (time.time() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        data = b"".join(chunks)
+        with self.standins._lock:
+            self.standins.stats["bytes_received"] += len(data)
+            if data and self.standins.stats["first_byte_at"] is None and self.path.startswith("/upload/"):
+                self.standins.stats["first_byte_at"] = time.time()
+        return data
+
+    def _serve_bytes(self, source, total, filename=None, byte_range=None):
+        """
+        Melayani file (header Range, atau byte_range dari path seperti server MEGA) dengan
+        bandwidth per koneksi, batas koneksi bersamaan, dan pemutusan acak.
+        """
+        standins = self.standins
+        profile = standins.profile
+        with standins._lock:
+            if profile.max_connections and standins._active >= profile.max_connections:
+                standins.stats["rejected_503"] += 1
+                reject = True
+            else:
+                standins._active += 1
+                standins.stats["peak_connections"] = max(standins.stats["peak_connections"], standins._active)
+                reject = False
+        if reject:
+            self._send_json({"error": "too many connections"}, status=503, headers={"Retry-After": "1"})
+            return
+        try:
+            start, end = 0, total - 1
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if byte_range:
+                start, end = byte_range[0], min(byte_range[1], total - 1)
+                self.send_response(200)
+            elif match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), total - 1) if match.group(2) else total - 1
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+            else:
+                self.send_response(200)
+            length = end - start + 1
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("ETag", f'"bench-{standins.seed}-{total}"')
+            if filename:
+                self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+            self.end_headers()
+
+            drop_at = length // 2 if profile.drop_rate and length > WRITE_BLOCK and random.random() < profile.drop_rate else None
+            started = time.time()
+            sent = 0
+            while sent < length:
+                block = source(start + sent, min(WRITE_BLOCK, length - sent))
+                with standins._lock:
+                    if standins.stats["first_byte_at"] is None:
+                        standins.stats["first_byte_at"] = time.time()
+                    standins.stats["bytes_sent"] += len(block)
+                self.wfile.write(block)
+                sent += len(block)
+                if drop_at is not None and sent >= drop_at:
+                    with standins._lock:
+                        standins.stats["dropped"] += 1
+                    self.close_connection = True
+                    return
+                if profile.bandwidth:
+                    delay = sent / profile.bandwidth - (time.time() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            with standins._lock:
+                standins._active -= 1
+
+    def _file_source(self, offset, length):
+        return pattern_bytes(self.standins.seed, offset, length)
+
+    # --- routing ---
+
+    def do_GET(self):
+        self._latency()
+        parsed = urlparse(self.path)
+        path = parsed.path
+        standins = self.standins
+
+        if path.startswith("/files/"):
+            standins.count("file")
+            return self._serve_bytes(self._file_source, standins.file_size)
+        match = re.match(r"^/api/file/([\w-]+)(/info)?$", path)
+        if match:
+            if match.group(2):
+                standins.count("pixeldrain_info")
+                return self._send_json({"id": match.group(1), "name": BENCH_FILE_NAME, "size": standins.file_size})
+            standins.count("file")
+            return self._serve_bytes(self._file_source, standins.file_size, filename=BENCH_FILE_NAME)
+        if path.startswith("/mediafire/"):
+            standins.count("mediafire_page")
+            body = (
+                "<html><body><div class=\"download_link\">"
+                f"<a class=\"input popsok\" aria-label=\"Download file\" href=\"{standins.base_url}/files/{BENCH_FILE_NAME}\" id=\"downloadButton\">"
+                "Download</a></div></body></html>"
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        match = re.match(r"^/mega-dl/[\w-]+/(\d+)-(\d+)$", path)
+        if match:
+            standins.count("mega_data")
+            # Server data MEGA memakai sufiks path '/awal-akhir', bukan header Range
+            return self._serve_bytes(standins.mega_bytes, standins.file_size,
+                                     byte_range=(int(match.group(1)), int(match.group(2))))
+        if path == "/drive/v3/files":
+            standins.count("drive_list")
+            return self._send_json({"files": []})
+        match = re.match(r"^/drive/v3/files/([\w-]+)$", path)
+        if match:
+            standins.count("drive_get")
+            return self._send_json(self._drive_links(match.group(1)))
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_PUT(self):
+        self._latency()
+        match = re.match(r"^/upload/session/(\d+)$", urlparse(self.path).path)
+        if not match:
+            return self._send_json({"error": "not found"}, status=404)
+        self.standins.count("drive_chunk")
+        return self._drive_chunk(int(match.group(1)))
+
+    def do_POST(self):
+        self._latency()
+        parsed = urlparse(self.path)
+        path = parsed.path
+        standins = self.standins
+
+        match = re.match(r"^/bot[^/]+/(\w+)$", path)
+        if match:
+            return self._telegram(match.group(1))
+        if path == "/cs":
+            standins.count("mega_api")
+            self._read_body()
+            standins.prepare_mega()
+            return self._send_json([{
+                "s": standins.file_size, "at": standins._mega_attributes,
+                "g": f"{standins.base_url}/mega-dl/{BENCH_MEGA_HANDLE}",
+            }])
+        if path.startswith("/upload/") and parse_qs(parsed.query).get("uploadType") == ["resumable"]:
+            standins.count("drive_session")
+            metadata = json.loads(self._read_body() or b"{}")
+            with standins._lock:
+                standins._drive_counter += 1
+                session_id = standins._drive_counter
+                standins._drive_sessions[session_id] = {"offset": 0, "md5": hashlib.md5(), "name": metadata.get("name")}
+            return self._send_json({}, headers={"Location": f"{standins.base_url}/upload/session/{session_id}"})
+        if path == "/drive/v3/files":
+            standins.count("drive_create_folder")
+            self._read_body()
+            return self._send_json({"id": "bench-folder"})
+        if re.match(r"^/drive/v3/files/[^/]+/permissions$", path):
+            standins.count("drive_permission")
+            self._read_body()
+            return self._send_json({"id": "anyone"})
+        if path == "/batch/drive/v3":
+            standins.count("drive_batch")
+            return self._drive_batch(self._read_body())
+        self._send_json({"error": "not found"}, status=404)
+
+    # --- Google Drive ---
+
+    def _drive_links(self, file_id):
+        return {"id": file_id, "webViewLink": f"{self.standins.base_url}/view/{file_id}",
+                "webContentLink": f"{self.standins.base_url}/download/{file_id}"}
+
+    def _drive_chunk(self, session_id):
+        session = self.standins._drive_sessions.get(session_id)
+        if session is None:
+            self._read_body()
+            return self._send_json({"error": "session expired"}, status=404)
+        content_range = self.headers.get("Content-Range", "")
+        data = self._read_body()
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range)
+        total_match = re.search(r"/(\d+)$", content_range)
+        total = int(total_match.group(1)) if total_match else None
+        if match and int(match.group(1)) == session["offset"]:
+            session["md5"].update(data)
+            session["offset"] += len(data)
+        if total is not None and session["offset"] >= total:
+            response = dict(self._drive_links(f"bench-file-{session_id}"), md5Checksum=session["md5"].hexdigest(),
+                            name=session["name"])
+            return self._send_json(response)
+        self.send_response(308)
+        if session["offset"]:
+            self.send_header("Range", f"bytes=0-{session['offset'] - 1}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _drive_batch(self, body):
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + body
+        )
+        boundary = "bench_batch_boundary"
+        parts = []
+        for part in message.get_payload():
+            inner = part.get_payload()
+            request_line = inner.split("\n", 1)[0]
+            file_match = re.search(r"/drive/v3/files/([\w-]+)", request_line)
+            file_id = file_match.group(1) if file_match else "unknown"
+            payload = {"id": "anyone"} if "/permissions" in request_line else self._drive_links(file_id)
+            content = json.dumps(payload)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(content)}\r\n\r\n{content}\r\n"
+            )
+        response = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    # --- Telegram Bot API ---
+
+    def _telegram(self, method):
+        standins = self.standins
+        body = self._read_body()
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        chat_id = str(payload.get("chat_id"))
+        now = time.time()
+        with standins._lock:
+            standins.stats["telegram"][method] = standins.stats["telegram"].get(method, 0) + 1
+            last = standins._telegram_last.get(chat_id)
+            limited = standins.profile.telegram_interval and last is not None \
+                and now - last < standins.profile.telegram_interval
+            if limited:
+                standins.stats["telegram_429"] += 1
+            else:
+                standins._telegram_last[chat_id] = now
+                standins._telegram_counter += 1
+                message_id = standins._telegram_counter
+        if limited:
+            return self._send_json({"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                    "parameters": {"retry_after": 1}}, status=429)
+        return self._send_json({"ok": True, "result": {"message_id": message_id, "chat": {"id": chat_id}}})
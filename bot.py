@@ -1,11 +1,14 @@
 import os
 import re
-import requests
-import threading
+import json
+import time
+import asyncio
+import aiohttp
 from pyrogram import Client, filters
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request 
+from aiohttp import web
 from pyrogram.enums import ParseMode
+from resolver_cache import normalize_page_url
 # Muat variabel dari file .env
 load_dotenv()
 
@@ -27,6 +30,20 @@ GITHUB_REPO_NAME = os.environ.get("GITHUB_REPO_NAME") or "sonto"
 GITHUB_EVENT_AUTH_INIT = "new_url_received" 
 GITHUB_EVENT_TOKEN_RECEIVED = "refresh_token_received" 
 SCOPE = "https://www.googleapis.com/auth/drive" # Scope OAuth
+GITHUB_DISPATCH_URL = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/dispatches"
+
+# Klien HTTP keluar (GitHub dispatch, penukaran token OAuth)
+HTTP_MAX_CONNECTIONS = int(os.environ.get("BOT_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_CONCURRENCY = int(os.environ.get("BOT_HTTP_CONCURRENCY", "10"))
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+# Server HTTP (OAuth callback, health check) di loop event yang sama dengan Pyrogram
+WEB_PORT = int(os.environ.get("PORT", "8000"))
+OAUTH_CALLBACK_TIMEOUT = 60
+# Backend eksekusi job: 'github' (repository_dispatch, default) atau 'local' (worker.py di mesin bot)
+EXECUTOR_BACKEND = os.environ.get("EXECUTOR_BACKEND", "github").lower()
+# Backend GitHub: URL yang sama dari pengirim yang sama dalam jendela ini tidak di-dispatch ulang
+# (detik, 0 = nonaktif). Status run tidak diketahui bot, jadi jendela panjang akan memblokir retry.
+DISPATCH_DEDUP_WINDOW = int(os.environ.get("DISPATCH_DEDUP_WINDOW", "0"))
 
 # Inisialisasi bot Pyrogram
 pyrogram_app = Client(
@@ -36,67 +53,145 @@ pyrogram_app = Client(
     bot_token=BOT_TOKEN
 )
 
-# Inisialisasi aplikasi Flask
-flask_app = Flask(__name__)
+# Inisialisasi aplikasi web (aiohttp, tanpa thread terpisah)
+web_app = web.Application()
 
-# --- Fungsi Bantu: Menjalankan Flask ---
-def run_flask():
-    flask_app.run(host="0.0.0.0", port=8000)
+# --- KLIEN HTTP ASYNC BERSAMA ---
+_http_session = None
+_http_semaphore = None
 
-# --- FUNGSI BANTUAN UNTUK MENGIRIM KE GITHUB ACTIONS (Hanya untuk URL Normal) ---
-async def send_to_github_actions(message, url_or_command_text, extra_payload=None):
+def get_http_session():
     """
-    Mengirim event 'repository_dispatch' ke GitHub Actions (Khusus untuk URL download).
+    Sesi aiohttp bersama (koneksi keep-alive) untuk loop event bot. Semua pemakai
+    berjalan di loop yang sama, jadi cukup dibuat malas saat pertama dipakai.
     """
-    
+    global _http_session, _http_semaphore
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, ttl_dns_cache=300, keepalive_timeout=60)
+        _http_session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+        _http_semaphore = asyncio.Semaphore(HTTP_MAX_CONCURRENCY)
+    return _http_session
+
+async def close_http_session():
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+
+async def http_request(method, url, **kwargs):
+    """Request lewat sesi bersama (jumlah request bersamaan dibatasi). Hasil: (status, body teks)."""
+    session = get_http_session()
+    async with _http_semaphore:
+        async with session.request(method, url, **kwargs) as response:
+            return response.status, await response.text()
+
+async def dispatch_to_github(event_type, client_payload):
+    """Mengirim event 'repository_dispatch'. Hasil: (status, body teks); 204 berarti sukses."""
     headers = {
         "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"token {GITHUB_TOKEN}", 
+        "Authorization": f"token {GITHUB_TOKEN}",
     }
+    payload = {"event_type": event_type, "client_payload": client_payload}
+    return await http_request("POST", GITHUB_DISPATCH_URL, headers=headers, json=payload)
 
-    payload = {
-        "event_type": GITHUB_EVENT_AUTH_INIT, 
-        "client_payload": {
-            "url": url_or_command_text, 
-            "sender": str(message.from_user.id),
-            **(extra_payload or {}) 
-        }
+# --- FUNGSI BANTUAN UNTUK MENGIRIM KE GITHUB ACTIONS (Hanya untuk URL Normal) ---
+async def send_to_github_actions(message, url_or_command_text, extra_payload=None):
+    """
+    Mengirim event 'repository_dispatch' ke GitHub Actions (Khusus untuk URL download).
+    """
+    client_payload = {
+        "url": url_or_command_text,
+        "sender": str(message.from_user.id),
+        **(extra_payload or {})
     }
-    
-    
 
     try:
-        response = requests.post(
-            f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/dispatches",
-            headers=headers,
-            json=payload
-        )
+        status, body = await dispatch_to_github(GITHUB_EVENT_AUTH_INIT, client_payload)
 
-        if response.status_code == 204:
+        if status == 204:
             await message.reply_text("📥 Memicu alur download.")
-        else:
-            await message.reply_text(
-                f"❌ Gagal mengirim ke GitHub Actions. Status: {response.status_code}\nRespons: {response.text}"
-            )
+            return True
+        await message.reply_text(
+            f"❌ Gagal mengirim ke GitHub Actions. Status: {status}\nRespons: {body}"
+        )
     except Exception as e:
         await message.reply_text(f"Terjadi kesalahan: {e}")
+    return False
 
+# --- EXECUTOR LOKAL (EXECUTOR_BACKEND=local) ---
+local_executor = None
+JOB_STATUS_LABELS = {"queued": "⏳ antre", "running": "▶️ berjalan", "ok": "✅ selesai",
+                     "cached": "♻️ dari cache", "failed": "❌ gagal"}
 
-# --- ENDPOINT FLASK BARU: OAUTH CALLBACK (Tidak Berubah) ---
-@flask_app.route("/oauth_callback")
-def oauth_callback():
-    auth_code = request.args.get('code')
-    chat_id = request.args.get('state') 
+# Backend GitHub: (pengirim, URL dinormalkan) -> waktu dispatch terakhir
+recent_dispatches = {}
 
-    if not auth_code:
-        return "❌ Otorisasi Gagal: Tidak ada kode yang diterima. Cek log Google Cloud Console.", 400
+async def deliver_job_result(chat_id, job, result):
+    """Meneruskan hasil job ke pelanggan: dokumen Telegram (file_id) atau link Drive."""
+    delivery = result.get("delivery")
+    if result["status"] == "failed" or not delivery:
+        text = f"❌ Job #{job['id']} untuk `{job['url']}` gagal: {result.get('error') or 'hasil tidak tersedia'}"
+        await pyrogram_app.send_message(chat_id=chat_id, text=text)
+    elif "documents" in delivery:
+        for document in delivery["documents"]:
+            await pyrogram_app.send_cached_media(chat_id=chat_id, file_id=document["file_id"], caption=document.get("caption") or "")
+    else:
+        await pyrogram_app.send_message(
+            chat_id=chat_id,
+            text=(f"✅ **File sudah diunggah!**\nFile: `{delivery.get('name')}`\n"
+                  f"Link Drive: [Lihat File]({delivery['view_link']})\n"
+                  f"Link Download Langsung: `{delivery.get('content_link') or 'N/A'}`"),
+        )
 
-    if not all([CLIENT_ID, CLIENT_SECRET, REDIRECT_URI]):
-        return "❌ Konfigurasi Server Gagal: Kredensial OAuth server tidak lengkap.", 500
+async def notify_job_finished(job, result):
+    """
+    Balasan status akhir job ke pengirim (progres detail tetap dikirim oleh DownloaderBot/uploader),
+    lalu hasilnya diteruskan ke pengirim lain yang bergabung ke job ini.
+    """
+    if result["status"] == "failed":
+        text = f"❌ Job #{job['id']} gagal: {result.get('error') or 'tanpa keterangan'}"
+    else:
+        text = f"✅ Job #{job['id']} {JOB_STATUS_LABELS[result['status']]} ({result.get('elapsed', 0)} detik)."
+    await pyrogram_app.send_message(chat_id=int(job["sender"]), text=text)
+    for subscriber in local_executor.queue.subscribers(job["id"]):
+        try:
+            await deliver_job_result(int(subscriber), job, result)
+        except Exception as e:
+            print(f"Gagal meneruskan hasil job #{job['id']} ke {subscriber}: {e}")
+
+async def submit_job(message, url, extra_payload=None):
+    """Meneruskan URL ke backend yang aktif: antrean lokal atau GitHub Actions."""
+    if local_executor is None:
+        if DISPATCH_DEDUP_WINDOW <= 0:
+            await send_to_github_actions(message, url, extra_payload)
+            return
+        # Tanpa antrean bersama, hanya kiriman ulang dari pengirim yang sama yang bisa digabung
+        key = (message.from_user.id, normalize_page_url(url), (extra_payload or {}).get("mode"))
+        now = time.time()
+        for stale in [k for k, sent_at in recent_dispatches.items() if now - sent_at > DISPATCH_DEDUP_WINDOW]:
+            del recent_dispatches[stale]
+        if key in recent_dispatches:
+            await message.reply_text(f"⏳ Link ini baru saja dikirim. Coba lagi setelah {DISPATCH_DEDUP_WINDOW} detik jika belum ada hasil.")
+            return
+        recent_dispatches[key] = now
+        if not await send_to_github_actions(message, url, extra_payload):
+            recent_dispatches.pop(key, None)
+        return
+    try:
+        job_id, ahead, coalesced = local_executor.submit(url, message.from_user.id, (extra_payload or {}).get("mode"))
+        if coalesced:
+            await message.reply_text(f"🔗 Link yang sama sedang diproses (job #{job_id}). Hasilnya akan dikirim ke Anda juga.")
+        else:
+            await message.reply_text(f"📥 Job #{job_id} masuk antrean ({ahead} job di depan).")
+    except Exception as e:
+        await message.reply_text(f"Terjadi kesalahan: {e}")
 
+
+# --- ALUR OAUTH: PENUKARAN TOKEN DAN NOTIFIKASI (DI LOOP BOT) ---
+async def complete_oauth(auth_code, chat_id):
+    """Menukar kode OAuth, mengirim refresh token ke GitHub Actions, lalu memberi tahu pengguna. Hasil: (teks, status)."""
     # 1. Tukar Kode untuk Refresh Token
     try:
-        token_response = requests.post(
+        _, body = await http_request(
+            "POST",
             "https://oauth2.googleapis.com/token",
             data={
                 "code": auth_code,
@@ -105,10 +200,11 @@ def oauth_callback():
                 "redirect_uri": REDIRECT_URI,
                 "grant_type": "authorization_code"
             }
-        ).json()
+        )
+        token_response = json.loads(body)
 
         refresh_token = token_response.get("refresh_token")
-        
+
         if not refresh_token:
              error_desc = token_response.get("error_description", "Refresh Token tidak ditemukan.")
              return f"❌ Penukaran Gagal: {error_desc}. Pastikan otorisasi meminta 'access_type=offline'.", 500
@@ -116,47 +212,71 @@ def oauth_callback():
     except Exception as e:
         return f"❌ Kesalahan saat menukar token: {e}", 500
 
-    # 2. Kirim Refresh Token ke GitHub Actions (Repository Dispatch)
-    
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"token {GITHUB_TOKEN}", 
-    }
-    payload = {
-        "event_type": GITHUB_EVENT_TOKEN_RECEIVED, 
-        "client_payload": {
+    # 2a. Executor lokal: simpan di token store worker, tanpa GitHub
+    if local_executor is not None and chat_id:
+        local_executor.queue.set_refresh_token(chat_id, refresh_token)
+        await notify_chat(chat_id, "✅ **Token Otorisasi Berhasil!** Refresh Token Anda sudah disimpan di server bot.")
+        return "✅ Token Otorisasi Berhasil Diterima dan disimpan!", 200
+
+    # 2. Kirim Refresh Token ke GitHub Actions (Repository Dispatch) sambil
+    # 3. memberi tahu pengguna di Telegram; keduanya ditunggu bersamaan
+    dispatch_result, _ = await asyncio.gather(
+        dispatch_to_github(GITHUB_EVENT_TOKEN_RECEIVED, {
             "refresh_token": refresh_token,
-            "sender_chat_id": chat_id, 
-        }
-    }
-    
-    gh_response = requests.post(
-        f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/dispatches",
-        headers=headers,
-        json=payload
+            "sender_chat_id": chat_id,
+        }),
+        notify_chat(chat_id, "✅ **Token Otorisasi Berhasil!** Refresh Token Anda sudah diterima dan sedang disimpan di GitHub Secrets."),
+        return_exceptions=True,
     )
 
-    # 3. Beri tahu pengguna di Telegram
-    if gh_response.status_code == 204:
-        if chat_id:
-            try:
-                # Mengirim pesan notifikasi sukses ke chat ID pengguna
-                pyrogram_app.send_message(
-                    chat_id=int(chat_id),
-                    text="✅ **Token Otorisasi Berhasil!** Refresh Token Anda sudah diterima dan sedang disimpan di GitHub Secrets."
-                )
-            except Exception as e:
-                print(f"Gagal mengirim pesan notifikasi ke chat ID {chat_id}: {e}")
-        
-        return "✅ Token Otorisasi Berhasil Diterima dan sedang diproses di GitHub Actions!", 200
-    else:
-        return f"❌ Gagal mengirim token ke GitHub Actions: {gh_response.status_code}", 500
+    if isinstance(dispatch_result, Exception) or dispatch_result[0] != 204:
+        reason = dispatch_result if isinstance(dispatch_result, Exception) else f"status {dispatch_result[0]}"
+        await notify_chat(chat_id, f"❌ Refresh Token gagal diteruskan ke GitHub Actions ({reason}). Coba /auth lagi.")
+        return f"❌ Gagal mengirim token ke GitHub Actions: {reason}", 500
+    return "✅ Token Otorisasi Berhasil Diterima dan sedang diproses di GitHub Actions!", 200
+
+async def notify_chat(chat_id, text):
+    """Pesan notifikasi ke pengguna; kegagalan hanya dicatat agar tidak menggagalkan alur OAuth."""
+    if not chat_id:
+        return
+    try:
+        await pyrogram_app.send_message(chat_id=int(chat_id), text=text)
+    except Exception as e:
+        print(f"Gagal mengirim pesan notifikasi ke chat ID {chat_id}: {e}")
+
+
+# --- ENDPOINT WEB: OAUTH CALLBACK ---
+async def oauth_callback(request):
+    auth_code = request.query.get('code')
+    chat_id = request.query.get('state')
+
+    if not auth_code:
+        return web.Response(text="❌ Otorisasi Gagal: Tidak ada kode yang diterima. Cek log Google Cloud Console.", status=400)
+
+    if not all([CLIENT_ID, CLIENT_SECRET, REDIRECT_URI]):
+        return web.Response(text="❌ Konfigurasi Server Gagal: Kredensial OAuth server tidak lengkap.", status=500)
+
+    try:
+        text, status = await asyncio.wait_for(complete_oauth(auth_code, chat_id), OAUTH_CALLBACK_TIMEOUT)
+    except Exception as e:
+        text, status = f"❌ Kesalahan saat memproses otorisasi: {str(e) or type(e).__name__}", 500
+    return web.Response(text=text, status=status)
 
 
 # Endpoint untuk mengecek status server
-@flask_app.route("/")
-def home():
-    return jsonify({"status": " running!"})
+async def home(request):
+    return web.json_response({"status": " running!"})
+
+web_app.router.add_get("/oauth_callback", oauth_callback)
+web_app.router.add_get("/", home)
+
+async def start_web_server():
+    """Menjalankan server web di loop event bot. Hasil: runner untuk cleanup saat bot berhenti."""
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", WEB_PORT).start()
+    print(f"🌐 Server web aktif di port {WEB_PORT}.")
+    return runner
 
 # --------------------------------------------------------------------------------------
 # --- HANDLER UTAMA BARU: /auth (TANPA auth.sh) ---
@@ -199,6 +319,20 @@ async def handle_auth_command(client, message):
         await message.reply_text(f"❌ Gagal mengirim URL otorisasi: {e}")
 
 
+# --- HANDLER /status: JOB TERAKHIR PENGIRIM (EXECUTOR LOKAL) ---
+@pyrogram_app.on_message(filters.command("status") & filters.private & ~filters.me)
+async def handle_status_command(client, message):
+    if local_executor is None:
+        await message.reply_text("ℹ️ Status job hanya tersedia di executor lokal. Cek tab Actions di GitHub.")
+        return
+    jobs = local_executor.queue.recent(message.from_user.id)
+    if not jobs:
+        await message.reply_text("Belum ada job.")
+        return
+    lines = [f"#{job['id']} {JOB_STATUS_LABELS.get(job['status'], job['status'])} — `{job['url']}`" for job in jobs]
+    await message.reply_text("\n".join(lines))
+
+
 # --- HANDLER UNTUK PESAN BERISI URL ---
 @pyrogram_app.on_message(filters.text & filters.private & ~filters.me)
 async def handle_url(client, message):
@@ -208,14 +342,22 @@ async def handle_url(client, message):
     if "http" in text:
         url = text
         await message.reply_text(f"URL terdeteksi: `{url}`\n")
-        await send_to_github_actions(message, url)
+        await submit_job(message, url)
     else:
         pass 
 
 if __name__ == "__main__":
-    # Inisialisasi thread Flask
-    flask_thread = threading.Thread(target=run_flask)
-    flask_thread.start()
+    # Server web berjalan di loop yang sama dengan Pyrogram
+    web_runner = pyrogram_app.loop.run_until_complete(start_web_server())
+
+    if EXECUTOR_BACKEND == "local":
+        from worker import LocalExecutor
+        local_executor = LocalExecutor(on_update=notify_job_finished)
+        pyrogram_app.loop.run_until_complete(local_executor.start())
 
     # Jalankan Pyrogram bot
     pyrogram_app.run()
+    if local_executor is not None:
+        pyrogram_app.loop.run_until_complete(local_executor.stop())
+    pyrogram_app.loop.run_until_complete(web_runner.cleanup())
+    pyrogram_app.loop.run_until_complete(close_http_session())
@@ -0,0 +1,227 @@
+import os
+import queue
+import atexit
+import tempfile
+import threading
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from selenium_stealth import stealth
+
+# =========================================================
+# KONFIGURASI POOL BROWSER
+# =========================================================
+
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "1"))
+# Driver di-restart setelah N job untuk membatasi kebocoran memori Chrome
+BROWSER_MAX_JOBS = int(os.environ.get("BROWSER_MAX_JOBS", "20"))
+BROWSER_ACQUIRE_TIMEOUT = 120
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH")
+CHROMEDRIVER_CACHE_FILE = os.path.join(os.environ.get("SONTO_CACHE_DIR", ".cache"), "chromedriver_path")
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+def resolve_chromedriver_path():
+    """
+    Menentukan path chromedriver sekali per proses: CHROMEDRIVER_PATH, lalu cache di disk,
+    dan baru memanggil ChromeDriverManager (butuh jaringan) jika keduanya tidak ada.
+    """
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path and os.path.exists(_chromedriver_path):
+            return _chromedriver_path
+        candidates = [CHROMEDRIVER_PATH]
+        try:
+            with open(CHROMEDRIVER_CACHE_FILE, "r") as f:
+                candidates.append(f.read().strip())
+        except OSError:
+            pass
+        for path in candidates:
+            if path and os.path.exists(path):
+                _chromedriver_path = path
+                return path
+
+        _chromedriver_path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE_FILE), exist_ok=True)
+            with open(CHROMEDRIVER_CACHE_FILE, "w") as f:
+                f.write(_chromedriver_path)
+        except OSError as e:
+            print(f"Peringatan: gagal menyimpan cache path chromedriver: {e}")
+        return _chromedriver_path
+
+# =========================================================
+# POOL DRIVER CHROME HEADLESS
+# =========================================================
+
+class BrowserPool:
+    """
+    Menyimpan N driver Chrome headless (sudah dikonfigurasi selenium-stealth) yang
+    dipinjam resolver lewat acquire() dan dikembalikan lewat release(). Setiap
+    pengembalian membersihkan cookie, cache, storage, tab, dan log performa, lalu
+    direktori download diatur ulang per job saat dipinjam.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE):
+        self.size = max(size, 1)
+        self._idle = queue.Queue()
+        self._created = 0
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Direktori default; setiap job menimpanya lewat CDP Browser.setDownloadBehavior
+        self._default_download_dir = tempfile.mkdtemp(prefix="browser-pool-")
+
+    def _create_driver(self):
+        """Menginisialisasi Chrome headless + stealth + performance logging (CDP)."""
+        chrome_prefs = {
+            "download.default_directory": self._default_download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True,
+        }
+
+        options = webdriver.ChromeOptions()
+        options.add_experimental_option("prefs", chrome_prefs)
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-blink-features=AutomationControlled') # Tambahan stealth
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+        service = Service(resolve_chromedriver_path())
+        driver = webdriver.Chrome(service=service, options=options)
+        stealth(driver,
+                languages=["en-US", "en"],
+                vendor="Google Inc.",
+                platform="Win32",
+                webgl_vendor="Intel Inc.",
+                renderer="Intel Iris OpenGL Engine",
+                fix_hairline=True,
+                )
+        driver.set_page_load_timeout(60)
+        return driver
+
+    def _spawn_idle(self):
+        try:
+            driver = self._create_driver()
+        except Exception as e:
+            with self._lock:
+                self._created -= 1
+            print(f"❌ Gagal menyiapkan driver Chrome untuk pool: {e}")
+            return
+        with self._lock:
+            self._jobs[id(driver)] = 0
+        self._idle.put(driver)
+
+    def warm(self):
+        """Menyalakan driver hingga ukuran pool di background (tidak memblokir)."""
+        with self._lock:
+            missing = self.size - self._created
+            self._created += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            threading.Thread(target=self._spawn_idle, name="browser-warm", daemon=True).start()
+
+    def acquire(self, download_dir, timeout=BROWSER_ACQUIRE_TIMEOUT):
+        """
+        Meminjam driver siap pakai dengan direktori download milik job. Driver menganggur
+        yang ternyata mati dibuang lalu diganti; driver baru yang gagal membuat error diteruskan.
+        """
+        fresh = False
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            driver = None
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    driver = self._create_driver()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                with self._lock:
+                    self._jobs[id(driver)] = 0
+                fresh = True
+            else:
+                driver = self._idle.get(timeout=timeout)
+
+        try:
+            driver.execute_cdp_cmd("Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+        except Exception as e:
+            self._discard(driver)
+            if fresh:
+                raise
+            print(f"♻️ Driver Chrome menganggur tidak merespons ({e}). Diganti.")
+            return self.acquire(download_dir, timeout)
+        with self._lock:
+            self._jobs[id(driver)] = self._jobs.get(id(driver), 0) + 1
+        return driver
+
+    def release(self, driver):
+        """Mengembalikan driver ke pool setelah profilnya direset; driver rusak/tua dibuang."""
+        if driver is None:
+            return
+        with self._lock:
+            worn_out = self._jobs.get(id(driver), 0) >= BROWSER_MAX_JOBS
+        try:
+            if worn_out:
+                raise RuntimeError("batas job per driver tercapai")
+            self._reset(driver)
+        except Exception as e:
+            print(f"♻️ Driver Chrome diganti ({e}).")
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def _reset(self, driver):
+        # Tutup tab tambahan yang dibuka situs
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        current_url = driver.current_url
+        if current_url.startswith("http"):
+            origin = "/".join(current_url.split("/")[:3])
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": self._default_download_dir})
+        # Kosongkan log performa agar job berikutnya tidak membaca request job ini
+        driver.get_log('performance')
+
+    def _discard(self, driver):
+        with self._lock:
+            self._created -= 1
+            self._jobs.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        """Menutup semua driver yang sedang menganggur."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """Mengembalikan pool browser bersama untuk proses ini."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -1,13 +1,41 @@
 import os
 import sys
+import json
 
 # ✅ Import hanya Class DownloaderBot dari file utils
 from utils import DownloaderBot
+from telemetry import get_telemetry
 
 # Dapatkan URL dari environment variable
 url_to_download = os.environ.get("MEDIAFIRE_PAGE_URL")
+# DRIVE_STREAM=1: chunk hasil download langsung dikirim ke upload resumable Google Drive
+DRIVE_STREAM = os.environ.get("DRIVE_STREAM") == "1"
+# Penanda untuk workflow: permintaan sudah dijawab dari result store, langkah upload dilewati
+RESULT_CACHE_MARKER = "result_cache_hit.txt"
+
+def write_download_markers(downloader, downloaded_filename, source_url):
+    """
+    Menulis downloaded_filename.txt dan downloaded_fileinfo.json untuk uploader: MD5/ukuran/MIME
+    dari engine download agar uploader tidak meng-hash ulang, plus URL sumber untuk result store.
+    """
+    with open("downloaded_filename.txt", "w") as f:
+        f.write(downloaded_filename)
+    file_info = downloader.file_info
+    if not file_info or file_info.get('filename') != downloaded_filename:
+        file_info = {'filename': downloaded_filename}
+    if os.path.exists(downloaded_filename):
+        stat = os.stat(downloaded_filename)
+        file_info = dict(file_info, size=file_info.get('size') or stat.st_size,
+                         mtime_ns=stat.st_mtime_ns, source_url=source_url)
+        with open("downloaded_fileinfo.json", "w") as f:
+            json.dump(file_info, f)
 
 if __name__ == "__main__":
+    # Mode batch: python main.py --batch urls.txt (atau '-' untuk stdin)
+    if len(sys.argv) >= 3 and sys.argv[1] == "--batch":
+        from batch import run_batch
+        sys.exit(0 if run_batch(sys.argv[2]) else 1)
+
     if url_to_download:
         print(f"Memulai proses download untuk URL: {url_to_download}")
         downloaded_filename = None
@@ -15,14 +43,40 @@ if __name__ == "__main__":
         try:
             # 1. Inisialisasi Class
             downloader = DownloaderBot(url_to_download)
+
+            drive_service = None
+            if DRIVE_STREAM:
+                from upload import authenticate_google_drive, upload_file_to_drive, DriveStreamTarget
+                drive_service = authenticate_google_drive()
+                downloader.stream_target = DriveStreamTarget(drive_service, source_url=url_to_download)
             
             # 2. Jalankan Proses Utama dan tangkap nama file yang diunduh
-            downloaded_filename = downloader.run()
+            with get_telemetry().phase("job", url=url_to_download) as span:
+                downloaded_filename = downloader.run()
+                span.fields.update(cache_hit=downloader.cache_hit)
+                if not downloaded_filename and not downloader.cache_hit:
+                    span.fail("download tidak menghasilkan file")
+
+            if downloader.cache_hit:
+                with open(RESULT_CACHE_MARKER, "w") as f:
+                    f.write(url_to_download)
+                print("✅ Selesai dari result store: file sudah pernah diunggah, tidak ada yang perlu diunduh.")
+                sys.exit(0)
+
+            # 2b. Mode pipeline: upload sudah berjalan bersamaan dengan download.
+            # Jika sumber tidak bisa di-stream (mis. MEGA/Selenium), upload dari disk di sini.
+            if downloaded_filename and DRIVE_STREAM:
+                if downloader.stream_target.completed:
+                    upload_success = downloader.stream_target.succeeded
+                else:
+                    upload_success = upload_file_to_drive(drive_service, downloaded_filename, downloader.file_info)
+                if not upload_success:
+                    print("❌ Upload Google Drive (mode pipeline) gagal.")
+                    sys.exit(1)
             
             # 3. Buat downloaded_filename.txt jika berhasil
             if downloaded_filename:
-                with open("downloaded_filename.txt", "w") as f: 
-                    f.write(downloaded_filename)
+                write_download_markers(downloader, downloaded_filename, url_to_download)
                 print(f"✅ Selesai. Nama file: {downloaded_filename} telah dicatat dalam downloaded_filename.txt")
             else:
                 print("❌ Proses download selesai tanpa menghasilkan file yang valid.")
@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import time
+import atexit
+import base64
+import random
+import struct
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import requests
+from Crypto.Cipher import AES
+from telemetry import get_telemetry
+
+# =========================================================
+# KONFIGURASI KLIEN MEGA
+# =========================================================
+
+MEGA_API_URL = os.environ.get("MEGA_API_URL", "https://g.api.mega.co.nz")
+MEGA_CONNECTIONS = int(os.environ.get("MEGA_CONNECTIONS", "8"))
+# Ukuran segmen per request range; dibulatkan ke batas chunk MAC MEGA
+MEGA_SEGMENT_SIZE = int(os.environ.get("MEGA_SEGMENT_SIZE", str(8 * 1024 * 1024)))
+# Jumlah proses untuk dekripsi AES-CTR + CBC-MAC (di luar GIL thread download)
+MEGA_DECRYPT_WORKERS = int(os.environ.get("MEGA_DECRYPT_WORKERS", str(min(os.cpu_count() or 2, 4))))
+MEGA_SEGMENT_RETRIES = 5
+MEGA_API_RETRIES = 6
+MEGA_TIMEOUT = 30
+# Kode error API MEGA: -3 = EAGAIN (server sibuk, coba lagi)
+MEGA_EAGAIN = -3
+MEGA_CHUNK_UNIT = 128 * 1024
+
+class MegaError(Exception):
+    """Link, API, atau verifikasi MAC MEGA gagal."""
+
+# =========================================================
+# KUNCI, ATRIBUT, DAN MAC (FUNGSI MURNI)
+# =========================================================
+
+def _b64_decode(data):
+    """Base64 versi MEGA: url-safe tanpa padding."""
+    data = data.replace(',', '')
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def parse_mega_link(url):
+    """
+    Mengambil (handle, kunci 32 byte) dari link file MEGA, format baru
+    (mega.nz/file/<id>#<kunci>) maupun lama (mega.nz/#!<id>!<kunci>).
+    """
+    if re.search(r'mega(?:\.co)?\.nz/(?:folder/|#F!)', url):
+        raise MegaError("Link folder MEGA belum didukung; kirim link file.")
+    match = re.search(r'mega(?:\.co)?\.nz/file/([\w-]+)#([\w,-]+)', url) \
+        or re.search(r'mega(?:\.co)?\.nz/#!([\w-]+)!([\w,-]+)', url)
+    if not match:
+        raise MegaError("URL MEGA tidak valid (handle atau kunci tidak ditemukan).")
+    key = _b64_decode(match.group(2))
+    if len(key) != 32:
+        raise MegaError("Kunci file MEGA harus 32 byte.")
+    return match.group(1), key
+
+def split_file_key(key):
+    """Kunci link 32 byte -> (kunci AES 16 byte, nonce CTR 8 byte, meta-MAC 8 byte)."""
+    words = struct.unpack('>8I', key)
+    aes_key = struct.pack('>4I', *(words[i] ^ words[i + 4] for i in range(4)))
+    return aes_key, key[16:24], key[24:32]
+
+def decrypt_attributes(data, aes_key):
+    """Mendekripsi atribut file ('MEGA{...}', AES-CBC dengan IV nol) menjadi dict."""
+    raw = _b64_decode(data)
+    raw += b'\0' * (-len(raw) % 16)
+    plain = AES.new(aes_key, AES.MODE_CBC, iv=b'\0' * 16).decrypt(raw)
+    if not plain.startswith(b'MEGA{'):
+        raise MegaError("Kunci MEGA salah: atribut file tidak bisa didekripsi.")
+    return json.loads(plain[4:].rstrip(b'\0').decode('utf-8'))
+
+def chunk_boundaries(size):
+    """Chunk MAC MEGA: 128 KiB, 256 KiB, ... 1 MiB, lalu setiap 1 MiB. Hasil: list (awal, akhir)."""
+    chunks = []
+    start, step = 0, 1
+    while start < size:
+        end = min(start + MEGA_CHUNK_UNIT * step, size)
+        chunks.append((start, end))
+        start, step = end, min(step + 1, 8)
+    return chunks
+
+def plan_segments(size, segment_size=MEGA_SEGMENT_SIZE):
+    """Mengelompokkan chunk MAC menjadi segmen download (awal, akhir, chunks) sekitar segment_size."""
+    segments = []
+    current = []
+    for chunk in chunk_boundaries(size):
+        if current and chunk[1] - current[0][0] > segment_size:
+            segments.append((current[0][0], current[-1][1], current))
+            current = []
+        current.append(chunk)
+    if current:
+        segments.append((current[0][0], current[-1][1], current))
+    return segments
+
+def decrypt_segment(aes_key, nonce, start, data, chunks):
+    """
+    Dijalankan di process pool: dekripsi AES-CTR satu segmen (counter = nonce || awal/16)
+    dan CBC-MAC setiap chunk di dalamnya. Hasil: (plaintext, list MAC chunk).
+    """
+    plain = AES.new(aes_key, AES.MODE_CTR, nonce=nonce, initial_value=start // 16).decrypt(data)
+    macs = []
+    for chunk_start, chunk_end in chunks:
+        block = plain[chunk_start - start:chunk_end - start]
+        block += b'\0' * (-len(block) % 16)
+        macs.append(AES.new(aes_key, AES.MODE_CBC, iv=nonce + nonce).encrypt(block)[-16:])
+    return plain, macs
+
+def condense_macs(aes_key, chunk_macs):
+    """Menggabungkan MAC chunk (berurutan) menjadi meta-MAC 8 byte seperti pada kunci link."""
+    mac = b'\0' * 16
+    if chunk_macs:
+        mac = AES.new(aes_key, AES.MODE_CBC, iv=b'\0' * 16).encrypt(b''.join(chunk_macs))[-16:]
+    words = struct.unpack('>4I', mac)
+    return struct.pack('>2I', words[0] ^ words[1], words[2] ^ words[3])
+
+# =========================================================
+# PROCESS POOL DEKRIPSI
+# =========================================================
+
+_decrypt_pool = None
+_decrypt_pool_lock = threading.Lock()
+
+def get_decrypt_pool():
+    """
+    Process pool bersama untuk dekripsi. Memakai 'spawn' agar proses anak tidak
+    mewarisi thread (notifier, pool Chrome) dari proses utama.
+    """
+    global _decrypt_pool
+    with _decrypt_pool_lock:
+        if _decrypt_pool is None:
+            _decrypt_pool = ProcessPoolExecutor(
+                max_workers=max(MEGA_DECRYPT_WORKERS, 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_decrypt_pool.shutdown, wait=False, cancel_futures=True)
+        return _decrypt_pool
+
+# =========================================================
+# KLIEN MEGA
+# =========================================================
+
+class MegaClient:
+    """
+    Klien download MEGA di dalam proses: metadata lewat API 'g', segmen terenkripsi
+    diambil lewat beberapa koneksi range paralel, didekripsi di process pool, lalu
+    ditulis dengan os.pwrite ke offset masing-masing. MAC setiap chunk diverifikasi
+    terhadap meta-MAC pada kunci link sebelum file dianggap selesai.
+    """
+
+    def __init__(self, session=None, api_url=MEGA_API_URL):
+        self.session = session or requests.Session()
+        self.api_url = api_url.rstrip('/')
+        self._sequence = random.randint(0, 0xFFFFFFF)
+
+    def api_request(self, payload):
+        """Satu perintah API MEGA; EAGAIN diulang dengan backoff, kode negatif lain jadi MegaError."""
+        for attempt in range(MEGA_API_RETRIES):
+            self._sequence += 1
+            response = self.session.post(f"{self.api_url}/cs", params={'id': self._sequence},
+                                         json=[payload], timeout=MEGA_TIMEOUT)
+            response.raise_for_status()
+            result = response.json()
+            if isinstance(result, list):
+                result = result[0]
+            if isinstance(result, int) and result < 0:
+                if result == MEGA_EAGAIN:
+                    time.sleep(min(2 ** attempt * 0.5, 10))
+                    continue
+                raise MegaError(f"API MEGA mengembalikan kode error {result}.")
+            return result
+        raise MegaError("API MEGA terus sibuk (EAGAIN).")
+
+    def file_info(self, url):
+        """Metadata file: {'url', 'size', 'filename', 'aes_key', 'nonce', 'meta_mac'}."""
+        handle, key = parse_mega_link(url)
+        aes_key, nonce, meta_mac = split_file_key(key)
+        result = self.api_request({'a': 'g', 'g': 1, 'p': handle})
+        if not result.get('g'):
+            raise MegaError("MEGA tidak memberikan URL download (file dihapus atau kuota habis).")
+        attributes = decrypt_attributes(result['at'], aes_key)
+        filename = (attributes.get('n') or handle).replace('/', '_').replace('\\', '_')
+        return {'url': result['g'], 'size': int(result['s']), 'filename': filename,
+                'aes_key': aes_key, 'nonce': nonce, 'meta_mac': meta_mac}
+
+    def _fetch_segment(self, url, start, end):
+        """Mengambil byte terenkripsi [start, end) lewat sufiks path '/awal-akhir' milik MEGA."""
+        for attempt in range(MEGA_SEGMENT_RETRIES):
+            try:
+                response = self.session.get(f"{url}/{start}-{end - 1}", timeout=MEGA_TIMEOUT)
+                response.raise_for_status()
+                if len(response.content) != end - start:
+                    raise MegaError(f"Segmen {start}-{end - 1} terpotong ({len(response.content)} byte).")
+                return response.content
+            except (requests.exceptions.RequestException, MegaError) as e:
+                if attempt == MEGA_SEGMENT_RETRIES - 1:
+                    raise
+                print(f"⚠️ Segmen MEGA {start}-{end - 1} gagal ({e}). Mencoba lagi...")
+                get_telemetry().retry("download", attempt + 1, e, segment=f"{start}-{end - 1}", engine="mega")
+                time.sleep(min(2 ** attempt, 15))
+
+    def download(self, info, output_path, progress=None, connections=MEGA_CONNECTIONS):
+        """
+        Mengunduh dan mendekripsi file ke output_path. progress(downloaded, total) dipanggil
+        setiap segmen selesai. File dihapus dan MegaError dilempar jika MAC tidak cocok.
+        """
+        size = info['size']
+        segments = plan_segments(size)
+        chunk_macs = {}
+        state = {'downloaded': 0}
+        lock = threading.Lock()
+        pool = get_decrypt_pool()
+
+        def run_segment(segment):
+            start, end, chunks = segment
+            data = self._fetch_segment(info['url'], start, end)
+            plain, macs = pool.submit(decrypt_segment, info['aes_key'], info['nonce'], start, data, chunks).result()
+            os.pwrite(fd, plain, start)
+            with lock:
+                for (chunk_start, _), mac in zip(chunks, macs):
+                    chunk_macs[chunk_start] = mac
+                state['downloaded'] += end - start
+                downloaded = state['downloaded']
+            if progress:
+                progress(downloaded, size)
+
+        fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            with ThreadPoolExecutor(max_workers=max(connections, 1), thread_name_prefix="mega-segment") as executor:
+                futures = [executor.submit(run_segment, segment) for segment in segments]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+            mac = condense_macs(info['aes_key'], [chunk_macs[start] for start in sorted(chunk_macs)])
+            if mac != info['meta_mac']:
+                raise MegaError("Verifikasi MAC MEGA gagal: file rusak atau kunci tidak cocok.")
+        except BaseException:
+            os.close(fd)
+            fd = None
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            if fd is not None:
+                os.close(fd)
+        return output_path
@@ -0,0 +1,210 @@
+import os
+import time
+import atexit
+import threading
+from collections import OrderedDict
+import requests
+
+# =========================================================
+# KONFIGURASI NOTIFIER TELEGRAM
+# =========================================================
+
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+# Jeda minimum antar request ke chat yang sama (Telegram: ~1 pesan/detik per chat)
+NOTIFY_CHAT_INTERVAL = float(os.environ.get("NOTIFY_CHAT_INTERVAL", "1.0"))
+# Progres dilaporkan setiap kenaikan NOTIFY_PROGRESS_STEP persen atau setiap NOTIFY_PROGRESS_INTERVAL detik
+NOTIFY_PROGRESS_STEP = int(os.environ.get("NOTIFY_PROGRESS_STEP", "5"))
+NOTIFY_PROGRESS_INTERVAL = float(os.environ.get("NOTIFY_PROGRESS_INTERVAL", "10"))
+# Batas 429 berturut-turut untuk satu operasi sebelum dibuang
+NOTIFY_MAX_RETRIES = 5
+NOTIFY_FLUSH_TIMEOUT = 15
+
+class PendingMessage:
+    """Handle pesan yang dikirim di background; message_id terisi setelah sendMessage selesai."""
+
+    def __init__(self):
+        self.message_id = None
+        self._done = threading.Event()
+
+    @property
+    def resolved(self):
+        return self._done.is_set()
+
+    def resolve(self, message_id):
+        self.message_id = message_id
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Menunggu sendMessage selesai dan mengembalikan message_id (None jika gagal)."""
+        self._done.wait(timeout)
+        return self.message_id
+
+# =========================================================
+# NOTIFIER LATAR BELAKANG (KEEP-ALIVE + PENGGABUNGAN EDIT)
+# =========================================================
+
+class TelegramNotifier:
+    """
+    Mengirim sendMessage/editMessageText dari satu thread background dengan satu
+    requests.Session keep-alive. Pemanggil tidak pernah menunggu jaringan: edit
+    beruntun ke pesan yang sama digabung sehingga hanya teks terakhir yang dikirim,
+    jeda per chat dijaga, dan respons 429 dihormati lewat retry_after: operasinya
+    dikembalikan ke antrean dan chat itu ditahan sampai tenggatnya, tanpa menahan chat lain.
+    """
+
+    def __init__(self, bot_token, api_base=TELEGRAM_API_BASE):
+        self.bot_token = bot_token
+        self.api_base = api_base.rstrip("/")
+        self._session = requests.Session()
+        # Kunci operasi -> (metode, chat_id, handle, teks); urutan = urutan antrean
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._next_allowed = {}
+        # Kunci operasi -> jumlah 429 berturut-turut
+        self._rate_limited = {}
+        self._busy = False
+        self._send_counter = 0
+        self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+        self._thread.start()
+
+    def send(self, chat_id, text):
+        """Menjadwalkan sendMessage dan langsung mengembalikan PendingMessage."""
+        handle = PendingMessage()
+        with self._condition:
+            self._send_counter += 1
+            self._pending[("send", self._send_counter)] = ("sendMessage", chat_id, handle, text)
+            self._condition.notify()
+        return handle
+
+    def edit(self, chat_id, message, text):
+        """
+        Menjadwalkan editMessageText untuk message (PendingMessage atau message_id).
+        Jika edit untuk pesan yang sama masih menunggu, teksnya diganti di tempat.
+        """
+        if message is None:
+            return
+        key = ("edit", chat_id, id(message) if isinstance(message, PendingMessage) else message)
+        with self._condition:
+            if key in self._pending:
+                method, chat_id, handle, _ = self._pending[key]
+                self._pending[key] = (method, chat_id, handle, text)
+            else:
+                self._pending[key] = ("editMessageText", chat_id, message, text)
+            self._condition.notify()
+
+    def flush(self, timeout=NOTIFY_FLUSH_TIMEOUT):
+        """Menunggu antrean kosong (dipanggil saat proses selesai)."""
+        deadline = time.time() + timeout
+        with self._condition:
+            while (self._pending or self._busy) and time.time() < deadline:
+                self._condition.wait(timeout=max(deadline - time.time(), 0.05))
+
+    def _next_ready(self):
+        """Operasi pertama yang chat-nya sudah boleh dikirimi, atau (None, waktu tunggu)."""
+        now = time.time()
+        soonest = None
+        for key, (_, chat_id, target, _) in self._pending.items():
+            # Edit untuk pesan yang sendMessage-nya belum selesai ditunda dulu
+            if isinstance(target, PendingMessage) and key[0] == "edit" and not target.resolved:
+                continue
+            allowed_at = self._next_allowed.get(chat_id, 0)
+            if allowed_at <= now:
+                return key, 0
+            soonest = allowed_at if soonest is None else min(soonest, allowed_at)
+        return None, (soonest - now if soonest is not None else None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    key, delay = self._next_ready()
+                    if key is not None:
+                        break
+                    self._condition.wait(timeout=delay)
+                method, chat_id, target, text = self._pending.pop(key)
+                self._busy = True
+            retry_after = None
+            try:
+                retry_after = self._deliver(method, chat_id, target, text)
+            except Exception as e:
+                print(f"Gagal mengirim notifikasi Telegram: {e}")
+                if method == "sendMessage":
+                    target.resolve(None)
+            finally:
+                with self._condition:
+                    interval = NOTIFY_CHAT_INTERVAL
+                    if retry_after is None:
+                        self._rate_limited.pop(key, None)
+                    else:
+                        interval = max(retry_after, interval)
+                        self._requeue(key, (method, chat_id, target, text))
+                    self._next_allowed[chat_id] = time.time() + interval
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _requeue(self, key, item):
+        """Mengembalikan operasi yang terkena 429 ke depan antrean (dipanggil dengan _condition dipegang)."""
+        attempts = self._rate_limited.get(key, 0) + 1
+        if attempts >= NOTIFY_MAX_RETRIES:
+            self._rate_limited.pop(key, None)
+            print(f"Gagal mengirim notifikasi Telegram: {item[0]} tetap terkena rate limit setelah {attempts} percobaan.")
+            if item[0] == "sendMessage":
+                item[2].resolve(None)
+            return
+        self._rate_limited[key] = attempts
+        # Edit yang lebih baru untuk pesan yang sama mungkin sudah masuk antrean: teks terbaru yang dipakai
+        if key not in self._pending:
+            self._pending[key] = item
+        self._pending.move_to_end(key, last=False)
+
+    def _deliver(self, method, chat_id, target, text):
+        """Satu request ke Bot API; mengembalikan retry_after (detik) jika terkena 429, selain itu None."""
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+        if method == "editMessageText":
+            message_id = target.wait() if isinstance(target, PendingMessage) else target
+            if not message_id:
+                return
+            payload["message_id"] = message_id
+
+        url = f"{self.api_base}/bot{self.bot_token}/{method}"
+        response = self._session.post(url, json=payload, timeout=10)
+        body = response.json()
+        if response.status_code == 429:
+            return body.get("parameters", {}).get("retry_after", 1)
+        if method == "sendMessage":
+            target.resolve((body.get("result") or {}).get("message_id"))
+        elif not body.get("ok") and "not modified" not in body.get("description", ""):
+            print(f"Gagal mengedit pesan Telegram: {body.get('description')}")
+        return None
+
+class ProgressThrottle:
+    """Menentukan kapan progres layak dilaporkan: tiap NOTIFY_PROGRESS_STEP persen atau NOTIFY_PROGRESS_INTERVAL detik."""
+
+    def __init__(self, step=NOTIFY_PROGRESS_STEP, interval=NOTIFY_PROGRESS_INTERVAL):
+        self.step = step
+        self.interval = interval
+        self.last_percent = None
+        self.last_time = 0
+
+    def due(self, percent):
+        now = time.time()
+        if self.last_percent is not None and percent < 100 and percent - self.last_percent < self.step \
+                and now - self.last_time < self.interval:
+            return False
+        if percent == self.last_percent:
+            return False
+        self.last_percent, self.last_time = percent, now
+        return True
+
+_notifiers = {}
+_notifiers_lock = threading.Lock()
+
+def get_notifier(bot_token):
+    """Mengembalikan notifier bersama untuk bot_token (None jika token kosong)."""
+    if not bot_token:
+        return None
+    with _notifiers_lock:
+        if bot_token not in _notifiers:
+            _notifiers[bot_token] = TelegramNotifier(bot_token)
+            atexit.register(_notifiers[bot_token].flush)
+        return _notifiers[bot_token]
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import fcntl
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+# =========================================================
+# KONFIGURASI CACHE RESOLVER
+# =========================================================
+
+CACHE_DIR = os.environ.get("SONTO_CACHE_DIR", ".cache")
+RESOLVER_CACHE_FILE = os.path.join(CACHE_DIR, "resolver_cache.json")
+RESOLVER_CACHE_MAX_ENTRIES = int(os.environ.get("RESOLVER_CACHE_MAX_ENTRIES", "500"))
+RESOLVER_CACHE_DEFAULT_TTL = 60 * 60
+# TTL per host (detik): link langsung MediaFire/Gofile cepat kedaluwarsa, API Pixeldrain stabil
+RESOLVER_CACHE_HOST_TTL = {
+    "mediafire.com": 60 * 60,
+    "gofile.io": 30 * 60,
+    "pixeldrain.com": 7 * 24 * 60 * 60,
+    "sourceforge.net": 24 * 60 * 60,
+    "apkadmin.com": 30 * 60,
+}
+# Parameter pelacak yang tidak mengubah file tujuan: nama persis, dan prefix untuk utm_*
+TRACKING_PARAMS = ("fbclid", "gclid", "ref")
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+def normalize_page_url(url):
+    """
+    Menormalkan URL halaman sumber: skema/host huruf kecil, tanpa 'www.', tanpa
+    parameter pelacak, tanpa slash di akhir path. Fragment hanya dipertahankan
+    untuk MEGA (kunci file ada di fragment).
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    path = parsed.path.rstrip("/") or "/"
+    fragment = parsed.fragment if "mega" in host else ""
+    return urlunparse(((parsed.scheme or "https").lower(), host, path, "", query, fragment))
+
+def host_ttl(url):
+    """TTL untuk host URL (mencocokkan domain induk, mis. app.mediafire.com -> mediafire.com)."""
+    host = urlparse(url).netloc.lower()
+    for domain, ttl in RESOLVER_CACHE_HOST_TTL.items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+    return RESOLVER_CACHE_DEFAULT_TTL
+
+# =========================================================
+# CACHE URL DOWNLOAD LANGSUNG (TTL + LRU, DISIMPAN DI DISK)
+# =========================================================
+
+class ResolverCache:
+    """
+    Menyimpan hasil resolusi halaman sumber -> URL download langsung (beserta nama
+    file, ukuran, ETag) di file JSON. Entri kedaluwarsa sesuai TTL host, dan entri
+    yang paling lama tidak dipakai dibuang jika melebihi RESOLVER_CACHE_MAX_ENTRIES.
+    Setiap operasi memuat ulang file di bawah flock sehingga beberapa proses worker
+    bisa memakai file yang sama tanpa saling menghapus entri.
+    """
+
+    def __init__(self, path=RESOLVER_CACHE_FILE, max_entries=RESOLVER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Lock antar thread dan antar proses (flock path.lock), dengan entri terbaru dari disk."""
+        with self._lock:
+            lock_file = None
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                lock_file = open(f"{self.path}.lock", "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except OSError as e:
+                print(f"Peringatan: cache resolver tanpa lock antar proses: {e}")
+            try:
+                self._entries = None
+                self._load()
+                yield
+            finally:
+                if lock_file:
+                    lock_file.close()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self._entries = OrderedDict(sorted(data.items(), key=lambda item: item[1].get("last_used", 0)))
+        except (OSError, ValueError):
+            self._entries = OrderedDict()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Peringatan: gagal menyimpan cache resolver: {e}")
+
+    def get(self, page_url):
+        """Mengembalikan entri yang masih dalam TTL (dan menandainya baru dipakai), atau None."""
+        key = normalize_page_url(page_url)
+        with self._locked():
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if time.time() - entry["stored_at"] > host_ttl(key):
+                del self._entries[key]
+                self._save()
+                return None
+            entry["last_used"] = time.time()
+            self._entries.move_to_end(key)
+            self._save()
+            return dict(entry)
+
+    def put(self, page_url, urls, filename, size=None, etag=None):
+        key = normalize_page_url(page_url)
+        now = time.time()
+        with self._locked():
+            self._entries[key] = {
+                "urls": list(urls), "filename": filename, "size": size, "etag": etag,
+                "stored_at": now, "last_used": now,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, page_url):
+        key = normalize_page_url(page_url)
+        with self._locked():
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_resolver_cache():
+    """Mengembalikan cache resolver bersama untuk proses ini."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResolverCache()
+        return _cache
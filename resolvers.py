@@ -0,0 +1,123 @@
+import os
+import re
+import base64
+import html as html_lib
+from urllib.parse import urljoin, urlparse, unquote
+
+# =========================================================
+# RESOLVER HTTP TANPA BROWSER (MEDIAFIRE & GOFILE)
+# =========================================================
+# Fungsi parse_* murni (input HTML/JSON, output dict) sehingga bisa diuji dengan
+# fixture HTML/JSON yang disimpan; fungsi resolve_* yang melakukan request.
+
+GOFILE_API_URL = os.environ.get("GOFILE_API_URL", "https://api.gofile.io")
+# Token situs yang dipakai frontend gofile.io untuk endpoint contents (bisa berubah sewaktu-waktu)
+GOFILE_WEBSITE_TOKEN = os.environ.get("GOFILE_WEBSITE_TOKEN", "4fd6sg89d7s6")
+RESOLVER_TIMEOUT = 15
+
+class ResolverError(Exception):
+    """Resolver HTTP gagal; pemanggil sebaiknya fallback ke Selenium."""
+
+def _tag_attributes(tag_html):
+    return {name.lower(): html_lib.unescape(value) for name, _, value in
+            re.findall(r'([\w:-]+)\s*=\s*(["\'])(.*?)\2', tag_html, re.S)}
+
+def _filename_from_url(url):
+    return unquote(urlparse(url).path.rstrip('/').split('/')[-1]) or None
+
+# --- MEDIAFIRE ---
+
+def parse_mediafire_html(page_html, page_url):
+    """
+    Mengambil link download langsung dari HTML halaman MediaFire (#downloadButton,
+    termasuk varian data-scrambled-url). Jika halaman masih berupa langkah pertama,
+    mengembalikan form 'dl-btn-form' yang harus dikirim terlebih dahulu.
+    Hasil: {'url', 'filename'} atau {'form': {'action', 'method', 'data'}}.
+    """
+    button = re.search(r'<a\b[^>]*\bid\s*=\s*["\']downloadButton["\'][^>]*>', page_html, re.I | re.S)
+    if button:
+        attributes = _tag_attributes(button.group(0))
+        href = attributes.get('href', '')
+        if not href.startswith('http') and attributes.get('data-scrambled-url'):
+            href = base64.b64decode(attributes['data-scrambled-url']).decode('utf-8', 'replace')
+        if href.startswith('http'):
+            return {'url': href, 'filename': _filename_from_url(href)}
+
+    form = re.search(r'<form\b[^>]*class\s*=\s*["\'][^"\']*\bdl-btn-form\b[^"\']*["\'][^>]*>(.*?)</form>', page_html, re.I | re.S)
+    if form:
+        form_attributes = _tag_attributes(form.group(0)[:form.group(0).index('>') + 1])
+        data = {}
+        for input_tag in re.findall(r'<input\b[^>]*>', form.group(1), re.I | re.S):
+            input_attributes = _tag_attributes(input_tag)
+            if input_attributes.get('name'):
+                data[input_attributes['name']] = input_attributes.get('value', '')
+        return {'form': {
+            'action': urljoin(page_url, form_attributes.get('action') or page_url),
+            'method': (form_attributes.get('method') or 'get').upper(),
+            'data': data,
+        }}
+    raise ResolverError("Tombol #downloadButton maupun form dl-btn-form tidak ditemukan di halaman MediaFire.")
+
+def resolve_mediafire(session, page_url):
+    """Resolusi MediaFire lewat HTTP biasa: maksimal dua round-trip (form langkah 1 jika ada)."""
+    response = session.get(page_url, timeout=RESOLVER_TIMEOUT)
+    response.raise_for_status()
+    result = parse_mediafire_html(response.text, response.url)
+    if 'form' in result:
+        form = result['form']
+        if form['method'] == 'POST':
+            response = session.post(form['action'], data=form['data'], timeout=RESOLVER_TIMEOUT)
+        else:
+            response = session.get(form['action'], params=form['data'], timeout=RESOLVER_TIMEOUT)
+        response.raise_for_status()
+        result = parse_mediafire_html(response.text, response.url)
+        if 'form' in result:
+            raise ResolverError("Halaman MediaFire tetap meminta form setelah dikirim.")
+    return {'urls': [result['url']], 'filename': result['filename'] or "mediafire_download", 'size': None}
+
+# --- GOFILE ---
+
+def parse_gofile_contents(payload):
+    """
+    Mengambil daftar file dari respons JSON /contents/{id} Gofile.
+    Hasil: list {'name', 'link', 'size'}, diurutkan dari yang terbesar.
+    """
+    if payload.get('status') != 'ok':
+        raise ResolverError(f"API Gofile menolak permintaan: {payload.get('status')}")
+    data = payload.get('data') or {}
+    if data.get('type') == 'file':
+        items = [data]
+    else:
+        items = [child for child in (data.get('children') or {}).values() if child.get('type') == 'file']
+    files = [{'name': item.get('name'), 'link': item.get('link'), 'size': item.get('size')}
+             for item in items if item.get('link')]
+    if not files:
+        raise ResolverError("Folder Gofile tidak berisi file yang bisa diunduh.")
+    return sorted(files, key=lambda item: item.get('size') or 0, reverse=True)
+
+def resolve_gofile(session, page_url):
+    """
+    Resolusi Gofile lewat API publik: buat akun tamu lalu baca isi folder. Cookie
+    accountToken dikembalikan di 'headers' (bukan dipasang di session bersama) agar
+    job paralel tidak saling menimpa token. Jika folder berisi beberapa file, file terbesar yang dipilih.
+    """
+    content_match = re.search(r'gofile\.io/d/([\w-]+)', page_url)
+    if not content_match:
+        raise ResolverError("URL Gofile tidak valid.")
+
+    account = session.post(f"{GOFILE_API_URL}/accounts", timeout=RESOLVER_TIMEOUT)
+    account.raise_for_status()
+    token = (account.json().get('data') or {}).get('token')
+    if not token:
+        raise ResolverError("Gagal membuat akun tamu Gofile.")
+
+    response = session.get(
+        f"{GOFILE_API_URL}/contents/{content_match.group(1)}",
+        params={'wt': GOFILE_WEBSITE_TOKEN},
+        headers={'Authorization': f'Bearer {token}'},
+        timeout=RESOLVER_TIMEOUT,
+    )
+    response.raise_for_status()
+    chosen = parse_gofile_contents(response.json())[0]
+    return {'urls': [chosen['link']], 'filename': chosen['name'], 'size': chosen['size'],
+            'headers': {'Cookie': f'accountToken={token}'}}
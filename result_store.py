@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+from resolver_cache import CACHE_DIR, normalize_page_url
+
+# =========================================================
+# KONFIGURASI RESULT STORE
+# =========================================================
+
+RESULT_STORE_FILE = os.path.join(CACHE_DIR, "results.sqlite")
+# Hasil yang lebih tua dari ini dibuang (detik)
+RESULT_STORE_TTL = int(os.environ.get("RESULT_STORE_TTL", str(30 * 24 * 60 * 60)))
+
+def result_account(destination):
+    """
+    Identitas akun tujuan (hash, bukan token asli): file_id Telegram hanya berlaku untuk
+    bot yang sama, dan file Drive milik akun refresh token yang dipakai.
+    """
+    secret = os.environ.get("BOT_TOKEN") if destination == "telegram" else os.environ.get("DRIVE_REFRESH_TOKEN")
+    return hashlib.sha256((secret or "").encode()).hexdigest()[:16]
+
+# =========================================================
+# PENYIMPANAN HASIL UPLOAD (SQLITE)
+# =========================================================
+
+class ResultStore:
+    """
+    Memetakan URL sumber (dinormalkan) + identitas konten (ukuran, ETag, MD5) ke hasil
+    upload sebelumnya per tujuan: ID dan link Drive, atau file_id Telegram. Entri
+    kedaluwarsa dibuang berdasarkan umur; kecocokan konten dicek saat entri dipakai.
+    """
+
+    def __init__(self, path=RESULT_STORE_FILE, ttl=RESULT_STORE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " url_key TEXT NOT NULL, destination TEXT NOT NULL, account TEXT NOT NULL,"
+                " size INTEGER, etag TEXT, md5 TEXT, payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (url_key, destination, account))"
+            )
+            self._conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        return self._conn
+
+    def get(self, page_url, destination):
+        """Entri {'size', 'etag', 'md5', 'payload'} untuk URL dan tujuan ini, atau None."""
+        key = (normalize_page_url(page_url), destination, result_account(destination))
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT size, etag, md5, payload, created_at FROM results"
+                " WHERE url_key = ? AND destination = ? AND account = ?", key,
+            ).fetchone()
+            if not row:
+                return None
+            if time.time() - row[4] > self.ttl:
+                conn.execute("DELETE FROM results WHERE url_key = ? AND destination = ? AND account = ?", key)
+                conn.commit()
+                return None
+            conn.execute("UPDATE results SET last_used = ? WHERE url_key = ? AND destination = ? AND account = ?",
+                         (time.time(), *key))
+            conn.commit()
+        return {"size": row[0], "etag": row[1], "md5": row[2], "payload": json.loads(row[3])}
+
+    def put(self, page_url, destination, payload, size=None, etag=None, md5=None):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (url_key, destination, account, size, etag, md5, payload, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_page_url(page_url), destination, result_account(destination),
+                 size, etag, md5, json.dumps(payload), now, now),
+            )
+            conn.commit()
+
+    def invalidate(self, page_url, destination):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM results WHERE url_key = ? AND destination = ? AND account = ?",
+                         (normalize_page_url(page_url), destination, result_account(destination)))
+            conn.commit()
+
+def matches_content(entry, size=None, etag=None, md5=None):
+    """False jika salah satu identitas konten yang diketahui di kedua sisi berbeda."""
+    for stored, current in ((entry.get("size"), size), (entry.get("etag"), etag), (entry.get("md5"), md5)):
+        if stored and current and stored != current:
+            return False
+    return True
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_result_store():
+    """Mengembalikan result store bersama untuk proses ini."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
@@ -1,8 +1,15 @@
 import os
 import sys
-from pyrogram import Client
+import asyncio
+import mimetypes
+import fcntl
+from pyrogram import Client, raw, types, utils as pyrogram_utils
+from pyrogram.enums import ParseMode
 from pyrogram.errors import FilePartInvalid, FloodWait
+from pyrogram.session import Session
 import time
+from telemetry import get_telemetry
+import json
 
 # --- PENTING: IMPORT FUNGSI DARI UTILS.PY ---
 # Asumsi Anda punya file utils.py di direktori yang sama
@@ -10,12 +17,17 @@ try:
     # Asumsi Anda menyimpan fungsi notifikasi di utils.py
     # Pastikan utils.py memiliki fungsi send_telegram_message dan edit_telegram_message
     from utils import send_telegram_message, edit_telegram_message 
+    from notifier import ProgressThrottle
+    from result_store import get_result_store
 except ImportError:
     # Fallback jika utils.py tidak ditemukan (hanya untuk debugging)
     print("❌ GAGAL IMPORT: Pastikan file utils.py ada dan berisi fungsi notifikasi.")
     # Mendefinisikan fungsi dummy agar skrip bisa berjalan
     def send_telegram_message(text): print(f"SEND_DUMMY: {text}"); return 123456
     def edit_telegram_message(id, text): print(f"EDIT_DUMMY: {text}")
+    class ProgressThrottle:
+        def due(self, percent): return True
+    get_result_store = None
 
 
 # =========================================================
@@ -27,7 +39,220 @@ BOT_TOKEN = os.environ.get("BOT_TOKEN")
 API_ID = os.environ.get("API_ID")
 API_HASH = os.environ.get("API_HASH")
 OWNER_ID = os.environ.get("OWNER_ID") # Chat ID untuk notifikasi
+# File sesi Pyrogram disimpan di luar direktori kerja job (yang dihapus setelah job selesai),
+# satu per slot worker (bukan per PID) agar jumlah sesi tetap dan worker paralel tidak berebut file
+PYROGRAM_SESSION_DIR = os.path.abspath(os.path.join(os.environ.get("SONTO_CACHE_DIR", ".cache"), "pyrogram"))
+# Di GitHub Actions setiap run adalah proses baru: sesi hanya di memori, tidak ada auth key yang
+# tertulis ke .cache (yang disimpan ke Actions cache)
+PYROGRAM_IN_MEMORY = os.environ.get("GITHUB_ACTIONS") == "true"
 FILENAME_MARKER = "downloaded_filename.txt"
+FILEINFO_MARKER = "downloaded_fileinfo.json"
+# Upload paralel: jumlah koneksi MTProto (session media) dan total part yang dikirim bersamaan
+TG_UPLOAD_SESSIONS = int(os.environ.get("TG_UPLOAD_SESSIONS", "4"))
+TG_UPLOAD_WORKERS = int(os.environ.get("TG_UPLOAD_WORKERS", "8"))
+TG_PART_SIZE = 512 * 1024  # Ukuran part maksimum MTProto
+TG_PART_RETRIES = 5
+# Di bawah ukuran ini Telegram memakai SaveFilePart + MD5; cukup lewat send_document biasa
+TG_BIG_FILE_THRESHOLD = 10 * 1024 * 1024
+# File di atas batas ukuran Telegram dipecah menjadi volume .001, .002, ... (byte range, tanpa salinan di disk)
+TG_SPLIT_VOLUMES = os.environ.get("TG_SPLIT_VOLUMES", "1") == "1"
+TG_MAX_FILE_SIZE = int(os.environ.get("TG_MAX_FILE_SIZE", str(2000 * 1024 * 1024)))
+
+# =========================================================
+# SESI PYROGRAM
+# =========================================================
+
+_session_slot = None
+
+def _pyrogram_session_name():
+    """
+    Nama sesi untuk proses ini: slot pertama yang lock-nya belum dipegang proses lain.
+    Lock dipegang selama proses hidup; slot proses yang mati langsung bisa dipakai pengganti.
+    """
+    global _session_slot
+    if _session_slot is None:
+        os.makedirs(PYROGRAM_SESSION_DIR, exist_ok=True)
+        slot = 0
+        while True:
+            lock_file = open(os.path.join(PYROGRAM_SESSION_DIR, f"slot-{slot}.lock"), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                slot += 1
+                continue
+            _session_slot = (slot, lock_file)
+            break
+    return f"gh_pyrogram_session_{_session_slot[0]}"
+
+def create_pyrogram_client():
+    """Klien bot Pyrogram: sesi di memori di GitHub Actions, selain itu file sesi per slot worker."""
+    if PYROGRAM_IN_MEMORY:
+        return Client("gh_pyrogram_session", api_id=int(API_ID), api_hash=API_HASH,
+                      bot_token=BOT_TOKEN, in_memory=True)
+    return Client(_pyrogram_session_name(), api_id=int(API_ID), api_hash=API_HASH,
+                  bot_token=BOT_TOKEN, workdir=PYROGRAM_SESSION_DIR)
+
+# =========================================================
+# UPLOAD PART PARALEL (BEBERAPA KONEKSI MTProto)
+# =========================================================
+
+async def save_big_file_parallel(app, file_path, start=0, length=None, progress=None, name=None,
+                                 sessions_count=TG_UPLOAD_SESSIONS, workers_count=TG_UPLOAD_WORKERS):
+    """
+    Mengunggah byte [start, start+length) dari file_path sebagai InputFileBig dengan
+    SaveBigFilePart yang dikirim bersamaan lewat beberapa session media (masing-masing
+    satu koneksi TCP). Part dibaca dengan os.pread di thread pool. progress(current, total)
+    dipanggil langsung dari event loop sehingga harus non-blocking.
+    Mengembalikan (InputFileBig, durasi_detik).
+    """
+    if length is None:
+        length = os.path.getsize(file_path) - start
+    total_parts = (length + TG_PART_SIZE - 1) // TG_PART_SIZE
+    file_id = app.rnd_id()
+    loop = asyncio.get_event_loop()
+
+    dc_id, auth_key, test_mode = await app.storage.dc_id(), await app.storage.auth_key(), await app.storage.test_mode()
+    sessions = [Session(app, dc_id, auth_key, test_mode, is_media=True) for _ in range(max(sessions_count, 1))]
+    await asyncio.gather(*(session.start() for session in sessions))
+
+    parts = asyncio.Queue()
+    for part in range(total_parts):
+        parts.put_nowait(part)
+    uploaded = 0
+    fd = os.open(file_path, os.O_RDONLY)
+
+    async def worker(session):
+        nonlocal uploaded
+        while not parts.empty():
+            part = parts.get_nowait()
+            offset = part * TG_PART_SIZE
+            chunk = await loop.run_in_executor(None, os.pread, fd, min(TG_PART_SIZE, length - offset), start + offset)
+            # FloodWait tidak dihitung sebagai percobaan: part baru dianggap terkirim setelah invoke berhasil
+            attempt = 0
+            while True:
+                try:
+                    await session.invoke(raw.functions.upload.SaveBigFilePart(
+                        file_id=file_id, file_part=part, file_total_parts=total_parts, bytes=chunk,
+                    ))
+                    break
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+                except Exception as e:
+                    attempt += 1
+                    if attempt >= TG_PART_RETRIES:
+                        raise
+                    get_telemetry().retry("telegram_upload", attempt, e, part=part)
+                    await asyncio.sleep(min(2 ** attempt, 30))
+            uploaded += len(chunk)
+            if progress:
+                progress(uploaded, length)
+
+    started = time.time()
+    tasks = [loop.create_task(worker(sessions[i % len(sessions)])) for i in range(max(workers_count, 1))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Satu part gagal permanen: hentikan worker lain sebelum session ditutup
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        os.close(fd)
+        await asyncio.gather(*(session.stop() for session in sessions), return_exceptions=True)
+
+    input_file = raw.types.InputFileBig(id=file_id, parts=total_parts, name=name or os.path.basename(file_path))
+    return input_file, time.time() - started
+
+async def send_uploaded_document(app, chat_id, input_file, file_name, caption):
+    """Mengirim InputFile yang sudah diunggah sebagai dokumen (raw messages.SendMedia); mengembalikan Message."""
+    mime_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    text = await pyrogram_utils.parse_text_entities(app, caption, ParseMode.MARKDOWN, None)
+    r = await app.invoke(raw.functions.messages.SendMedia(
+        peer=await app.resolve_peer(chat_id),
+        media=raw.types.InputMediaUploadedDocument(
+            file=input_file, mime_type=mime_type, force_file=True,
+            attributes=[raw.types.DocumentAttributeFilename(file_name=file_name)],
+        ),
+        random_id=app.rnd_id(),
+        **text,
+    ))
+    for update in r.updates:
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(
+                app, update.message, {user.id: user for user in r.users}, {chat.id: chat for chat in r.chats},
+            )
+    return None
+
+def plan_volumes(file_size, max_volume_size=TG_MAX_FILE_SIZE):
+    """
+    Membagi file menjadi volume berukuran hampir sama (kelipatan TG_PART_SIZE, masing-masing
+    <= max_volume_size) agar volume terakhir tidak terlalu kecil. Hasil: list (offset, panjang).
+    """
+    count = -(-file_size // max_volume_size)
+    volume_size = -(-file_size // count)
+    volume_size = -(-volume_size // TG_PART_SIZE) * TG_PART_SIZE
+    return [(offset, min(volume_size, file_size - offset)) for offset in range(0, file_size, volume_size)]
+
+async def upload_volumes(app, chat_id, file_path, progress=None):
+    """
+    Mengunggah file besar sebagai beberapa volume (`nama.001`, `nama.002`, ...) yang dibaca
+    langsung dari byte range file asli. Semua volume diunggah bersamaan, lalu dikirim
+    berurutan dengan urutan bagian dan cara menggabungkannya di caption.
+    Hasil: list (Message, caption) per volume.
+    """
+    file_name = os.path.basename(file_path)
+    file_size = os.path.getsize(file_path)
+    volumes = plan_volumes(file_size)
+    sent = [0] * len(volumes)
+
+    def volume_progress(index):
+        def report(current, total):
+            sent[index] = current
+            if progress:
+                progress(sum(sent), file_size)
+        return report
+
+    # Koneksi dan worker dibagi rata antar volume agar total koneksi tetap sesuai konfigurasi
+    sessions_count = max(TG_UPLOAD_SESSIONS // len(volumes), 1)
+    workers_count = max(TG_UPLOAD_WORKERS // len(volumes), 2)
+    uploads = await asyncio.gather(*(
+        save_big_file_parallel(app, file_path, start=offset, length=length,
+                               progress=volume_progress(index), name=f"{file_name}.{index + 1:03d}",
+                               sessions_count=sessions_count, workers_count=workers_count)
+        for index, (offset, length) in enumerate(volumes)
+    ))
+    sent_messages = []
+    for index, (input_file, _) in enumerate(uploads):
+        caption = (
+            f"📦 **{file_name}** — bagian {index + 1}/{len(volumes)}\n"
+            f"Gabungkan: `cat \"{file_name}\".0* > \"{file_name}\"`"
+        )
+        message = await send_uploaded_document(app, chat_id, input_file, f"{file_name}.{index + 1:03d}", caption)
+        sent_messages.append((message, caption))
+    return sent_messages
+
+def record_upload_result(file_path, sent_messages):
+    """
+    Mencatat file_id dokumen yang terkirim ke result store (URL sumber + identitas konten
+    dari FILEINFO_MARKER) agar permintaan berikutnya untuk sumber yang sama cukup dikirim ulang.
+    """
+    source_url = os.environ.get("MEDIAFIRE_PAGE_URL") or os.environ.get("PAYLOAD_URL")
+    file_info = {}
+    if os.path.exists(FILEINFO_MARKER):
+        with open(FILEINFO_MARKER, "r") as f:
+            file_info = json.load(f)
+        source_url = file_info.get('source_url') or source_url
+    documents = [{'file_id': message.document.file_id, 'caption': caption}
+                 for message, caption in sent_messages if message and message.document]
+    if not get_result_store or not source_url or not documents or len(documents) != len(sent_messages):
+        return
+    try:
+        get_result_store().put(source_url, "telegram", {'documents': documents},
+                               size=os.path.getsize(file_path), etag=file_info.get('etag'), md5=file_info.get('md5'))
+    except Exception as e:
+        print(f"⚠️ Gagal mencatat hasil ke result store: {e}")
 
 # =========================================================
 # FUNGSI UTAMA UPLOADER PYROGRAM
@@ -46,31 +271,19 @@ def upload_large_file_with_pyrogram(file_path):
     file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
     
-    # Inisialisasi Klien Bot (menggunakan nama sesi statis)
-    app = Client(
-        "gh_pyrogram_session", 
-        api_id=int(API_ID), 
-        api_hash=API_HASH, 
-        bot_token=BOT_TOKEN,
-    )
+    # Inisialisasi Klien Bot (sesi per slot worker, dipakai ulang antar job agar tidak login ulang)
+    app = create_pyrogram_client()
+
+    throttle = ProgressThrottle()
+    meter = get_telemetry().transfer("telegram_upload", file_size)
 
     def progress_callback(current, total):
-        """Fungsi untuk menampilkan progress unggah ke Telegram."""
-        # Logika 2X update progress (0 -> 50% -> 100%)
-        last_percent = getattr(progress_callback, 'last_percent', 0)
-        percent = round(current * 100 / total, 1)
-        
-        # Kirim update hanya pada 50% dan 100%
-        should_update_50 = (percent >= 50 and last_percent < 50)
-        should_update_100 = (percent >= 100)
-        
-        if should_update_50 or should_update_100:
+        """Progress unggah ke Telegram. Tidak boleh memblokir: notifier mengirim edit di background."""
+        meter.update(current)
+        percent = int(current * 100 / total)
+        if throttle.due(percent):
             status_text = f"⬆️ **Mengunggah (Pyrogram)...**\nFile: `{file_name}`\nProgres: `{percent}%` ({current/1024/1024/1024:.2f}GB / {total/1024/1024/1024:.2f}GB)"
             edit_telegram_message(getattr(progress_callback, 'message_id', None), status_text)
-            progress_callback.last_percent = percent
-        
-        # Jaga agar Pyrogram tidak spam log
-        time.sleep(1)
 
     try:
         app.start()
@@ -84,16 +297,36 @@ def upload_large_file_with_pyrogram(file_path):
         
         print(f"Mulai unggah {file_name} ke chat ID: {owner_id}")
         
-        # Mulai unggah file
-        app.send_document(
-            chat_id=owner_id,
-            document=file_path,
-            caption=f"✅ **{file_name}** (Unggahan 4GB) selesai!",
-            progress=progress_callback
-        )
+        caption = f"✅ **{file_name}** (Unggahan 4GB) selesai!"
+        started = time.time()
+        mode = "volumes" if file_size > TG_MAX_FILE_SIZE and TG_SPLIT_VOLUMES else "parallel" if file_size > TG_BIG_FILE_THRESHOLD else "single"
+        with get_telemetry().phase("telegram_upload", mode=mode, sessions=TG_UPLOAD_SESSIONS, workers=TG_UPLOAD_WORKERS) as span:
+            if file_size > TG_MAX_FILE_SIZE and TG_SPLIT_VOLUMES:
+                sent_messages = app.loop.run_until_complete(upload_volumes(app, owner_id, file_path, progress=progress_callback))
+                print(f"📦 {file_name} dikirim sebagai {len(sent_messages)} volume.")
+            elif file_size > TG_BIG_FILE_THRESHOLD:
+                # Part dikirim bersamaan lewat TG_UPLOAD_SESSIONS koneksi
+                input_file, _ = app.loop.run_until_complete(
+                    save_big_file_parallel(app, file_path, progress=progress_callback)
+                )
+                message = app.loop.run_until_complete(send_uploaded_document(app, owner_id, input_file, file_name, caption))
+                sent_messages = [(message, caption)]
+            else:
+                message = app.send_document(
+                    chat_id=owner_id,
+                    document=file_path,
+                    caption=caption,
+                    progress=progress_callback
+                )
+                sent_messages = [(message, caption)]
+            span.bytes = file_size
+        record_upload_result(file_path, sent_messages)
+        elapsed = max(time.time() - started, 1e-6)
+        throughput = f"{file_size / elapsed / 1024 / 1024:.2f} MB/s"
+        print(f"📊 Unggah Telegram selesai: {file_size/1024/1024:.1f} MB dalam {elapsed:.1f} detik ({throughput}, {TG_UPLOAD_SESSIONS} koneksi, {TG_UPLOAD_WORKERS} worker).")
         
         # Update final 100%
-        edit_telegram_message(message_id, f"🎉 **Unggahan Selesai!**\nFile: `{file_name}`\n")
+        edit_telegram_message(message_id, f"🎉 **Unggahan Selesai!**\nFile: `{file_name}`\nKecepatan rata-rata: `{throughput}`\n")
         app.stop()
         return True
         
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+from contextlib import contextmanager
+
+# =========================================================
+# KONFIGURASI TELEMETRI
+# =========================================================
+
+# File JSON Lines tujuan event (kosongkan untuk menonaktifkan sink file)
+TELEMETRY_FILE = os.environ.get("TELEMETRY_FILE", "telemetry.jsonl")
+# Satu ID untuk semua proses dalam satu run workflow (main.py, upload.py, telegram_upload.py)
+TELEMETRY_RUN_ID = os.environ.get("TELEMETRY_RUN_ID") or os.environ.get("GITHUB_RUN_ID") or uuid.uuid4().hex[:12]
+# Jeda minimum antar event 'progress' untuk satu transfer (detik)
+TELEMETRY_PROGRESS_INTERVAL = float(os.environ.get("TELEMETRY_PROGRESS_INTERVAL", "5"))
+
+class JsonlSink:
+    """Sink default: satu event JSON per baris, di-append ke file (aman dipakai banyak thread)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class PhaseSpan:
+    """Handle satu fase yang sedang berjalan: isi bytes/fields, atau fail() jika fase gagal tanpa exception."""
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = None
+        self.fields = {}
+        self.error = None
+
+    def fail(self, reason):
+        self.error = str(reason)[:200]
+
+class TransferMeter:
+    """Mengirim event 'progress' (byte, laju sesaat, laju rata-rata) paling sering tiap TELEMETRY_PROGRESS_INTERVAL detik."""
+
+    def __init__(self, telemetry, phase, total=None, interval=TELEMETRY_PROGRESS_INTERVAL):
+        self.telemetry = telemetry
+        self.phase = phase
+        self.total = total
+        self.interval = interval
+        self.started_at = self.last_time = time.time()
+        self.last_bytes = 0
+
+    def update(self, done):
+        now = time.time()
+        finished = bool(self.total) and done >= self.total
+        if (finished and done == self.last_bytes) or (not finished and now - self.last_time < self.interval):
+            return
+        self.telemetry.emit(
+            "progress", phase=self.phase, bytes=done, total=self.total,
+            rate=round((done - self.last_bytes) / max(now - self.last_time, 1e-6)),
+            average_rate=round(done / max(now - self.started_at, 1e-6)),
+        )
+        self.last_time, self.last_bytes = now, done
+
+# =========================================================
+# PENGUMPUL EVENT
+# =========================================================
+
+class Telemetry:
+    """
+    Event terstruktur per fase (phase_start/phase_end, progress, retry) yang dikirim ke
+    sink yang bisa diganti, plus ringkasan per fase yang dicetak saat proses selesai.
+    Konteks per thread (mis. URL job pada mode batch) ikut di setiap event.
+    """
+
+    def __init__(self, run_id=TELEMETRY_RUN_ID):
+        self.run_id = run_id
+        self._sinks = []
+        self._lock = threading.Lock()
+        self._context = threading.local()
+        self._stats = {}
+
+    def add_sink(self, sink):
+        """Menambah sink: callable yang menerima dict event."""
+        self._sinks.append(sink)
+
+    def set_context(self, **fields):
+        """Field yang ditambahkan ke semua event dari thread ini."""
+        self._context.fields = {**getattr(self._context, "fields", {}), **fields}
+
+    def emit(self, event, **fields):
+        record = {"ts": round(time.time(), 3), "run": self.run_id, "pid": os.getpid(), "event": event,
+                  **getattr(self._context, "fields", {}), **fields}
+        for sink in list(self._sinks):
+            try:
+                sink(record)
+            except Exception as e:
+                print(f"⚠️ Sink telemetri gagal: {e}")
+
+    def _stat(self, name):
+        return self._stats.setdefault(name, {"count": 0, "errors": 0, "retries": 0, "seconds": 0.0, "bytes": 0})
+
+    @contextmanager
+    def phase(self, name, **fields):
+        """Mengukur satu fase: `with telemetry.phase("download", engine="native") as span: ...`."""
+        span = PhaseSpan(name)
+        self.emit("phase_start", phase=name, **fields)
+        started = time.time()
+        try:
+            yield span
+        except BaseException as e:
+            if not (isinstance(e, SystemExit) and not e.code):
+                span.fail(str(e) or type(e).__name__)
+            raise
+        finally:
+            elapsed = time.time() - started
+            result = {**fields, **span.fields, "seconds": round(elapsed, 3),
+                      "status": "error" if span.error else "ok"}
+            if span.error:
+                result["error"] = span.error
+            if span.bytes is not None:
+                result.update(bytes=span.bytes, average_rate=round(span.bytes / max(elapsed, 1e-6)))
+            self.emit("phase_end", phase=name, **result)
+            with self._lock:
+                stat = self._stat(name)
+                stat["count"] += 1
+                stat["errors"] += 1 if span.error else 0
+                stat["seconds"] += elapsed
+                stat["bytes"] += span.bytes or 0
+
+    def retry(self, phase, attempt, error, **fields):
+        self.emit("retry", phase=phase, attempt=attempt, error=str(error)[:200], **fields)
+        with self._lock:
+            self._stat(phase)["retries"] += 1
+
+    def transfer(self, phase, total=None):
+        return TransferMeter(self, phase, total)
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def report(self):
+        """Ringkasan per fase saat proses selesai (dicetak dan dikirim sebagai event 'summary')."""
+        summary = self.summary()
+        if not summary:
+            return
+        self.emit("summary", phases={name: dict(stat, seconds=round(stat["seconds"], 3)) for name, stat in summary.items()})
+        print("⏱️ Ringkasan fase:")
+        for name, stat in sorted(summary.items(), key=lambda item: -item[1]["seconds"]):
+            line = f"   {name}: {stat['count']}x, {stat['seconds']:.2f} detik"
+            if stat["bytes"]:
+                line += f", {stat['bytes'] / 1024 / 1024:.1f} MB ({stat['bytes'] / 1024 / 1024 / max(stat['seconds'], 1e-6):.2f} MB/s)"
+            if stat["retries"] or stat["errors"]:
+                line += f", retry {stat['retries']}, gagal {stat['errors']}"
+            print(line)
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry():
+    """Mengembalikan pengumpul telemetri bersama untuk proses ini (sink file dari TELEMETRY_FILE)."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            if TELEMETRY_FILE:
+                _telemetry.add_sink(JsonlSink(TELEMETRY_FILE))
+            atexit.register(_telemetry.report)
+        return _telemetry
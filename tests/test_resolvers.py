@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resolvers import parse_mediafire_html, parse_gofile_contents, resolve_gofile, ResolverError
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f) if name.endswith(".json") else f.read()
+
+# =========================================================
+# MEDIAFIRE
+# =========================================================
+
+class ParseMediafireHtmlTest(unittest.TestCase):
+    PAGE_URL = "https://www.mediafire.com/file/k4l9qz8x1m2n3o4/sample_video.mp4/file"
+
+    def test_download_button(self):
+        result = parse_mediafire_html(load_fixture("mediafire_download_button.html"), self.PAGE_URL)
+        self.assertEqual(result, {
+            'url': "https://download2392.mediafire.com/abc123xyz/k4l9qz8x1m2n3o4/sample_video.mp4",
+            'filename': "sample_video.mp4",
+        })
+
+    def test_scrambled_url(self):
+        result = parse_mediafire_html(load_fixture("mediafire_scrambled_url.html"), self.PAGE_URL)
+        self.assertEqual(result['url'], "https://download1500.mediafire.com/scrambled/a1b2c3d4/Archive%20Part%201.zip")
+        self.assertEqual(result['filename'], "Archive Part 1.zip")
+
+    def test_form_step(self):
+        result = parse_mediafire_html(load_fixture("mediafire_form_step.html"), self.PAGE_URL)
+        self.assertEqual(result, {'form': {
+            'action': "https://www.mediafire.com/file/k4l9qz8x1m2n3o4/sample_video.mp4/file",
+            'method': "POST",
+            'data': {'dkey': "7fq2m9w1", 'quickkey': "k4l9qz8x1m2n3o4"},
+        }})
+
+    def test_no_button(self):
+        with self.assertRaises(ResolverError):
+            parse_mediafire_html(load_fixture("mediafire_no_button.html"), self.PAGE_URL)
+
+# =========================================================
+# GOFILE
+# =========================================================
+
+class ParseGofileContentsTest(unittest.TestCase):
+    def test_folder_largest_first(self):
+        files = parse_gofile_contents(load_fixture("gofile_folder_contents.json"))
+        self.assertEqual([item['name'] for item in files], ["movie.mkv", "readme.txt"])
+        self.assertEqual(files[0]['size'], 734003200)
+        self.assertEqual(files[0]['link'], "https://store3.gofile.io/download/web/f0000002/movie.mkv")
+
+    def test_single_file(self):
+        files = parse_gofile_contents(load_fixture("gofile_single_file.json"))
+        self.assertEqual(files, [{
+            'name': "single.zip",
+            'link': "https://store7.gofile.io/download/web/f0000009/single.zip",
+            'size': 52428800,
+        }])
+
+    def test_error_status(self):
+        with self.assertRaises(ResolverError):
+            parse_gofile_contents(load_fixture("gofile_not_found.json"))
+
+    def test_folder_without_files(self):
+        payload = {'status': 'ok', 'data': {'type': 'folder', 'children': {}}}
+        with self.assertRaises(ResolverError):
+            parse_gofile_contents(payload)
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+class _FakeSession:
+    """Session pengganti: tanpa atribut cookies, sehingga resolver yang memasangnya akan gagal."""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.requests = []
+
+    def post(self, url, **kwargs):
+        self.requests.append(("POST", url, kwargs))
+        return _FakeResponse({'status': 'ok', 'data': {'token': "guest-token"}})
+
+    def get(self, url, **kwargs):
+        self.requests.append(("GET", url, kwargs))
+        return _FakeResponse(self.contents)
+
+class ResolveGofileTest(unittest.TestCase):
+    def test_token_returned_as_request_header(self):
+        session = _FakeSession(load_fixture("gofile_folder_contents.json"))
+        result = resolve_gofile(session, "https://gofile.io/d/AbCd12")
+        self.assertEqual(result['urls'], ["https://store3.gofile.io/download/web/f0000002/movie.mkv"])
+        self.assertEqual(result['filename'], "movie.mkv")
+        self.assertEqual(result['size'], 734003200)
+        self.assertEqual(result['headers'], {'Cookie': "accountToken=guest-token"})
+        self.assertEqual(session.requests[1][2]['headers'], {'Authorization': "Bearer guest-token"})
+
+    def test_invalid_url(self):
+        with self.assertRaises(ResolverError):
+            resolve_gofile(_FakeSession({}), "https://gofile.io/x/AbCd12")
+
+if __name__ == "__main__":
+    unittest.main()
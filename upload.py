@@ -3,14 +3,23 @@ import sys
 import time
 import mimetypes
 import hashlib
-import requests
+import json
 import math
+import fcntl
+import weakref
+import calendar
+import datetime
+import threading
+import random
 from oauth2client.client import OAuth2Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, MediaUpload
 from httplib2 import Http
 from googleapiclient.errors import HttpError
 from googleapiclient.errors import ResumableUploadError
+from notifier import get_notifier, ProgressThrottle
+from result_store import get_result_store
+from telemetry import get_telemetry
 
 # =========================================================
 # KONSTANTA & KONFIGURASI
@@ -22,36 +31,52 @@ REFRESH_TOKEN = os.environ.get('DRIVE_REFRESH_TOKEN')
 CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
 CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
 DRIVE_UPLOAD_FOLDER_NAME = "my-drive-upload"
+FILEINFO_MARKER = "downloaded_fileinfo.json"
+MD5_READ_SIZE = 8 * 1024 * 1024
+# Mode pipeline (DRIVE_STREAM=1): ukuran chunk (kelipatan 256 KiB) dan jumlah slot ring buffer
+DRIVE_STREAM_CHUNK_SIZE = int(os.environ.get("DRIVE_STREAM_CHUNK_SIZE", str(8 * 1024 * 1024)))
+DRIVE_STREAM_RING_SLOTS = int(os.environ.get("DRIVE_STREAM_RING_SLOTS", "8"))
+# Chunk adaptif upload resumable: ukuran awal/min/maks (kelipatan 256 KiB) dan target durasi per chunk
+DRIVE_CHUNK_UNIT = 256 * 1024
+DRIVE_CHUNK_SIZE = int(os.environ.get("DRIVE_CHUNK_SIZE", str(16 * 1024 * 1024)))
+DRIVE_CHUNK_MIN = int(os.environ.get("DRIVE_CHUNK_MIN", str(1024 * 1024)))
+DRIVE_CHUNK_MAX = int(os.environ.get("DRIVE_CHUNK_MAX", str(256 * 1024 * 1024)))
+DRIVE_CHUNK_TARGET_SECONDS = float(os.environ.get("DRIVE_CHUNK_TARGET_SECONDS", "8"))
+DRIVE_UPLOAD_MAX_RETRIES = 5
+# Checkpoint sesi resumable (URI sesi + offset terkonfirmasi) agar upload bisa dilanjutkan setelah restart.
+# URI sesi memberi akses upload tanpa kredensial lain: file ini dikecualikan dari Actions cache
+CACHE_DIR = os.environ.get("SONTO_CACHE_DIR", ".cache")
+UPLOAD_STATE_FILE = os.path.join(CACHE_DIR, "drive_upload_state.json")
+# URI sesi resumable Drive berlaku sekitar satu minggu
+UPLOAD_STATE_TTL = 6 * 24 * 60 * 60
+# Cache ID folder Drive per akun (nama + parent -> ID)
+FOLDER_CACHE_FILE = os.path.join(CACHE_DIR, "drive_folders.json")
+# Cache access token per refresh token (hash akun -> token + waktu kedaluwarsa), dipakai bersama antar proses
+# dalam satu mesin/run; dikecualikan dari Actions cache (lihat .github/workflows/main.yml)
+ACCESS_TOKEN_CACHE_FILE = os.path.join(CACHE_DIR, "drive_tokens.json")
+# Token di-refresh sekian detik sebelum kedaluwarsa (di background untuk proses yang masih berjalan)
+ACCESS_TOKEN_REFRESH_AHEAD = int(os.environ.get("DRIVE_TOKEN_REFRESH_AHEAD", "300"))
+GOOGLE_TOKEN_URI = 'https://oauth2.googleapis.com/token'
 
 # =========================================================
 # FUNGSI BANTUAN TELEGRAM & UMUM
 # =========================================================
 
 def send_telegram_message(message_text):
-    """Fungsi untuk mengirim pesan ke Telegram dan mengembalikan message_id."""
-    if not BOT_TOKEN or not OWNER_ID:
+    """Menjadwalkan pesan Telegram (non-blocking) dan mengembalikan handle PendingMessage."""
+    notifier = get_notifier(BOT_TOKEN)
+    if not notifier or not OWNER_ID:
         print("Peringatan: BOT_TOKEN atau OWNER_ID tidak diatur. Notifikasi Telegram dinonaktifkan.")
         return None
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": OWNER_ID, "text": message_text, "parse_mode": "Markdown"}
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        return response.json().get('result', {}).get('message_id')
-    except Exception as e:
-        print(f"Gagal mengirim pesan Telegram: {e}")
-        return None
+    return notifier.send(OWNER_ID, message_text)
 
 def edit_telegram_message(message_id, message_text):
-    """Fungsi untuk mengedit pesan yang sudah ada di Telegram."""
-    if not BOT_TOKEN or not OWNER_ID or not message_id:
+    """Menjadwalkan edit pesan; edit beruntun ke pesan yang sama digabung oleh notifier."""
+    notifier = get_notifier(BOT_TOKEN)
+    if not notifier or not OWNER_ID or not message_id:
         # Menghilangkan pesan error agar tidak terlalu berisik
         return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/editMessageText"
-    payload = {"chat_id": OWNER_ID, "message_id": message_id, "text": message_text, "parse_mode": "Markdown"}
-    try:
-        requests.post(url, json=payload, timeout=10)
-    except Exception as e:
-        print(f"Gagal mengedit pesan Telegram: {e}")
+    notifier.edit(OWNER_ID, message_id, message_text)
 
 def human_readable_size(size_bytes):
     if size_bytes is None or size_bytes == 0: return "0B"
@@ -62,170 +87,525 @@ def human_readable_size(size_bytes):
     return f"{s} {size_name[i]}"
 
 def send_upload_progress(message_id, filename, uploaded_size, total_size):
-    """Fungsi untuk mengirim progress upload ke Telegram (2x Update Logic)."""
+    """Fungsi untuk mengirim progress upload ke Telegram."""
     percent = int((uploaded_size/total_size)*100) if total_size else 0
     text = f"⏫ Uploading `{filename}` — {percent}% ({human_readable_size(uploaded_size)}/{human_readable_size(total_size)})"
     edit_telegram_message(message_id, text)
 
 def calculate_md5(file_path):
-    """Menghitung MD5 checksum dari file lokal."""
+    """Menghitung MD5 checksum dari file lokal (pembacaan besar ke satu buffer yang dipakai ulang)."""
     hash_md5 = hashlib.md5()
+    buffer = bytearray(MD5_READ_SIZE)
+    view = memoryview(buffer)
     try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
+        with open(file_path, "rb", buffering=0) as f:
+            while True:
+                nbytes = f.readinto(buffer)
+                if not nbytes:
+                    break
+                hash_md5.update(view[:nbytes])
         return hash_md5.hexdigest()
     except Exception as e:
         print(f"❌ Gagal menghitung MD5 checksum: {e}")
         return None
 
+def load_file_info(file_path):
+    """
+    Membaca info file (MD5, ukuran, MIME) yang dicatat DownloaderBot di FILEINFO_MARKER.
+    Hanya dipakai jika ukuran dan mtime masih cocok dengan file di disk.
+    """
+    try:
+        with open(FILEINFO_MARKER, "r") as f:
+            file_info = json.load(f)
+        stat = os.stat(file_path)
+        if file_info.get('filename') != file_path or file_info.get('size') != stat.st_size \
+                or file_info.get('mtime_ns') != stat.st_mtime_ns:
+            return None
+        return file_info
+    except (OSError, ValueError):
+        return None
+
+# =========================================================
+# CHECKPOINT SESI UPLOAD RESUMABLE
+# =========================================================
+
+class UploadSessionExpired(Exception):
+    """URI sesi resumable yang disimpan sudah tidak dikenali Drive (404/410)."""
+
+def _load_json_file(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _update_json_file(path, update, description):
+    """
+    Load-ubah-tulis file JSON di bawah flock (path.lock) agar proses lain yang menulis
+    file yang sama tidak saling menimpa entri. update(data) mengubah dict di tempat dan
+    mengembalikan True jika ada perubahan; file ditulis lewat file sementara + os.replace.
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            data = _load_json_file(path)
+            if not update(data):
+                return
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Peringatan: gagal menyimpan {description}: {e}")
+
+def _load_upload_states():
+    return _load_json_file(UPLOAD_STATE_FILE)
+
+def _upload_state_key(file_path, size):
+    return f"{os.path.abspath(file_path)}:{size}"
+
+def load_upload_state(file_path, size, md5, mtime_ns):
+    """
+    Mengembalikan checkpoint sesi upload untuk file ini, atau None. File dianggap sama
+    jika path dan ukurannya cocok serta MD5 cocok (atau mtime, jika MD5 tidak tersimpan),
+    sehingga file yang diunduh ulang dengan isi identik tetap bisa melanjutkan sesi.
+    """
+    state = _load_upload_states().get(_upload_state_key(file_path, size))
+    if not state or time.time() - state.get('updated_at', 0) > UPLOAD_STATE_TTL:
+        return None
+    if state.get('md5') and md5:
+        return state if state['md5'] == md5 else None
+    return state if state.get('mtime_ns') == mtime_ns else None
+
+def save_upload_state(file_path, size, md5, mtime_ns, session_uri, offset):
+    now = time.time()
+
+    def update(states):
+        # Buang checkpoint kedaluwarsa sekalian agar file state tetap kecil
+        for key in [key for key, value in states.items() if now - value.get('updated_at', 0) > UPLOAD_STATE_TTL]:
+            del states[key]
+        states[_upload_state_key(file_path, size)] = {
+            'path': file_path, 'size': size, 'md5': md5, 'mtime_ns': mtime_ns,
+            'session_uri': session_uri, 'offset': offset, 'updated_at': now,
+        }
+        return True
+    _update_json_file(UPLOAD_STATE_FILE, update, "checkpoint upload")
+
+def clear_upload_state(file_path, size):
+    _update_json_file(UPLOAD_STATE_FILE,
+                      lambda states: states.pop(_upload_state_key(file_path, size), None) is not None,
+                      "checkpoint upload")
+
 # =========================================================
 # FUNGSI DRIVE OTENTIKASI & BANTUAN
 # =========================================================
 
-def authenticate_google_drive():
-    """Mengurus otentikasi Google Drive, me-refresh token, dan mengembalikan service objek."""
-    credentials = OAuth2Credentials(
-        access_token=None, client_id=CLIENT_ID, client_secret=CLIENT_SECRET,
-        refresh_token=REFRESH_TOKEN, token_expiry=None,
-        token_uri='https://oauth2.googleapis.com/token',
+def _token_account(refresh_token):
+    """Kunci akun untuk cache access token: hash refresh token (token asli tidak disimpan)."""
+    return hashlib.sha256((refresh_token or "").encode()).hexdigest()[:16]
+
+def _build_credentials(refresh_token, access_token=None, expires_at=None):
+    return OAuth2Credentials(
+        access_token=access_token, client_id=CLIENT_ID, client_secret=CLIENT_SECRET,
+        refresh_token=refresh_token,
+        token_expiry=datetime.datetime.utcfromtimestamp(expires_at) if expires_at else None,
+        token_uri=GOOGLE_TOKEN_URI,
         user_agent='GH-Actions-DriveUploader'
     )
-    print("⚡ Memperbarui Access Token menggunakan Refresh Token...")
-    http_pool = Http()
-    try:
-        credentials.refresh(http=http_pool)
-    except Exception as e:
-        error_msg = f"❌ Gagal memperbarui token. Token tidak valid: {e}"
-        print(error_msg)
-        send_telegram_message(f"❌ **Upload GAGAL!**\n\n{error_msg[:150]}...")
-        sys.exit(1)
-    
-    http_auth = credentials.authorize(http_pool)
-    drive_service = build('drive', 'v3', http=http_auth)
+
+class AccessTokenCache:
+    """
+    Access token Drive per refresh token, disimpan di disk bersama waktu kedaluwarsanya.
+    Refresh ke oauth2.googleapis.com hanya terjadi jika token tersisa kurang dari
+    ACCESS_TOKEN_REFRESH_AHEAD; lock file membuat job bersamaan (thread atau proses lain)
+    untuk akun yang sama menunggu satu refresh saja. Selama proses berjalan, timer
+    me-refresh token di background sebelum kedaluwarsa dan memperbarui semua credentials
+    yang sudah dibagikan, sehingga upload panjang tidak terkena 401 di tengah chunk.
+    """
+
+    def __init__(self, path=ACCESS_TOKEN_CACHE_FILE, refresh_ahead=ACCESS_TOKEN_REFRESH_AHEAD):
+        self.path = path
+        self.refresh_ahead = refresh_ahead
+        self._lock = threading.Lock()
+        self._live = {}
+        self._timers = {}
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def _fresh(self, entry):
+        return bool(entry) and entry["expires_at"] - time.time() > self.refresh_ahead
+
+    def _refresh_delay(self, expires_at):
+        """Detik sampai token masuk jendela refresh-ahead (saat itu _fresh() sudah False)."""
+        return max(expires_at - time.time() - self.refresh_ahead + 1, 1)
+
+    def _refresh(self, refresh_token, account):
+        """Refresh di bawah lock antar proses; token yang baru saja di-refresh proses lain langsung dipakai."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                entries = self._load()
+                entry = entries.get(account)
+                if self._fresh(entry):
+                    return entry
+                credentials = _build_credentials(refresh_token)
+                credentials.refresh(Http())
+                entry = {"access_token": credentials.access_token,
+                         "expires_at": calendar.timegm(credentials.token_expiry.timetuple())}
+                entries = {key: value for key, value in entries.items() if value["expires_at"] > time.time()}
+                entries[account] = entry
+                try:
+                    self._save(entries)
+                except OSError as e:
+                    print(f"Peringatan: gagal menyimpan cache access token Drive: {e}")
+                return entry
+
+    def credentials(self, refresh_token):
+        """
+        Credentials siap pakai untuk refresh token ini. Hasil: (credentials, True jika dari cache).
+        Exception refresh diteruskan ke pemanggil.
+        """
+        account = _token_account(refresh_token)
+        entry = self._load().get(account)
+        cached = self._fresh(entry)
+        if not cached:
+            entry = self._refresh(refresh_token, account)
+        credentials = _build_credentials(refresh_token, entry["access_token"], entry["expires_at"])
+        with self._lock:
+            self._live.setdefault(account, weakref.WeakSet()).add(credentials)
+        self._schedule(refresh_token, account, entry["expires_at"])
+        return credentials, cached
+
+    def _schedule(self, refresh_token, account, expires_at, delay=None):
+        with self._lock:
+            timer = self._timers.get(account)
+            if timer is not None and timer.is_alive() and delay is None:
+                return
+            if delay is None:
+                delay = self._refresh_delay(expires_at)
+            timer = threading.Timer(delay, self._refresh_ahead, args=(refresh_token, account))
+            timer.daemon = True
+            self._timers[account] = timer
+            timer.start()
+
+    def _refresh_ahead(self, refresh_token, account):
+        with self._lock:
+            if not self._live.get(account):
+                # Tidak ada lagi credentials yang dipakai untuk akun ini: berhenti, dijadwalkan lagi oleh credentials()
+                self._live.pop(account, None)
+                self._timers.pop(account, None)
+                return
+        try:
+            entry = self._refresh(refresh_token, account)
+        except Exception as e:
+            # Credentials lama tetap dipakai; oauth2client masih me-refresh sendiri jika mendapat 401
+            print(f"⚠️ Refresh access token Drive di background gagal ({e}). Dicoba lagi sebentar lagi.")
+            self._schedule(refresh_token, account, None, delay=60)
+            return
+        with self._lock:
+            live = list(self._live.get(account, ()))
+        expiry = datetime.datetime.utcfromtimestamp(entry["expires_at"])
+        for credentials in live:
+            credentials.access_token = entry["access_token"]
+            credentials.token_expiry = expiry
+        get_telemetry().emit("drive_token_refresh", account=account, expires_at=entry["expires_at"])
+        self._schedule(refresh_token, account, entry["expires_at"], delay=self._refresh_delay(entry["expires_at"]))
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+def get_access_token_cache():
+    """Mengembalikan cache access token bersama untuk proses ini."""
+    global _token_cache
+    with _token_cache_lock:
+        if _token_cache is None:
+            _token_cache = AccessTokenCache()
+        return _token_cache
+
+def authenticate_google_drive():
+    """Mengurus otentikasi Google Drive (access token dari cache atau refresh) dan mengembalikan service objek."""
+    with get_telemetry().phase("drive_auth") as span:
+        try:
+            credentials, cached = get_access_token_cache().credentials(REFRESH_TOKEN)
+        except Exception as e:
+            error_msg = f"❌ Gagal memperbarui token. Token tidak valid: {e}"
+            print(error_msg)
+            send_telegram_message(f"❌ **Upload GAGAL!**\n\n{error_msg[:150]}...")
+            sys.exit(1)
+        span.fields.update(cached=cached)
+        print("⚡ Access Token dari cache." if cached else "⚡ Access Token diperbarui menggunakan Refresh Token.")
+
+        http_auth = credentials.authorize(Http())
+        drive_service = build('drive', 'v3', http=http_auth)
     print("✅ Autentikasi Drive berhasil. Siap upload!")
     return drive_service
 
+class DriveFolderMissing(Exception):
+    """Folder tujuan (dari cache) tidak ditemukan Drive saat upload dimulai (404)."""
+
+def _folder_cache_account():
+    """Kunci akun untuk cache folder: sama dengan kunci cache access token."""
+    return _token_account(REFRESH_TOKEN)
+
+def _folder_cache_key(folder_name, parent_id):
+    return f"{parent_id or 'root'}/{folder_name}"
+
+def _load_folder_cache():
+    return _load_json_file(FOLDER_CACHE_FILE)
+
+def invalidate_folder_cache(folder_name, parent_id=None):
+    key = _folder_cache_key(folder_name, parent_id)
+    _update_json_file(FOLDER_CACHE_FILE,
+                      lambda cache: cache.get(_folder_cache_account(), {}).pop(key, None) is not None,
+                      "cache folder Drive")
+
 def get_or_create_folder(service, folder_name, parent_id=None):
-    """Mencari ID folder di Drive, jika tidak ada, membuatnya."""
+    """
+    Mencari ID folder di Drive, jika tidak ada, membuatnya. ID disimpan di cache per akun
+    dan dipakai tanpa dicek ulang; cache baru di-refresh jika Drive membalas 404.
+    """
+    cache = _load_folder_cache()
+    cached_id = cache.get(_folder_cache_account(), {}).get(_folder_cache_key(folder_name, parent_id))
+    if cached_id:
+        return cached_id
+
     query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
     if parent_id:
         query += f" and '{parent_id}' in parents"
     try:
         response = service.files().list(q=query, fields='files(id)').execute()
         files = response.get('files', [])
-        if files: return files[0].get('id')
-        
-        file_metadata = {'name': folder_name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id] if parent_id else []}
-        file = service.files().create(body=file_metadata, fields='id').execute()
-        return file.get('id')
+        if files:
+            folder_id = files[0].get('id')
+        else:
+            file_metadata = {'name': folder_name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id] if parent_id else []}
+            file = service.files().create(body=file_metadata, fields='id').execute()
+            folder_id = file.get('id')
     except HttpError as e:
         print(f"❌ Gagal mengakses/membuat folder: {e}")
         sys.exit(1)
 
-def make_file_public(service, file_id):
-    """Menetapkan izin agar file dapat diakses publik."""
+    def update(cache):
+        cache.setdefault(_folder_cache_account(), {})[_folder_cache_key(folder_name, parent_id)] = folder_id
+        return True
+    _update_json_file(FOLDER_CACHE_FILE, update, "cache folder Drive")
+    return folder_id
+
+def make_file_public(service, file_id, view_link, content_link):
+    """
+    Menetapkan izin publik file. Link sudah diminta di respons files().create (fields=),
+    jadi cukup satu request permissions().create; link dikembalikan jika izin berhasil.
+    """
     print("🌍 Menetapkan izin file menjadi publik...")
     permission_body = {'type': 'anyone', 'role': 'reader'}
     try:
         service.permissions().create(fileId=file_id, body=permission_body, fields='id').execute()
-        file_info = service.files().get(fileId=file_id, fields='webViewLink,webContentLink').execute()
-        print("✅ File berhasil dijadikan publik!")
-        return file_info.get("webViewLink"), file_info.get("webContentLink")
     except HttpError as e:
         print(f"❌ Gagal mengatur izin file menjadi publik: {e}")
         return None, None
+    print("✅ File berhasil dijadikan publik!")
+    return view_link, content_link
 
 # =========================================================
-# FUNGSI UTAMA UPLOAD (LOGIKA PROGRES 2X UPDATE)
+# UKURAN CHUNK ADAPTIF
 # =========================================================
 
-def upload_file_to_drive(drive_service, downloaded_file):
-    """Mengurus Resumable Upload dan Verifikasi MD5."""
-    target_folder_id = get_or_create_folder(drive_service, DRIVE_UPLOAD_FOLDER_NAME)
-    
-    MIME_TYPE, _ = mimetypes.guess_type(downloaded_file)
-    if not MIME_TYPE: MIME_TYPE = 'application/octet-stream'
+def _round_chunk(size, minimum, maximum):
+    """Membulatkan ke kelipatan 256 KiB (syarat API Drive) di dalam batas [minimum, maximum]."""
+    size = max(minimum, min(maximum, int(size)))
+    return max(DRIVE_CHUNK_UNIT, size // DRIVE_CHUNK_UNIT * DRIVE_CHUNK_UNIT)
 
-    LOCAL_MD5 = calculate_md5(downloaded_file)
-    if not LOCAL_MD5:
-        raise Exception(f"Gagal menghitung MD5 lokal untuk {downloaded_file}.")
-        
-    file_metadata = {'name': downloaded_file, 'parents': [target_folder_id]}
-    media = MediaFileUpload(downloaded_file, mimetype=MIME_TYPE, resumable=True)
-    request = drive_service.files().create(body=file_metadata, media_body=media, fields='id,webViewLink,webContentLink,md5Checksum')
+class AdaptiveChunkSizer:
+    """
+    Mengukur throughput tiap chunk lalu menyesuaikan ukuran chunk agar satu
+    chunk memakan kira-kira DRIVE_CHUNK_TARGET_SECONDS: chunk kecil di link cepat
+    didominasi RTT per request, chunk besar membuat kegagalan mahal untuk diulang.
+    Setelah error ukuran chunk dipotong setengah sehingga data yang dikirim ulang lebih sedikit.
+    """
+
+    def __init__(self, initial=DRIVE_CHUNK_SIZE, minimum=DRIVE_CHUNK_MIN, maximum=DRIVE_CHUNK_MAX,
+                 target_seconds=DRIVE_CHUNK_TARGET_SECONDS):
+        self.minimum = _round_chunk(minimum, DRIVE_CHUNK_UNIT, maximum)
+        self.maximum = _round_chunk(maximum, self.minimum, maximum)
+        self.target_seconds = target_seconds
+        self.size = _round_chunk(initial, self.minimum, self.maximum)
+        self.history = [self.size]
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+
+    def _set(self, size):
+        size = _round_chunk(size, self.minimum, self.maximum)
+        if size != self.size:
+            self.size = size
+            self.history.append(size)
+
+    def record_success(self, sent_bytes, seconds):
+        """Mencatat chunk yang dikonfirmasi Drive dan menghitung ukuran chunk berikutnya."""
+        if sent_bytes <= 0 or seconds <= 0:
+            return
+        self.total_bytes += sent_bytes
+        self.total_seconds += seconds
+        throughput = sent_bytes / seconds
+        # Naik paling banyak 2x per langkah agar lonjakan sesaat tidak langsung memilih chunk raksasa
+        self._set(min(throughput * self.target_seconds, self.size * 2))
+
+    def record_failure(self):
+        self._set(self.size // 2)
 
-    message_id = send_telegram_message(f"🚀 Mulai upload file `{downloaded_file}` ke Google Drive...")
-    last_notified_percent = 0 # 0 -> 50 -> 100
+    def average_speed(self):
+        return self.total_bytes / self.total_seconds if self.total_seconds else 0
+
+    def summary(self):
+        sizes = " → ".join(human_readable_size(size) for size in self.history)
+        return f"chunk {sizes}, rata-rata {human_readable_size(self.average_speed())}/s"
+
+class DriveFileUpload(MediaFileUpload):
+    """MediaFileUpload dengan ukuran chunk yang bisa diubah di antara next_chunk (lihat AdaptiveChunkSizer)."""
+
+    def __init__(self, filename, chunksize, **kwargs):
+        super().__init__(filename, chunksize=chunksize, **kwargs)
+        self._adaptive_chunksize = chunksize
+
+    def chunksize(self):
+        return self._adaptive_chunksize
+
+    def set_chunksize(self, size):
+        self._adaptive_chunksize = size
+
+# =========================================================
+# FUNGSI UTAMA UPLOAD
+# =========================================================
+
+def _execute_resumable_upload(request, display_name, total_size, checkpoint=None):
+    """
+    Menjalankan loop next_chunk dengan ukuran chunk adaptif, retry dengan backoff
+    eksponensial, dan notifikasi progres; mengembalikan response Drive.
+    checkpoint(session_uri, offset) dipanggil setelah setiap chunk yang dikonfirmasi.
+    """
+    message_id = send_telegram_message(f"🚀 Mulai upload file `{display_name}` ke Google Drive...")
+    throttle = ProgressThrottle()
+    media = request.resumable
+    sizer = AdaptiveChunkSizer(
+        initial=media.chunksize(),
+        maximum=min(DRIVE_CHUNK_MAX, getattr(media, 'max_chunksize', DRIVE_CHUNK_MAX)),
+    )
     response = None
-    total_size = os.path.getsize(downloaded_file)
-    max_retries = 5
     retry_count = 0
+    telemetry = get_telemetry()
+    meter = telemetry.transfer("drive_upload", total_size)
     
-    print(f'🚀 Memulai upload Resumable untuk: {downloaded_file}...')
+    print(f'🚀 Memulai upload Resumable untuk: {display_name}...')
     
-    while response is None:
-        try:
-            status, response = request.next_chunk()
-            retry_count = 0 # Reset hitungan retry jika chunk berhasil
+    with telemetry.phase("drive_upload", resumed_from=request.resumable_progress or 0) as span:
+        while response is None:
+            media.set_chunksize(sizer.size)
+            confirmed_before = request.resumable_progress
+            started = time.time()
+            try:
+                status, response = request.next_chunk()
+                retry_count = 0 # Reset hitungan retry jika chunk berhasil
+                sent_bytes = (total_size if response is not None else request.resumable_progress) - confirmed_before
+                sizer.record_success(sent_bytes, time.time() - started)
+                if checkpoint and response is None and request.resumable_uri:
+                    checkpoint(request.resumable_uri, request.resumable_progress)
+                meter.update(total_size if response is not None else request.resumable_progress)
             
-            if status:
-                percent_uploaded = int(status.progress() * 100)
-                uploaded_size = int(status.progress() * total_size)
-
-                # LOGIKA 2X UPDATE: Hanya update pada 50% dan 100%
-                should_update_50 = (percent_uploaded >= 50 and last_notified_percent < 50)
-                should_update_100 = (percent_uploaded == 100)
-                
-                if should_update_50 or should_update_100:
-                    send_upload_progress(message_id, downloaded_file, uploaded_size, total_size)
-                    last_notified_percent = percent_uploaded
-                    print(f'      Uploaded {percent_uploaded}%')
+                if status:
+                    percent_uploaded = int(status.progress() * 100)
+                    uploaded_size = int(status.progress() * total_size)
+
+                    # Update tiap NOTIFY_PROGRESS_STEP persen / NOTIFY_PROGRESS_INTERVAL detik (non-blocking)
+                    if throttle.due(percent_uploaded):
+                        send_upload_progress(message_id, display_name, uploaded_size, total_size)
+                        print(f'      Uploaded {percent_uploaded}% (chunk {human_readable_size(sizer.size)}, {human_readable_size(sizer.average_speed())}/s)')
                     
-        except ResumableUploadError as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                raise Exception("Upload gagal setelah beberapa kali percobaan ulang.")
-            print(f"⚠️ Error Resumable Upload. Mencoba lagi dalam 10 detik. Percobaan ke-{retry_count}...")
-            time.sleep(10)
-        except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                raise Exception("Error tak terduga, gagal setelah beberapa kali percobaan ulang.")
-            print(f"❌ Error tak terduga saat upload. Mencoba lagi dalam 10 detik. Percobaan ke-{retry_count}...")
-            time.sleep(10)
+            except Exception as e:
+                if isinstance(e, HttpError) and e.resp.status == 404 and request.resumable_uri is None:
+                    # Sesi belum dibuat dan Drive tidak menemukan folder parent (mis. ID dari cache sudah dihapus)
+                    raise DriveFolderMissing(f"Folder tujuan tidak ditemukan (HTTP 404): {e}")
+                if isinstance(e, HttpError) and e.resp.status in (404, 410) and request._in_error_state:
+                    raise UploadSessionExpired(f"Sesi upload tidak lagi berlaku (HTTP {e.resp.status}).")
+                retry_count += 1
+                if retry_count >= DRIVE_UPLOAD_MAX_RETRIES:
+                    raise Exception(f"Upload gagal setelah {DRIVE_UPLOAD_MAX_RETRIES} kali percobaan ulang: {e}")
+                sizer.record_failure()
+                telemetry.retry("drive_upload", retry_count, e, chunk=sizer.size)
+                delay = min(2 ** retry_count, 60) + random.uniform(0, 1)
+                print(f"⚠️ Error saat upload chunk ({e}). Chunk diperkecil ke {human_readable_size(sizer.size)}, mencoba lagi dalam {delay:.1f} detik. Percobaan ke-{retry_count}...")
+                time.sleep(delay)
+        span.bytes = total_size
+        span.fields.update(final_chunk=sizer.size, chunk_rate=round(sizer.average_speed()))
 
     # Pastikan notifikasi 100% terkirim
-    if last_notified_percent < 100:
-        send_upload_progress(message_id, downloaded_file, total_size, total_size)
+    if throttle.due(100):
+        send_upload_progress(message_id, display_name, total_size, total_size)
+
+    print(f"📊 Upload Drive selesai: {sizer.summary()}")
+    return response
 
+def record_drive_result(source, display_name, view_link, content_link, file_id, md5):
+    """Mencatat hasil upload ke result store agar URL sumber yang sama bisa dijawab tanpa download ulang."""
+    if not source or not source.get('url'):
+        return
+    try:
+        get_result_store().put(
+            source['url'], "gdrive",
+            {'file_id': file_id, 'name': display_name, 'view_link': view_link, 'content_link': content_link},
+            size=source.get('size'), etag=source.get('etag'), md5=md5,
+        )
+    except Exception as e:
+        print(f"⚠️ Gagal mencatat hasil ke result store: {e}")
+
+def _finalize_drive_upload(drive_service, response, display_name, local_md5, source=None):
+    """
+    Memverifikasi MD5 hasil upload, menetapkan izin publik, dan mengirim notifikasi akhir.
+    source ({'url', 'size', 'etag'}) dipakai untuk mencatat hasil di result store.
+    """
     DRIVE_MD5 = response.get('md5Checksum')
     FILE_ID = response.get('id')
     WEB_VIEW_LINK = response.get("webViewLink")
     
-    if DRIVE_MD5 and LOCAL_MD5 and DRIVE_MD5.lower() == LOCAL_MD5.lower():
+    if DRIVE_MD5 and local_md5 and DRIVE_MD5.lower() == local_md5.lower():
         print("👍 VERIFIKASI BERHASIL. File UTUH.")
-        PUBLIC_VIEW_LINK, PUBLIC_CONTENT_LINK = make_file_public(drive_service, FILE_ID)
+        with get_telemetry().phase("drive_publish"):
+            PUBLIC_VIEW_LINK, PUBLIC_CONTENT_LINK = make_file_public(
+                drive_service, FILE_ID, WEB_VIEW_LINK, response.get("webContentLink"))
         
         final_link_view = PUBLIC_VIEW_LINK if PUBLIC_VIEW_LINK else WEB_VIEW_LINK
         final_link_content = PUBLIC_CONTENT_LINK if PUBLIC_CONTENT_LINK else "N/A (Link Download)"
         
         success_message = (
             f"🎉 **UPLOAD SUKSES!** 🎉\n\n"
-            f"File: `{downloaded_file}`\n"
+            f"File: `{display_name}`\n"
             f"Folder: `{DRIVE_UPLOAD_FOLDER_NAME}`\n"
-            f"MD5 Lokal: `{LOCAL_MD5}`\n"
+            f"MD5 Lokal: `{local_md5}`\n"
             f"**Status:** **PUBLIK (Dapat Diakses Siapa Saja)!**\n"
             f"Link Drive: [Lihat File]({final_link_view})\n"
             f"Link Download Langsung: `{final_link_content}`" 
         )
         send_telegram_message(success_message)
+        if PUBLIC_VIEW_LINK:
+            record_drive_result(source, display_name, PUBLIC_VIEW_LINK, PUBLIC_CONTENT_LINK, FILE_ID, local_md5)
         return True
     else:
         error_message = (
             f"🚨 **UPLOAD GAGAL (VERIFIKASI GAGAL)!**\n\n"
-            f"File: `{downloaded_file}`\n"
-            f"MD5 Lokal: `{LOCAL_MD5}`\n"
+            f"File: `{display_name}`\n"
+            f"MD5 Lokal: `{local_md5}`\n"
             f"MD5 Drive: `{DRIVE_MD5}`\n\n"
             f"Detail: File di Drive KORUP. Upload DIBATALKAN."
         )
@@ -233,6 +613,272 @@ def upload_file_to_drive(drive_service, downloaded_file):
         send_telegram_message(error_message)
         return False
 
+def upload_file_to_drive(drive_service, downloaded_file, file_info=None):
+    """
+    Mengurus Resumable Upload dan Verifikasi MD5. Jika file_info (dari engine download)
+    berisi MD5 dan MIME, nilai itu dipakai sehingga file tidak perlu di-hash ulang.
+    """
+    file_info = file_info or {}
+    
+    MIME_TYPE = file_info.get('mime_type') or mimetypes.guess_type(downloaded_file)[0]
+    if not MIME_TYPE: MIME_TYPE = 'application/octet-stream'
+
+    LOCAL_MD5 = file_info.get('md5')
+    if LOCAL_MD5:
+        print("⚡ MD5 lokal diambil dari engine download (tanpa membaca ulang file).")
+    else:
+        with get_telemetry().phase("md5") as span:
+            LOCAL_MD5 = calculate_md5(downloaded_file)
+            span.bytes = os.path.getsize(downloaded_file)
+    if not LOCAL_MD5:
+        raise Exception(f"Gagal menghitung MD5 lokal untuk {downloaded_file}.")
+        
+    stat = os.stat(downloaded_file)
+    total_size = stat.st_size
+
+    def checkpoint(session_uri, offset):
+        save_upload_state(downloaded_file, total_size, LOCAL_MD5, stat.st_mtime_ns, session_uri, offset)
+
+    def build_request():
+        target_folder_id = get_or_create_folder(drive_service, DRIVE_UPLOAD_FOLDER_NAME)
+        file_metadata = {'name': downloaded_file, 'parents': [target_folder_id]}
+        media = DriveFileUpload(downloaded_file, _round_chunk(DRIVE_CHUNK_SIZE, DRIVE_CHUNK_MIN, DRIVE_CHUNK_MAX), mimetype=MIME_TYPE, resumable=True)
+        return drive_service.files().create(body=file_metadata, media_body=media, fields='id,webViewLink,webContentLink,md5Checksum')
+
+    request = build_request()
+    state = load_upload_state(downloaded_file, total_size, LOCAL_MD5, stat.st_mtime_ns)
+    if state:
+        # Lanjutkan sesi lama: next_chunk pertama menanyakan offset terkonfirmasi (PUT bytes */size)
+        print(f"♻️ Melanjutkan sesi upload sebelumnya dari ~{human_readable_size(state['offset'])}.")
+        request.resumable_uri = state['session_uri']
+        request.resumable_progress = state['offset']
+        request._in_error_state = True
+
+    folder_refreshed = False
+    while True:
+        try:
+            response = _execute_resumable_upload(request, downloaded_file, total_size, checkpoint=checkpoint)
+            break
+        except UploadSessionExpired as e:
+            if not state:
+                raise
+            print(f"⚠️ {e} Memulai sesi upload baru dari awal.")
+            clear_upload_state(downloaded_file, total_size)
+            state = None
+        except DriveFolderMissing as e:
+            if folder_refreshed:
+                raise
+            print(f"♻️ {e} Cache folder di-refresh.")
+            invalidate_folder_cache(DRIVE_UPLOAD_FOLDER_NAME)
+            folder_refreshed = True
+        request = build_request()
+    clear_upload_state(downloaded_file, total_size)
+    source = {'url': file_info.get('source_url'), 'size': total_size, 'etag': file_info.get('etag')}
+    return _finalize_drive_upload(drive_service, response, downloaded_file, LOCAL_MD5, source)
+
+# =========================================================
+# MODE PIPELINE: DOWNLOAD LANGSUNG KE SESI RESUMABLE DRIVE
+# =========================================================
+
+class ChunkRing:
+    """
+    Ring buffer berisi beberapa chunk upload. Worker download menulis byte di offset
+    acak, uploader Drive membaca secara berurutan. Memori dibatasi jumlah slot:
+    penulis yang terlalu jauh di depan menunggu sampai Drive mengonfirmasi chunk lama.
+    MD5 dihitung berurutan saat setiap chunk lengkap.
+    """
+
+    def __init__(self, total_size, chunk_size=DRIVE_STREAM_CHUNK_SIZE, slots=DRIVE_STREAM_RING_SLOTS):
+        self.total_size = total_size
+        self.chunk_size = chunk_size
+        self.slots = max(slots, 2)
+        self._buffers = [bytearray(chunk_size) for _ in range(self.slots)]
+        self._filled = [0] * self.slots
+        self._base_chunk = 0    # chunk terendah yang masih disimpan di ring
+        self._hashed_chunk = 0  # chunk berikutnya yang akan di-hash
+        self._md5 = hashlib.md5()
+        self._error = None
+        self._cond = threading.Condition()
+
+    def _chunk_length(self, index):
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def _is_complete(self, index):
+        return self._filled[index % self.slots] >= self._chunk_length(index)
+
+    def write(self, data, offset):
+        """Menyalin data ke slot yang sesuai; blok jika offset berada di luar jendela ring."""
+        view = memoryview(data)
+        while view:
+            index = offset // self.chunk_size
+            inner = offset - index * self.chunk_size
+            length = min(len(view), self.chunk_size - inner)
+            with self._cond:
+                while index >= self._base_chunk + self.slots and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise self._error
+                slot = index % self.slots
+                self._buffers[slot][inner:inner + length] = view[:length]
+                self._filled[slot] += length
+                while self._hashed_chunk * self.chunk_size < self.total_size \
+                        and self._hashed_chunk < self._base_chunk + self.slots and self._is_complete(self._hashed_chunk):
+                    hashed_slot = self._hashed_chunk % self.slots
+                    self._md5.update(memoryview(self._buffers[hashed_slot])[:self._chunk_length(self._hashed_chunk)])
+                    self._hashed_chunk += 1
+                self._cond.notify_all()
+            offset += length
+            view = view[length:]
+
+    def read(self, begin, length):
+        """Mengembalikan byte [begin, begin+length) untuk Drive; chunk sebelum `begin` dilepas."""
+        end = min(begin + length, self.total_size)
+        first = begin // self.chunk_size
+        with self._cond:
+            if first < self._base_chunk:
+                raise IOError(f"Offset {begin} sudah dilepas dari ring buffer.")
+            # Drive sudah mengonfirmasi semua byte sebelum `begin`: slot-nya boleh dipakai ulang
+            while self._base_chunk < first and self._base_chunk < self._hashed_chunk:
+                self._filled[self._base_chunk % self.slots] = 0
+                self._base_chunk += 1
+            self._cond.notify_all()
+
+            parts = []
+            position = begin
+            while position < end:
+                index = position // self.chunk_size
+                while not self._is_complete(index) and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise self._error
+                inner = position - index * self.chunk_size
+                take = min(end - position, self._chunk_length(index) - inner)
+                parts.append(bytes(self._buffers[index % self.slots][inner:inner + take]))
+                position += take
+            return b"".join(parts)
+
+    def fail(self, error):
+        """Menghentikan semua penulis/pembaca yang sedang menunggu dengan error."""
+        with self._cond:
+            if self._error is None:
+                self._error = error
+            self._cond.notify_all()
+
+    def md5_hexdigest(self):
+        with self._cond:
+            if self._hashed_chunk * self.chunk_size < self.total_size:
+                return None
+            return self._md5.hexdigest()
+
+class DriveStreamUpload(MediaUpload):
+    """MediaUpload yang mengambil chunk dari ChunkRing, bukan dari file di disk."""
+
+    def __init__(self, ring, mimetype):
+        self._ring = ring
+        self._mimetype = mimetype
+        self._chunksize = ring.chunk_size
+        # Satu request tidak boleh meminta lebih banyak byte daripada yang muat di jendela ring
+        self.max_chunksize = ring.chunk_size * (ring.slots - 1)
+
+    def chunksize(self):
+        return self._chunksize
+
+    def set_chunksize(self, size):
+        self._chunksize = size
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._ring.total_size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def getbytes(self, begin, length):
+        return self._ring.read(begin, length)
+
+def upload_stream_to_drive(drive_service, ring, filename, source_url=None):
+    """Upload resumable yang membaca dari ChunkRing selagi download masih berjalan."""
+    MIME_TYPE, _ = mimetypes.guess_type(filename)
+    if not MIME_TYPE: MIME_TYPE = 'application/octet-stream'
+
+    def build_request():
+        target_folder_id = get_or_create_folder(drive_service, DRIVE_UPLOAD_FOLDER_NAME)
+        file_metadata = {'name': filename, 'parents': [target_folder_id]}
+        media = DriveStreamUpload(ring, MIME_TYPE)
+        return drive_service.files().create(body=file_metadata, media_body=media, fields='id,webViewLink,webContentLink,md5Checksum')
+
+    try:
+        response = _execute_resumable_upload(build_request(), filename, ring.total_size)
+    except DriveFolderMissing as e:
+        # Sesi belum dibuat, jadi belum ada byte yang diambil dari ring: aman diulang
+        print(f"♻️ {e} Cache folder di-refresh.")
+        invalidate_folder_cache(DRIVE_UPLOAD_FOLDER_NAME)
+        response = _execute_resumable_upload(build_request(), filename, ring.total_size)
+    source = {'url': source_url, 'size': ring.total_size}
+    return _finalize_drive_upload(drive_service, response, filename, ring.md5_hexdigest(), source)
+
+class DriveStreamTarget:
+    """
+    Target untuk DownloaderBot (atribut stream_target): chunk yang selesai diunduh
+    langsung dikirim ke sesi resumable Drive dari thread terpisah. Satu DownloaderBot.run
+    bisa membuka target beberapa kali (cache resolver, resolver HTTP, kandidat Selenium);
+    setiap open() memulai percobaan baru dan membuang percobaan sebelumnya.
+    """
+
+    def __init__(self, drive_service, source_url=None):
+        self.drive_service = drive_service
+        self.source_url = source_url
+        self.ring = None
+        self.completed = False
+        self.succeeded = False
+        self._thread = None
+        self._error = None
+        self._lock = threading.Lock()
+
+    def open(self, filename, total_size):
+        ring = ChunkRing(total_size)
+        with self._lock:
+            if self.ring is not None:
+                # Thread percobaan lama berhenti sendiri karena ring-nya gagal; hasilnya tidak dipakai lagi
+                self.ring.fail(IOError("Percobaan streaming sebelumnya dibatalkan."))
+            self.ring = ring
+            self.completed = False
+            self.succeeded = False
+            self._error = None
+        self._thread = threading.Thread(target=self._upload_worker, args=(ring, filename), name="drive-stream", daemon=True)
+        self._thread.start()
+
+    def _upload_worker(self, ring, filename):
+        try:
+            succeeded = upload_stream_to_drive(self.drive_service, ring, filename, self.source_url)
+            error = None
+        except Exception as e:
+            succeeded, error = False, e
+            ring.fail(e)
+        with self._lock:
+            if ring is self.ring:
+                self.succeeded, self._error = succeeded, error
+
+    def write(self, data, offset):
+        self.ring.write(data, offset)
+
+    def abort(self, error):
+        if self.ring:
+            self.ring.fail(error)
+
+    def finish(self):
+        """Menunggu upload percobaan terakhir selesai; melempar error jika upload gagal."""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        self.completed = True
+        return self.succeeded
+
 # =========================================================
 # 4. MAIN EXECUTION
 # =========================================================
@@ -269,7 +915,7 @@ def main():
         drive_service = authenticate_google_drive()
         
         # 2. Upload (termasuk verifikasi MD5 dan setel publik)
-        success = upload_file_to_drive(drive_service, DOWNLOADED_FILE)
+        success = upload_file_to_drive(drive_service, DOWNLOADED_FILE, load_file_info(DOWNLOADED_FILE))
         
         if not success:
             sys.exit(1)
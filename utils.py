@@ -1,15 +1,10 @@
 import os
-import subprocess
 import requests
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 #import undetected_chromedriver as uc # PENTING!
-from webdriver_manager.chrome import ChromeDriverManager # <-- Diperlukan lagi
-from selenium_stealth import stealth
 import time
 import json
 import re
@@ -18,31 +13,301 @@ import shutil
 import glob
 import math
 import sys
-from urllib.parse import urlparse, urlunparse, urlencode, parse_qs
+import hashlib
+import mimetypes
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from aria2_rpc import get_aria2_daemon, count_completed_pieces, Aria2Error
+from browser_pool import get_browser_pool
+from resolver_cache import get_resolver_cache
+from resolvers import resolve_mediafire, resolve_gofile, ResolverError
+from mega_client import MegaClient, MegaError
+from notifier import get_notifier, ProgressThrottle, TELEGRAM_API_BASE
+from result_store import get_result_store, matches_content
+from telemetry import get_telemetry
+from urllib.parse import urlparse, urlunparse, urlencode, parse_qs, unquote
+
+# =========================================================
+# KONFIGURASI ENGINE DOWNLOAD
+# =========================================================
+
+# Engine utama: "native" (range paralel di dalam proses) atau "aria2c"
+DOWNLOAD_ENGINE = os.environ.get("DOWNLOAD_ENGINE", "native").lower()
+DOWNLOAD_CONNECTIONS = int(os.environ.get("DOWNLOAD_CONNECTIONS", "16"))
+DOWNLOAD_SEGMENT_SIZE = int(os.environ.get("DOWNLOAD_SEGMENT_SIZE", str(8 * 1024 * 1024)))
+DOWNLOAD_MIN_SEGMENT_SIZE = 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_SEGMENT_RETRIES = 5
+# Status HTTP sementara (selain 5xx) yang diulang dengan backoff, bukan langsung menggagalkan download
+DOWNLOAD_RETRYABLE_STATUS = (408, 429)
+DOWNLOAD_MAX_RETRY_AFTER = 60
+# Transfer dianggap macet jika tidak ada byte baru selama N detik (bukan batas waktu total)
+DOWNLOAD_STALL_TIMEOUT = int(os.environ.get("DOWNLOAD_STALL_TIMEOUT", "60"))
+DOWNLOAD_READ_TIMEOUT = 30
+# Multi-mirror (SourceForge): jumlah byte uji per mirror, jumlah mirror terpakai, ambang mirror lambat
+MIRROR_PROBE_BYTES = 256 * 1024
+MIRROR_PROBE_TIMEOUT = 8
+MIRROR_COUNT = int(os.environ.get("MIRROR_COUNT", "4"))
+MIRROR_MAX_FAILURES = 3
+MIRROR_SLOW_RATIO = 0.25
+MIRROR_MIN_SAMPLE_BYTES = 4 * 1024 * 1024
+# Basis API Pixeldrain (bisa diarahkan ke server pengganti lokal untuk benchmark)
+PIXELDRAIN_BASE_URL = os.environ.get("PIXELDRAIN_BASE_URL", "https://pixeldrain.com").rstrip("/")
+HTTP_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """Mengembalikan requests.Session bersama (keep-alive) dengan pool koneksi yang cukup besar."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(DOWNLOAD_CONNECTIONS * 2, 32))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": HTTP_USER_AGENT})
+            _http_session = session
+        return _http_session
+
+def _check_download_status(response, partial):
+    """
+    Memeriksa status respons download. 5xx/408/429 dilempar sebagai HTTPError (diulang
+    pemanggil); 4xx lain dan 200 untuk permintaan Range (server mengabaikan Range) dilempar
+    sebagai IOError yang langsung menggagalkan engine.
+    """
+    status = response.status_code
+    if (status == 206) if partial else (200 <= status < 300):
+        return
+    if status >= 500 or status in DOWNLOAD_RETRYABLE_STATUS:
+        raise requests.exceptions.HTTPError(f"Status sementara {status} dari server.", response=response)
+    if status >= 400:
+        raise IOError(f"Server menolak permintaan (status {status}).")
+    raise IOError(f"Server mengabaikan header Range (status {status}).")
+
+def _retry_delay(attempt, error):
+    """Backoff eksponensial; Retry-After dari respons 429/503 dihormati (maksimal DOWNLOAD_MAX_RETRY_AFTER)."""
+    delay = min(2 ** attempt, 30)
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+    if retry_after.isdigit():
+        delay = max(delay, min(int(retry_after), DOWNLOAD_MAX_RETRY_AFTER))
+    return delay
+
+class _TransferProgress:
+    """Penghitung byte thread-safe untuk engine download native."""
+
+    def __init__(self, total_size):
+        self.total_size = total_size
+        self.downloaded = 0
+        self.started_at = time.time()
+        self.last_progress_at = self.started_at
+        # Penulis yang sedang menunggu ruang di ring buffer (mode pipeline) tidak dihitung macet
+        self.waiting_writers = 0
+        self._lock = threading.Lock()
+
+    def add(self, nbytes):
+        with self._lock:
+            self.downloaded += nbytes
+            self.last_progress_at = time.time()
+
+    def wait_started(self):
+        with self._lock:
+            self.waiting_writers += 1
+
+    def wait_finished(self):
+        with self._lock:
+            self.waiting_writers -= 1
+            self.last_progress_at = time.time()
+
+    def idle_seconds(self):
+        """Detik tanpa byte baru; selama ada penulis yang menunggu uploader, dihitung nol."""
+        with self._lock:
+            now = time.time()
+            if self.waiting_writers:
+                self.last_progress_at = now
+            return now - self.last_progress_at
+
+    def average_speed(self):
+        return self.downloaded / max(time.time() - self.started_at, 1e-6)
+
+class _MirrorPool:
+    """
+    Mirror aktif untuk satu transfer. Segmen dibagi ke mirror dengan koneksi paling
+    sedikit; mirror yang berulang kali gagal atau jauh lebih lambat dari mirror
+    tercepat dikeluarkan di tengah transfer (minimal satu mirror selalu tersisa).
+    """
+
+    def __init__(self, urls):
+        self._active = list(urls)
+        self._stats = {url: {'bytes': 0, 'seconds': 0.0, 'connections': 0, 'failures': 0} for url in urls}
+        self._lock = threading.Lock()
+
+    def _speed(self, url):
+        stats = self._stats[url]
+        return stats['bytes'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+
+    def acquire(self, avoid=None):
+        with self._lock:
+            candidates = [url for url in self._active if url != avoid] or list(self._active)
+            url = min(candidates, key=lambda u: (self._stats[u]['connections'], -self._speed(u)))
+            self._stats[url]['connections'] += 1
+            return url
+
+    def release(self, url):
+        with self._lock:
+            self._stats[url]['connections'] -= 1
+
+    def record(self, url, nbytes, seconds):
+        with self._lock:
+            self._stats[url]['bytes'] += nbytes
+            self._stats[url]['seconds'] += seconds
+
+    def is_active(self, url):
+        with self._lock:
+            return url in self._active
+
+    def report_failure(self, url):
+        with self._lock:
+            self._stats[url]['failures'] += 1
+            if self._stats[url]['failures'] >= MIRROR_MAX_FAILURES and url in self._active and len(self._active) > 1:
+                self._active.remove(url)
+                print(f"⚠️ Mirror dikeluarkan (gagal berulang): {urlparse(url).netloc}")
+
+    def drop_slow(self):
+        """Mengeluarkan mirror yang kecepatan per koneksinya < MIRROR_SLOW_RATIO x mirror tercepat."""
+        with self._lock:
+            measured = [u for u in self._active if self._stats[u]['bytes'] >= MIRROR_MIN_SAMPLE_BYTES]
+            if len(measured) < 2:
+                return
+            best = max(self._speed(u) for u in measured)
+            for url in measured:
+                if len(self._active) > 1 and self._speed(url) < best * MIRROR_SLOW_RATIO:
+                    self._active.remove(url)
+                    print(f"⚠️ Mirror dikeluarkan (lambat): {urlparse(url).netloc}")
+
+HASH_READ_SIZE = 8 * 1024 * 1024
+
+class _OrderedHasher:
+    """
+    Menghitung MD5 secara berurutan selagi segmen paralel berdatangan.
+    Byte yang tiba tepat di kursor di-hash langsung dari memori; byte yang tiba
+    lebih awal dicatat, lalu dibaca ulang dari file (masih di page cache) dengan
+    buffer besar yang dipakai ulang begitu kursor mencapainya.
+    """
+
+    def __init__(self):
+        self.cursor = 0
+        self._md5 = hashlib.md5()
+        self._pending = {}  # offset awal -> offset akhir (eksklusif) yang sudah ditulis
+        self._lock = threading.Lock()
+        self._buffer = None
+
+    def feed(self, data, offset):
+        with self._lock:
+            if offset == self.cursor:
+                self._md5.update(data)
+                self.cursor += len(data)
+            else:
+                self._pending[offset] = offset + len(data)
+
+    def advance(self, fd):
+        """Meng-hash ulang dari disk semua rentang yang sudah bersambung dengan kursor."""
+        if self._buffer is None:
+            self._buffer = bytearray(HASH_READ_SIZE)
+        view = memoryview(self._buffer)
+        while True:
+            with self._lock:
+                end = self._pending.pop(self.cursor, None)
+                if end is None:
+                    return
+                position = self.cursor
+            # Aman di luar lock: tidak ada worker yang menulis di [position, end) lagi
+            while position < end:
+                nbytes = os.preadv(fd, [view[:min(HASH_READ_SIZE, end - position)]], position)
+                if nbytes <= 0:
+                    raise IOError(f"Gagal membaca ulang offset {position} untuk MD5.")
+                self._md5.update(view[:nbytes])
+                position += nbytes
+            with self._lock:
+                self.cursor = end
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
 # =========================================================
 # CLASS UTAMA: DownloaderBot
 # =========================================================
 
+def send_telegram_message(message_text):
+    """Mengirim pesan ke chat pemilik lewat notifier bersama; mengembalikan handle PendingMessage."""
+    notifier = get_notifier(os.environ.get("BOT_TOKEN"))
+    chat_id = os.environ.get("PAYLOAD_SENDER") or os.environ.get("OWNER_ID")
+    if not notifier or not chat_id:
+        print("Peringatan: BOT_TOKEN atau OWNER_ID tidak diatur. Notifikasi Telegram dinonaktifkan.")
+        return None
+    return notifier.send(chat_id, message_text)
+
+def edit_telegram_message(message_id, message_text):
+    """Mengedit pesan (handle PendingMessage atau message_id) tanpa memblokir pemanggil."""
+    notifier = get_notifier(os.environ.get("BOT_TOKEN"))
+    chat_id = os.environ.get("PAYLOAD_SENDER") or os.environ.get("OWNER_ID")
+    if notifier and chat_id and message_id:
+        notifier.edit(chat_id, message_id, message_text)
+
+def _filename_from_headers(headers, url):
+    """Nama file dari header Content-Disposition (filename* atau filename), fallback ke path URL."""
+    file_name = None
+    cd_header = headers.get('Content-Disposition')
+    if cd_header:
+        fname_match = re.search(r'filename\*\s*=\s*["\']?(?:[\w-]+\'[^\']*\')?([^"\';]+)', cd_header, re.I) \
+            or re.search(r'filename\s*=\s*["\']?([^"\';]+)', cd_header, re.I)
+        if fname_match:
+            file_name = unquote(fname_match.group(1).strip())
+            file_name = re.sub(r'[^\x00-\x7F]+', '', file_name)
+    if not file_name:
+        file_name = unquote(urlparse(url).path.split('/')[-1])
+    return os.path.basename(file_name.replace('\\', '/')) or None
+
 class DownloaderBot:
     """
     Mengelola seluruh proses download dari berbagai sumber, termasuk
-    interaksi Selenium/Headless Browser dan integrasi Aria2c/Megatools.
+    interaksi Selenium/Headless Browser, engine download native, dan integrasi Aria2c/MEGA.
     """
     
-    def __init__(self, url):
+    def __init__(self, url, output_dir=None):
         # --- KONFIGURASI DAN STATE ---
         self.url = url
+        # Direktori hasil unduhan (mode batch: satu direktori per job); None = direktori kerja
+        self.output_dir = output_dir
         self.bot_token = os.environ.get("BOT_TOKEN")
         self.owner_id = os.environ.get("PAYLOAD_SENDER")
         # Tentukan directory untuk download sementara
         self.temp_download_dir = tempfile.mkdtemp()
         self.initial_message_id = None
         self.driver = None
+        # Opsional: target pipeline (mis. upload.DriveStreamTarget) untuk engine native
+        self.stream_target = None
+        # Info file hasil engine native (nama, ukuran, MD5, MIME) untuk diteruskan ke uploader
+        self.file_info = None
+        # Hasil probe metadata per URL (lihat _probe_url)
+        self._probe_results = {}
+        # Header tambahan untuk request ke URL langsung job ini (mis. cookie Gofile dari resolver);
+        # tidak dipasang di session bersama karena session dipakai job lain secara paralel
+        self.request_headers = {}
+        # Tujuan upload (gdrive/telegram) untuk result store; cache_hit=True jika dijawab dari hasil lama
+        self.destination = os.environ.get("PAYLOAD_MODE")
+        self.cache_hit = False
         
     def __del__(self):
-        # Pastikan driver dihentikan dan folder temp dihapus saat objek dihancurkan
-        if self.driver:
-            self.driver.quit()
+        # Pastikan driver dikembalikan ke pool dan folder temp dihapus saat objek dihancurkan
+        self._release_selenium_driver()
         shutil.rmtree(self.temp_download_dir, ignore_errors=True)
         
     # =========================================================
@@ -58,201 +323,681 @@ class DownloaderBot:
         return f"{s} {size_name[i]}"
 
     def _send_telegram_message(self, message_text):
-        """Mengirim pesan dan menyimpan message_id ke self.initial_message_id."""
-        if not self.bot_token or not self.owner_id:
+        """Menjadwalkan pesan baru (non-blocking) dan menyimpan handle-nya ke self.initial_message_id."""
+        notifier = get_notifier(self.bot_token)
+        if not notifier or not self.owner_id:
             print("Peringatan: Notifikasi Telegram dinonaktifkan.")
             return None
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        payload = {"chat_id": self.owner_id, "text": message_text, "parse_mode": "Markdown"}
-        try:
-            response = requests.post(url, json=payload, timeout=10)
-            response_json = response.json()
-            self.initial_message_id = response_json.get('result', {}).get('message_id')
-            return self.initial_message_id
-        except Exception as e:
-            print(f"Gagal mengirim pesan Telegram: {e}")
-            return None
+        self.initial_message_id = notifier.send(self.owner_id, message_text)
+        return self.initial_message_id
             
     def _edit_telegram_message(self, message_text):
-        """Mengedit pesan yang sudah ada (menggunakan self.initial_message_id)."""
-        if not self.bot_token or not self.owner_id or not self.initial_message_id:
+        """Mengedit pesan yang sudah ada (self.initial_message_id); edit beruntun digabung oleh notifier."""
+        notifier = get_notifier(self.bot_token)
+        if not notifier or not self.owner_id or not self.initial_message_id:
             return
-        url = f"https://api.telegram.org/bot{self.bot_token}/editMessageText"
-        payload = {"chat_id": self.owner_id, "message_id": self.initial_message_id, 
-                   "text": message_text, "parse_mode": "Markdown"}
-        try:
-            requests.post(url, json=payload, timeout=10)
-        except Exception as e:
-            pass 
+        notifier.edit(self.owner_id, self.initial_message_id, message_text)
 
-    def _get_total_file_size_safe(self, url):
-        """Mendapatkan ukuran file total dari URL dengan aman."""
-        try:
-            response = requests.head(url, allow_redirects=True, timeout=10)
-            response.raise_for_status()
-            content_length = response.headers.get('Content-Length')
-            if content_length: return int(content_length)
-        except requests.exceptions.RequestException:
-            pass 
-        try:
-            with requests.get(url, stream=True, timeout=30) as r:
-                r.raise_for_status()
-                if 'Content-Length' in r.headers:
-                    return int(r.headers['Content-Length'])
-        except requests.exceptions.RequestException:
-            pass
-        return None
+    def _probe_url(self, url):
+        """
+        Probe metadata tunggal: satu GET 'Range: bytes=0-0' lewat session bersama
+        (keep-alive) mengembalikan ukuran, nama file (Content-Disposition atau path URL),
+        ETag, Last-Modified, dukungan Range, dan URL akhir setelah redirect.
+        Hasil disimpan per URL sehingga resolver dan engine download tidak mengulang
+        request yang sama. Mengembalikan dict atau None jika URL gagal.
+        """
+        if url in self._probe_results:
+            return self._probe_results[url]
+        session = get_http_session()
+        headers = {**self.request_headers, 'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'}
+        with get_telemetry().phase("probe", host=urlparse(url).netloc) as span:
+            try:
+                with session.get(url, headers=headers, stream=True, allow_redirects=True, timeout=(10, DOWNLOAD_READ_TIMEOUT)) as r:
+                    r.raise_for_status()
+                    size, accepts_ranges = None, False
+                    if r.status_code == 206:
+                        total_match = re.search(r'/(\d+)\s*$', r.headers.get('Content-Range', ''))
+                        if total_match:
+                            size, accepts_ranges = int(total_match.group(1)), True
+                    if size is None and r.headers.get('Content-Length'):
+                        size = int(r.headers['Content-Length'])
+                    probe = {
+                        'url': r.url,
+                        'size': size,
+                        'accepts_ranges': accepts_ranges,
+                        'filename': _filename_from_headers(r.headers, r.url),
+                        'content_type': r.headers.get('Content-Type', '').split(';')[0].strip() or None,
+                        'etag': r.headers.get('ETag'),
+                        'last_modified': r.headers.get('Last-Modified'),
+                    }
+            except (requests.exceptions.RequestException, ValueError) as e:
+                span.fail(e)
+                return None
+        self._probe_results[url] = probe
+        return probe
 
     def _extract_filename_from_url_or_header(self, download_url):
-        """Mendapatkan nama file dari header Content-Disposition atau fallback ke path URL."""
-        file_name = None
-        try:
-            head_response = requests.head(download_url, allow_redirects=True, timeout=10)
-            head_response.raise_for_status()
-            
-            cd_header = head_response.headers.get('Content-Disposition')
-            if cd_header:
-                # Mencari filename* atau filename sederhana
-                fname_match = re.search(r'filename\*?=["\']?(?:utf-8\'\')?([^"\';]+)["\']?', cd_header, re.I)
-                if fname_match:
-                    file_name = fname_match.group(1).strip()
-                    file_name = re.sub(r'[^\x00-\x7F]+', '', file_name)
-            
-            if not file_name:
-                url_path = urlparse(download_url).path
-                file_name = url_path.split('/')[-1]
-            
-        except requests.exceptions.RequestException:
-            url_path = urlparse(download_url).path
-            file_name = url_path.split('/')[-1]
-            
-        return file_name if file_name else "unknown_file"
+        """Mendapatkan nama file dari hasil probe (Content-Disposition) atau fallback ke path URL."""
+        probe = self._probe_url(download_url)
+        if probe and probe['filename']:
+            return probe['filename']
+        return urlparse(download_url).path.split('/')[-1] or "unknown_file"
+
+    def _race_mirrors(self, urls):
+        """
+        Menguji semua mirror secara bersamaan dengan membaca MIRROR_PROBE_BYTES pertama,
+        lalu mengembalikan mirror yang melayani Range, diurutkan dari yang tercepat.
+        Setiap hasil: {'url' (setelah redirect), 'speed', 'size', 'content_type', 'etag'}.
+        """
+        session = get_http_session()
+        headers = {**self.request_headers, 'Range': f'bytes=0-{MIRROR_PROBE_BYTES - 1}', 'Accept-Encoding': 'identity'}
+
+        def probe(url):
+            started = time.time()
+            try:
+                with session.get(url, headers=headers, stream=True, allow_redirects=True, timeout=(5, MIRROR_PROBE_TIMEOUT)) as r:
+                    if r.status_code != 206:
+                        return None
+                    total_match = re.search(r'/(\d+)\s*$', r.headers.get('Content-Range', ''))
+                    if not total_match:
+                        return None
+                    received = 0
+                    for chunk in r.iter_content(chunk_size=64 * 1024):
+                        received += len(chunk)
+                        if time.time() - started > MIRROR_PROBE_TIMEOUT:
+                            break
+                    return {
+                        'url': r.url,
+                        'speed': received / max(time.time() - started, 1e-6),
+                        'size': int(total_match.group(1)),
+                        'content_type': r.headers.get('Content-Type', '').split(';')[0].strip() or None,
+                        'etag': r.headers.get('ETag'),
+                    }
+            except requests.exceptions.RequestException:
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(len(urls), 32), thread_name_prefix="mirror-probe") as pool:
+            results = [result for result in pool.map(probe, urls) if result]
+        if not results:
+            return []
+        results.sort(key=lambda item: item['speed'], reverse=True)
+        # Mirror dengan ukuran berbeda dari mirror tercepat dianggap menyajikan file lain
+        return [item for item in results if item['size'] == results[0]['size']]
 
 
     # =========================================================
-    # --- 2. METODE DOWNLOAD INTI (ARIA2C & MEGATOOLS) ---
+    # --- 2. METODE DOWNLOAD INTI (NATIVE, ARIA2C & MEGA) ---
     # =========================================================
 
-    def _download_file_with_aria2c(self, urls, output_filename):
-        """Mengunduh file menggunakan aria2c dengan progress update."""
-        print(f"Memulai unduhan {output_filename} dengan aria2c.")
-        total_size = None
-        command = ['aria2c', '--allow-overwrite', '--file-allocation=none', '--console-log-level=warn', 
-                   '--summary-interval=0', '-x', '16', '-s', '16', '-c', '--async-dns=false', 
-                   '--log-level=warn', '--continue', '--input-file', '-', '-o', output_filename]
-        
-        process = None
+    def _output_path(self, filename):
+        """Path tujuan file hasil unduhan (di dalam output_dir jika diatur)."""
+        if not self.output_dir:
+            return filename
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, filename)
+
+    def _download_file(self, urls, output_filename, remember=True):
+        """
+        Memilih engine download sesuai DOWNLOAD_ENGINE, dengan aria2c sebagai fallback.
+        Hasil resolusi (URL langsung) yang berhasil diunduh disimpan di cache resolver
+        (kecuali remember=False, mis. saat URL-nya memang berasal dari cache).
+        """
+        # Resolusi sudah selesai: driver Chrome langsung kembali ke pool untuk job lain
+        self._release_selenium_driver()
+        output_path = self._output_path(output_filename)
+        downloaded = None
+        if DOWNLOAD_ENGINE != "aria2c":
+            downloaded = self._run_engine("native", self._download_file_with_native, urls, output_path)
+            if not downloaded and shutil.which('aria2c'):
+                print("⚠️ Engine native gagal. Mencoba ulang dengan aria2c...")
+                downloaded = self._run_engine("aria2c", self._download_file_with_aria2c, urls, output_path)
+        else:
+            downloaded = self._run_engine("aria2c", self._download_file_with_aria2c, urls, output_path)
+
+        if downloaded and remember:
+            file_info = self.file_info or {}
+            get_resolver_cache().put(self.url, urls, output_filename, file_info.get('size'), file_info.get('etag'))
+        return downloaded
+
+    def _run_engine(self, engine, method, *args):
+        """Menjalankan satu engine download di dalam fase telemetri 'download' (byte dari file_info)."""
+        with get_telemetry().phase("download", engine=engine) as span:
+            downloaded = method(*args)
+            if downloaded:
+                span.bytes = (self.file_info or {}).get('size')
+            else:
+                span.fail(f"engine {engine} tidak menghasilkan file")
+            return downloaded
+
+    def _download_from_resolver_cache(self):
+        """
+        Memakai URL langsung dari cache resolver jika masih valid: dicek dengan probe
+        metadata (status, ukuran, ETag) yang hasilnya dipakai ulang oleh engine download.
+        Entri yang tidak cocok dihapus agar resolusi penuh berjalan.
+        """
+        cache = get_resolver_cache()
+        entry = cache.get(self.url)
+        if not entry:
+            return None
+        probe = self._probe_url(entry['urls'][0])
+        reason = None
+        if probe is None:
+            reason = "URL tidak dapat dijangkau"
+        elif entry.get('size') and probe['size'] and probe['size'] != entry['size']:
+            reason = "ukuran berubah"
+        elif entry.get('etag') and probe['etag'] and probe['etag'] != entry['etag']:
+            reason = "ETag berubah"
+        if reason:
+            print(f"♻️ Cache resolver tidak valid ({reason}). Menjalankan resolusi penuh.")
+            cache.invalidate(self.url)
+            return None
+
+        print(f"⚡ Cache resolver cocok: `{entry['filename']}` (tanpa resolusi ulang).")
+        self._edit_telegram_message(f"⚡ **Link langsung dari cache.**\nFile: `{entry['filename']}`")
+        downloaded_filename = self._download_file(entry['urls'], entry['filename'], remember=False)
+        if not downloaded_filename:
+            cache.invalidate(self.url)
+        return downloaded_filename
+
+    def _answer_from_result_store(self):
+        """
+        Menjawab permintaan dari hasil upload sebelumnya (file_id Telegram atau link Drive)
+        tanpa download ulang. Entri hanya dipakai jika identitas konten sumber saat ini
+        (ukuran/ETag) bisa dipastikan dan cocok; file_id/link yang ditolak membuat entri dihapus.
+        """
+        if self.destination not in ("telegram", "gdrive"):
+            return False
+        store = get_result_store()
+        entry = store.get(self.url, self.destination)
+        if not entry:
+            return False
+
+        identity = self._current_content_identity()
+        size, etag = identity or (None, None)
+        if not ((entry.get('size') and size) or (entry.get('etag') and etag)):
+            print("ℹ️ Identitas konten sumber tidak bisa dipastikan. Result store dilewati.")
+            return False
+        if not matches_content(entry, size, etag):
+            print("♻️ Hasil tersimpan tidak cocok dengan konten sumber saat ini. Memproses ulang.")
+            store.invalidate(self.url, self.destination)
+            return False
+
+        payload = entry['payload']
+        session = get_http_session()
         try:
-            self._send_telegram_message(f"⬇️ Download dimulai: `{output_filename}`")
-            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            
-            for url in urls:
-                total_size = self._get_total_file_size_safe(url)
-                if total_size is not None:
-                    process.stdin.write(url + '\n')
+            if self.destination == "telegram":
+                for document in payload['documents']:
+                    response = session.post(
+                        f"{TELEGRAM_API_BASE}/bot{self.bot_token}/sendDocument",
+                        json={"chat_id": self.owner_id, "document": document['file_id'],
+                              "caption": document.get('caption', ''), "parse_mode": "Markdown"},
+                        timeout=30,
+                    )
+                    if not response.json().get('ok'):
+                        raise ValueError(response.json().get('description', 'file_id ditolak'))
+            else:
+                response = session.get(payload['view_link'], timeout=10)
+                if response.status_code >= 400:
+                    raise ValueError(f"link Drive membalas HTTP {response.status_code}")
+                self._edit_telegram_message(
+                    f"⚡ **File ini sudah pernah diunggah.**\n\n"
+                    f"File: `{payload.get('name')}`\n"
+                    f"Link Drive: [Lihat File]({payload['view_link']})\n"
+                    f"Link Download Langsung: `{payload.get('content_link') or 'N/A'}`"
+                )
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"♻️ Hasil tersimpan tidak bisa dipakai ({e}). Memproses ulang.")
+            store.invalidate(self.url, self.destination)
+            return False
+
+        print(f"⚡ Result store cocok ({self.destination}): permintaan dijawab tanpa download.")
+        get_telemetry().emit("result_store_hit", destination=self.destination)
+        if self.destination == "telegram":
+            self._edit_telegram_message("⚡ **File ini sudah pernah diunggah.** Dikirim ulang dari cache.")
+        self.cache_hit = True
+        return True
+
+    def _pixeldrain_file_id(self):
+        file_id_match = re.search(r'pixeldrain\.com/(u|l|f)/([a-zA-Z0-9]+)', self.url)
+        if not file_id_match: raise ValueError("URL Pixeldrain tidak valid.")
+        return file_id_match.group(2)
+
+    def _current_content_identity(self):
+        """
+        (ukuran, ETag) konten sumber saat ini lewat jalur murah tanpa Selenium: URL dari
+        cache resolver, API Pixeldrain/MEGA, atau resolver HTTP MediaFire/Gofile, lalu probe.
+        Hasil None jika host hanya bisa di-resolve dengan browser atau resolusi gagal.
+        """
+        urls, size = None, None
+        cached = get_resolver_cache().get(self.url)
+        try:
+            if cached:
+                urls = cached['urls']
+            elif "mega.nz" in self.url:
+                return MegaClient(get_http_session()).file_info(self.url)['size'], None
+            elif "pixeldrain" in self.url:
+                file_id = self._pixeldrain_file_id()
+                info_resp = get_http_session().get(f"{PIXELDRAIN_BASE_URL}/api/file/{file_id}/info", timeout=10)
+                info_resp.raise_for_status()
+                size = info_resp.json().get('size')
+                urls = [f"{PIXELDRAIN_BASE_URL}/api/file/{file_id}?download"]
+            elif "mediafire" in self.url:
+                urls = resolve_mediafire(get_http_session(), self.url)['urls']
+            elif "gofile" in self.url:
+                # Download Gofile butuh cookie akun tamu; ukuran dari API sudah cukup sebagai identitas
+                return resolve_gofile(get_http_session(), self.url)['size'], None
+            else:
+                return None
+        except (requests.exceptions.RequestException, ValueError, KeyError, ResolverError, MegaError) as e:
+            print(f"⚠️ Gagal memeriksa konten sumber untuk result store ({e}).")
+            return None
+        probe = self._probe_url(urls[0])
+        if probe is None:
+            return (size, None) if size else None
+        return probe['size'] or size, probe['etag']
+
+    def _download_with_http_resolver(self):
+        """
+        Jalur cepat tanpa browser untuk MediaFire dan Gofile: link langsung di-resolve
+        lewat HTTP biasa. Mengembalikan None jika host tidak didukung atau resolver gagal,
+        sehingga pemanggil bisa fallback ke jalur Selenium.
+        """
+        if "mediafire" in self.url:
+            resolver, host_name = resolve_mediafire, "MediaFire"
+        elif "gofile" in self.url:
+            resolver, host_name = resolve_gofile, "Gofile"
+        else:
+            return None
+
+        with get_telemetry().phase("resolve", method="http", host=host_name) as span:
+            try:
+                resolved = resolver(get_http_session(), self.url)
+            except (requests.exceptions.RequestException, ValueError, ResolverError) as e:
+                span.fail(e)
+                print(f"⚠️ Resolver HTTP {host_name} gagal ({e}). Fallback ke Selenium.")
+                return None
+
+        print(f"⚡ Resolver HTTP {host_name}: {resolved['urls'][0]}")
+        self._edit_telegram_message(f"⬇️ **Memulai unduhan...**\nFile: `{resolved['filename']}`")
+        # URL yang butuh header sesi (token tamu Gofile) tidak berguna untuk job lain: jangan di-cache
+        self.request_headers = resolved.get('headers') or {}
+        downloaded_filename = self._download_file(resolved['urls'], resolved['filename'], remember=not self.request_headers)
+        if downloaded_filename:
+            self._edit_telegram_message(f"✅ **{host_name}: Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
+        return downloaded_filename
+
+    def _download_file_with_native(self, urls, output_filename):
+        """
+        Engine download native: mengambil byte range secara paralel dari thread pool
+        melalui requests.Session bersama, dan menulis tiap segmen langsung ke
+        offset-nya di file yang sudah dialokasikan. Selesai/gagal ditentukan dari
+        kemajuan transfer (deteksi macet), bukan batas waktu total.
+        """
+        print(f"Memulai unduhan {output_filename} dengan engine native.")
+        mirror_urls, total_size, accepts_ranges, content_type, etag = [], None, False, None, None
+        if len(urls) > 1:
+            ranked = self._race_mirrors(urls)
+            if ranked:
+                mirror_urls = [item['url'] for item in ranked[:MIRROR_COUNT]]
+                total_size, accepts_ranges, content_type, etag = ranked[0]['size'], True, ranked[0]['content_type'], ranked[0]['etag']
+                summary = ", ".join(f"{urlparse(item['url']).netloc} ({self._human_readable_size(item['speed'])}/s)" for item in ranked[:MIRROR_COUNT])
+                print(f"🏁 {len(ranked)}/{len(urls)} mirror merespons. Dipakai: {summary}")
+        if not mirror_urls:
+            for candidate in urls:
+                probe = self._probe_url(candidate)
+                if probe is not None:
+                    # Segmen langsung ke target redirect akhir, tanpa redirect ulang per koneksi
+                    mirror_urls = [probe['url']]
+                    total_size, accepts_ranges, content_type, etag = probe['size'], probe['accepts_ranges'], probe['content_type'], probe['etag']
                     break
-            process.stdin.close()
-            
-            start_time = time.time()
-            timeout = 300
-            last_notified_percent = 0
-            
-            while time.time() - start_time < timeout:
+        if not mirror_urls:
+            print("❌ Engine native: tidak ada URL yang dapat dijangkau.")
+            return None
+        mirrors = _MirrorPool(mirror_urls)
+
+        segments = []
+        segment_size = None
+        if accepts_ranges and total_size:
+            segment_size = max(DOWNLOAD_MIN_SEGMENT_SIZE, min(DOWNLOAD_SEGMENT_SIZE, math.ceil(total_size / DOWNLOAD_CONNECTIONS)))
+            segments = [(start, min(start + segment_size, total_size) - 1) for start in range(0, total_size, segment_size)]
+
+        # Mode pipeline: byte diteruskan ke stream_target (mis. sesi upload Drive), tanpa file di disk
+        stream_target = self.stream_target if total_size else None
+        progress = _TransferProgress(total_size)
+        fd = None
+        if stream_target:
+            print("🔀 Mode pipeline aktif: chunk langsung diteruskan ke uploader.")
+            stream_target.open(os.path.basename(output_filename), total_size)
+
+            def write_at(data, offset):
+                # Waktu menunggu jendela ring (retry/backoff chunk Drive) bukan tanda transfer macet
+                progress.wait_started()
+                try:
+                    stream_target.write(data, offset)
+                finally:
+                    progress.wait_finished()
+        else:
+            fd = os.open(output_filename, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            write_at = lambda data, offset: os.pwrite(fd, data, offset)
+
+        # MD5 dihitung selagi byte berdatangan (mode pipeline: dihitung oleh ring buffer)
+        hasher = _OrderedHasher() if fd is not None else None
+        abort_event = threading.Event()
+        try:
+            if fd is not None and total_size:
+                try:
+                    os.posix_fallocate(fd, 0, total_size)
+                except (AttributeError, OSError):
+                    os.ftruncate(fd, total_size)
+
+            self._send_telegram_message(f"⬇️ Download dimulai: `{output_filename}`")
+
+            if not segments:
+                print("ℹ️ Server tidak mendukung Range. Mengunduh dengan satu koneksi.")
+            workers = min(DOWNLOAD_CONNECTIONS, len(segments)) if segments else 1
+            ring = getattr(stream_target, 'ring', None)
+            if ring is not None and segment_size:
+                # Worker di luar jendela ring hanya akan menunggu (dan menahan koneksi mirror)
+                workers = max(1, min(workers, ring.slots * ring.chunk_size // segment_size))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dl-native") as pool:
+                if segments:
+                    work_queue = queue.Queue()
+                    for segment in segments:
+                        work_queue.put(segment)
+                    futures = [pool.submit(self._native_segment_worker, mirrors, write_at, hasher, work_queue, progress, abort_event)
+                               for _ in range(workers)]
+                else:
+                    futures = [pool.submit(self._native_stream_worker, mirror_urls[0], write_at, hasher, progress, abort_event)]
+
+                def on_tick():
+                    mirrors.drop_slow()
+                    if hasher:
+                        hasher.advance(fd)
+
+                try:
+                    self._monitor_native_transfer(futures, progress, abort_event, output_filename, on_tick=on_tick)
+                except Exception as e:
+                    # Bangunkan worker yang mungkin sedang menunggu ruang di ring buffer
+                    abort_event.set()
+                    if stream_target:
+                        stream_target.abort(e)
+                    raise
+
+            if total_size is not None and progress.downloaded != total_size:
+                raise IOError(f"Ukuran tidak cocok: {progress.downloaded} dari {total_size} byte.")
+            if fd is not None and total_size is None:
+                os.ftruncate(fd, progress.downloaded)
+            local_md5 = None
+            if hasher:
+                hasher.advance(fd)
+                if hasher.cursor == progress.downloaded:
+                    local_md5 = hasher.hexdigest()
+            if stream_target:
+                stream_target.finish()
+                local_md5 = stream_target.ring.md5_hexdigest()
+        except Exception as e:
+            abort_event.set()
+            if stream_target:
+                stream_target.abort(e)
+            if fd is not None:
+                os.close(fd)
                 if os.path.exists(output_filename):
-                    current_size = os.path.getsize(output_filename)
-                    if total_size is not None and total_size > 0:
-                        percent_now = int(current_size * 100 // total_size)
-                        
-                        should_update_50 = (percent_now >= 50 and last_notified_percent < 50)
-                        should_update_100 = (percent_now >= 100)
-
-                        if should_update_50 or should_update_100:
-                            self._edit_telegram_message(f"⬇️ Download `{output_filename}` — {percent_now}% ({self._human_readable_size(current_size)}/{self._human_readable_size(total_size)})")
-                            last_notified_percent = percent_now
-                            
-                    if (total_size is not None and current_size >= total_size):
-                        if process.poll() is None:
-                            process.terminate()
-                            time.sleep(2)
-                            if process.poll() is None: process.kill()
-                        return output_filename
-                        
-                if process.poll() is not None:
-                    if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
-                        if total_size is None or os.path.getsize(output_filename) > total_size:
-                            total_size = os.path.getsize(output_filename)
-                        self._edit_telegram_message(f"✅ Download Selesai. `{output_filename}` ({self._human_readable_size(total_size)})")
-                        return output_filename
-                    
-                    return None
-                    
-                time.sleep(3)
-            
-            if process and process.poll() is None:
-                process.terminate()
+                    os.remove(output_filename)
+            print(f"❌ Engine native gagal: {e}")
+            return None
+
+        if fd is not None:
+            os.close(fd)
+        mime_type, _ = mimetypes.guess_type(output_filename)
+        self.file_info = {
+            'filename': output_filename,
+            'size': progress.downloaded,
+            'md5': local_md5,
+            'mime_type': mime_type or content_type or 'application/octet-stream',
+            'etag': etag,
+        }
+        elapsed = time.time() - progress.started_at
+        print(f"✅ {output_filename}: {progress.downloaded} byte dalam {elapsed:.1f} detik ({self._human_readable_size(progress.average_speed())}/s).")
+        self._edit_telegram_message(f"✅ Download Selesai. `{output_filename}` ({self._human_readable_size(progress.downloaded)}, rata-rata {self._human_readable_size(progress.average_speed())}/s)")
+        return output_filename
+
+    def _native_segment_worker(self, mirrors, write_at, hasher, work_queue, progress, abort_event):
+        """Mengambil segmen dari antrean dan mengunduhnya hingga antrean kosong."""
+        while not abort_event.is_set():
+            try:
+                start, end = work_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._native_fetch_range(mirrors, write_at, hasher, start, end, progress, abort_event)
+
+    def _native_fetch_range(self, mirrors, write_at, hasher, start, end, progress, abort_event):
+        """
+        Mengunduh byte [start, end] ke offset yang sama dari salah satu mirror.
+        Retry (atau mirror yang dikeluarkan di tengah jalan) melanjutkan dari posisi
+        terakhir, sebisa mungkin di mirror lain.
+        """
+        session = get_http_session()
+        position = start
+        attempt = 0
+        failed_mirror = None
+        while position <= end and not abort_event.is_set():
+            written_before = position
+            url = mirrors.acquire(avoid=failed_mirror)
+            try:
+                headers = {**self.request_headers, 'Range': f'bytes={position}-{end}', 'Accept-Encoding': 'identity'}
+                with session.get(url, headers=headers, stream=True, timeout=(10, DOWNLOAD_READ_TIMEOUT)) as r:
+                    _check_download_status(r, partial=True)
+                    last_read = time.time()
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if abort_event.is_set():
+                            return
+                        if not chunk:
+                            continue
+                        chunk = chunk[:end - position + 1]
+                        # Kecepatan mirror hanya dari waktu baca jaringan, tanpa waktu menunggu penulis
+                        mirrors.record(url, len(chunk), time.time() - last_read)
+                        write_at(chunk, position)
+                        if hasher:
+                            hasher.feed(chunk, position)
+                        position += len(chunk)
+                        progress.add(len(chunk))
+                        last_read = time.time()
+                        if position > end or not mirrors.is_active(url):
+                            break
+                if position <= end:
+                    if not mirrors.is_active(url):
+                        # Mirror dikeluarkan karena lambat: lanjutkan sisa segmen di mirror lain
+                        failed_mirror = url
+                        continue
+                    raise requests.exceptions.ChunkedEncodingError("Koneksi segmen terputus sebelum selesai.")
+            except requests.exceptions.RequestException as e:
+                mirrors.report_failure(url)
+                failed_mirror = url
+                # Hitungan retry hanya naik jika percobaan ini tidak menghasilkan byte sama sekali
+                attempt = attempt + 1 if position == written_before else 1
+                if attempt > DOWNLOAD_SEGMENT_RETRIES:
+                    raise IOError(f"Segmen {start}-{end} gagal setelah {DOWNLOAD_SEGMENT_RETRIES} percobaan: {e}")
+                get_telemetry().retry("download", attempt, e, segment=f"{start}-{end}", mirror=urlparse(url).netloc)
+                time.sleep(_retry_delay(attempt, e))
+            finally:
+                mirrors.release(url)
+
+    def _native_stream_worker(self, url, write_at, hasher, progress, abort_event):
+        """
+        Mengunduh seluruh file dengan satu koneksi (server tanpa dukungan Range). Status
+        sementara dan koneksi putus diulang dari awal body; byte yang sudah ditulis dilewati.
+        """
+        session = get_http_session()
+        position = 0
+        attempt = 0
+        while True:
+            written_before = position
+            try:
+                with session.get(url, headers=self.request_headers, stream=True, timeout=(10, DOWNLOAD_READ_TIMEOUT)) as r:
+                    _check_download_status(r, partial=False)
+                    received = 0
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if abort_event.is_set():
+                            return
+                        skip = min(max(position - received, 0), len(chunk))
+                        received += len(chunk)
+                        chunk = chunk[skip:]
+                        if chunk:
+                            write_at(chunk, position)
+                            if hasher:
+                                hasher.feed(chunk, position)
+                            position += len(chunk)
+                            progress.add(len(chunk))
+                    expected = r.headers.get('Content-Length')
+                    if expected and expected.isdigit() and received < int(expected):
+                        raise requests.exceptions.ChunkedEncodingError("Koneksi terputus sebelum body selesai.")
+                return
+            except requests.exceptions.RequestException as e:
+                attempt = attempt + 1 if position == written_before else 1
+                if attempt > DOWNLOAD_SEGMENT_RETRIES:
+                    raise IOError(f"Download gagal setelah {DOWNLOAD_SEGMENT_RETRIES} percobaan: {e}")
+                get_telemetry().retry("download", attempt, e, mirror=urlparse(url).netloc)
+                time.sleep(_retry_delay(attempt, e))
+
+    def _monitor_native_transfer(self, futures, progress, abort_event, output_filename, on_tick=None):
+        """
+        Memantau worker: melempar error pertama dari worker, dan membatalkan transfer
+        hanya jika tidak ada byte baru selama DOWNLOAD_STALL_TIMEOUT detik.
+        on_tick dipanggil tiap detik (mis. memajukan hash MD5 berurutan).
+        """
+        throttle = ProgressThrottle()
+        meter = get_telemetry().transfer("download", progress.total_size)
+        while True:
+            done, pending = wait(futures, timeout=1)
+            for future in done:
+                if future.exception():
+                    abort_event.set()
+                    raise future.exception()
+            if not pending:
+                return
+            if on_tick:
+                on_tick()
+            meter.update(progress.downloaded)
+
+            if progress.idle_seconds() > DOWNLOAD_STALL_TIMEOUT:
+                abort_event.set()
+                raise TimeoutError(f"Transfer macet: tidak ada data baru selama {DOWNLOAD_STALL_TIMEOUT} detik.")
+
+            if progress.total_size:
+                percent_now = int(progress.downloaded * 100 // progress.total_size)
+                if throttle.due(percent_now):
+                    self._edit_telegram_message(
+                        f"⬇️ Download `{output_filename}` — {percent_now}% "
+                        f"({self._human_readable_size(progress.downloaded)}/{self._human_readable_size(progress.total_size)}, "
+                        f"{self._human_readable_size(progress.average_speed())}/s)"
+                    )
+
+    def _download_file_with_aria2c(self, urls, output_filename):
+        """
+        Mengunduh file dengan daemon aria2c yang dikendalikan lewat JSON-RPC.
+        Progres, kecepatan, koneksi, dan status piece dibaca dari tellStatus;
+        selesai/gagal ditentukan oleh status aria2 sendiri, bukan ukuran file di disk.
+        """
+        print(f"Memulai unduhan {output_filename} dengan aria2c (RPC).")
+        gid = None
+        # Pakai target redirect akhir dari probe metadata jika URL sudah pernah di-probe
+        urls = [self._probe_results[url]['url'] if self._probe_results.get(url) else url for url in urls]
+        try:
+            aria2 = get_aria2_daemon()
+            directory = os.path.dirname(os.path.abspath(output_filename))
+            gid = aria2.add_uri(urls, directory, os.path.basename(output_filename), self.request_headers)
+            self._send_telegram_message(f"⬇️ Download dimulai: `{output_filename}`")
+
+            throttle = ProgressThrottle()
+            meter = get_telemetry().transfer("download")
+            last_completed = -1
+            last_progress_at = time.time()
+            while True:
+                status = aria2.tell_status(gid)
+                state = status.get('status')
+                total_size = int(status.get('totalLength') or 0)
+                completed = int(status.get('completedLength') or 0)
+
+                if state == 'complete':
+                    aria2.remove(gid)
+                    mime_type, _ = mimetypes.guess_type(output_filename)
+                    self.file_info = {
+                        'filename': output_filename,
+                        'size': completed,
+                        'md5': None,
+                        'mime_type': mime_type or 'application/octet-stream',
+                    }
+                    self._edit_telegram_message(f"✅ Download Selesai. `{output_filename}` ({self._human_readable_size(completed)})")
+                    return output_filename
+                if state in ('error', 'removed'):
+                    raise Aria2Error(f"aria2c gagal (kode {status.get('errorCode')}): {status.get('errorMessage')}")
+
+                meter.total = total_size or None
+                meter.update(completed)
+                if completed != last_completed:
+                    last_completed = completed
+                    last_progress_at = time.time()
+                elif time.time() - last_progress_at > DOWNLOAD_STALL_TIMEOUT:
+                    raise TimeoutError(f"Transfer aria2c macet: tidak ada data baru selama {DOWNLOAD_STALL_TIMEOUT} detik.")
+
+                if total_size > 0:
+                    percent_now = int(completed * 100 // total_size)
+                    if throttle.due(percent_now):
+                        pieces = f"{count_completed_pieces(status.get('bitfield'))}/{status.get('numPieces')}"
+                        self._edit_telegram_message(
+                            f"⬇️ Download `{output_filename}` — {percent_now}% "
+                            f"({self._human_readable_size(completed)}/{self._human_readable_size(total_size)}, "
+                            f"{self._human_readable_size(int(status.get('downloadSpeed') or 0))}/s, "
+                            f"{status.get('connections')} koneksi, piece {pieces})"
+                        )
                 time.sleep(1)
-                process.kill()
-                
+
         except Exception as e:
-            if process and process.poll() is None:
-                process.terminate()
-                time.sleep(1)
-                process.kill()
-                
-        return None
+            print(f"❌ aria2c gagal: {e}")
+            if gid:
+                aria2.remove(gid)
+            return None
 
-    def _download_file_with_megatools(self, url):
-        """Mengunduh file dari MEGA dengan megatools."""
-        print(f"Mengunduh file dari MEGA dengan megatools: {url}")
-        original_cwd = os.getcwd()
-        temp_dir = tempfile.mkdtemp()
-        filename = None
-        self._send_telegram_message("⬇️ **Mulai mengunduh...**\n`megatools` sedang mengunduh file.")
-        
+    def _download_file_with_mega(self, url):
+        """Mengunduh file dari MEGA dengan klien native (range paralel + dekripsi di process pool)."""
+        print(f"Mengunduh file dari MEGA (klien native): {url}")
+        self._send_telegram_message("⬇️ **Mulai mengunduh...**\nMengambil informasi file dari MEGA.")
+        output_filename = None
         try:
-            os.chdir(temp_dir)
-            process = subprocess.Popen(['megatools', 'dl', url], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            last_notified_percent = 0
-            progress_regex = re.compile(r'(\d+\.\d+)%\s+of\s+.*\((\d+\.\d+)\s*(\wB)\)')
-            
-            while True:
-                line = process.stdout.readline()
-                if not line: break
-                
-                match = progress_regex.search(line)
-                if match:
-                    percent_now = math.floor(float(match.group(1)))
-                    current_size_str = match.group(2)
-                    current_unit = match.group(3)
-                    
-                    if percent_now >= 50 and last_notified_percent < 50 or percent_now == 100:
-                        last_notified_percent = percent_now
-                        progress_message = f"⬇️ **Mulai mengunduh...**\nUkuran file: `{current_size_str} {current_unit}`\n\nProgres: `{percent_now}%`"
-                        self._edit_telegram_message(progress_message)
-                        
-            process.wait()
-            if process.returncode != 0:
-                error_output = process.stderr.read()
-                raise subprocess.CalledProcessError(process.returncode, process.args, stderr=error_output)
-                
-            downloaded_files = os.listdir('.')
-            downloaded_files = [f for f in downloaded_files if not f.endswith('.megatools')]
-            
-            if len(downloaded_files) == 1:
-                filename = downloaded_files[0]
-                self._edit_telegram_message(f"✅ **MEGA: Unduhan selesai!**\nFile: `{filename}`\n\n**➡️ Mulai UPLOADING...**")
-                return filename
-            else:
-                return None
+            client = MegaClient(get_http_session())
+            with get_telemetry().phase("resolve", method="api", host="MEGA"):
+                info = client.file_info(url)
+            output_filename = self._output_path(info['filename'])
+            throttle = ProgressThrottle()
+            meter = get_telemetry().transfer("download", info['size'])
+            started = time.time()
+
+            def report(downloaded, total):
+                meter.update(downloaded)
+                percent_now = math.floor(downloaded * 100 / total) if total else 100
+                # Notifier berjalan di background: thread segmen tidak pernah menunggu jaringan
+                if throttle.due(percent_now):
+                    self._edit_telegram_message(
+                        f"⬇️ **Mulai mengunduh...**\nFile: `{info['filename']}`\n"
+                        f"Ukuran file: `{self._human_readable_size(total)}`\n\nProgres: `{percent_now}%`"
+                    )
+
+            client.download(info, output_filename, progress=report)
+            elapsed = max(time.time() - started, 1e-6)
+            print(f"✅ {output_filename}: {info['size']} byte dalam {elapsed:.1f} detik ({self._human_readable_size(info['size'] / elapsed)}/s), MAC MEGA cocok.")
+            mime_type, _ = mimetypes.guess_type(output_filename)
+            self.file_info = {
+                'filename': output_filename,
+                'size': info['size'],
+                'md5': None,
+                'mime_type': mime_type or 'application/octet-stream',
+            }
+            self._edit_telegram_message(f"✅ **MEGA: Unduhan selesai!**\nFile: `{info['filename']}`\n\n**➡️ Mulai UPLOADING...**")
+            return output_filename
         except Exception as e:
-            self._edit_telegram_message(f"❌ **`megatools` gagal mengunduh file.**\n\nDetail: {str(e)[:200]}...")
+            print(f"❌ Download MEGA gagal: {e}")
+            self._edit_telegram_message(f"❌ **Download MEGA gagal.**\n\nDetail: {str(e)[:200]}...")
             return None
-        finally:
-            os.chdir(original_cwd)
-            if filename and os.path.exists(os.path.join(temp_dir, filename)):
-                shutil.move(os.path.join(temp_dir, filename), os.path.join(original_cwd, filename))
-            shutil.rmtree(temp_dir, ignore_errors=True)
 
     # =========================================================
     # --- 3. METODE SELENIUM ---
@@ -260,53 +1005,24 @@ class DownloaderBot:
 
     def _initialize_selenium_driver(self):
         """
-        Menginisialisasi dan mengkonfigurasi Chrome Driver (Headless) 
-        menggunakan selenium-stealth untuk menghindari deteksi bot.
-        Mengaktifkan Performance Logging untuk CDP Network Events.
+        Meminjam Chrome headless (sudah stealth, dengan Performance Logging CDP) dari
+        pool browser bersama, dengan direktori download milik job ini.
         """
-        
-        chrome_prefs = {
-            "download.default_directory": self.temp_download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True,
-        }
-        
-        options = webdriver.ChromeOptions()
-        
-        # Tambahkan preferensi untuk download
-        options.add_experimental_option("prefs", chrome_prefs)
-        
-        # Opsi Headless dan anti-sandbox
-        options.add_argument('--headless=new')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-blink-features=AutomationControlled') # Tambahan stealth
-
-        # AKTIFKAN PERFORMANCE LOGGING (CDP)
-        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'}) 
-        
-        try:
-            # 1. Inisialisasi Driver Standar
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=options)
-            
-            # 2. Terapkan Lapisan Stealth (PENTING!)
-            stealth(self.driver,
-                    languages=["en-US", "en"],
-                    vendor="Google Inc.",
-                    platform="Win32",
-                    webgl_vendor="Intel Inc.",
-                    renderer="Intel Iris OpenGL Engine",
-                    fix_hairline=True,
-                    )
-            
-            self.driver.set_page_load_timeout(60) 
-            
-            return True
-        except Exception as e:
-            print(f"❌ Gagal inisialisasi Selenium Driver: {e}")
-            return False
+        with get_telemetry().phase("browser_acquire") as span:
+            try:
+                self.driver = get_browser_pool().acquire(self.temp_download_dir)
+                return True
+            except Exception as e:
+                span.fail(e)
+                print(f"❌ Gagal inisialisasi Selenium Driver: {e}")
+                return False
+
+    def _release_selenium_driver(self):
+        """Mengembalikan driver ke pool (profil dan direktori download direset di sana)."""
+        if self.driver:
+            get_browser_pool().release(self.driver)
+            self.driver = None
+
     def _process_selenium_download(self):
         """
         Menangani Gofile, Mediafire, dan AGGRESIVE CLICKING.
@@ -344,16 +1060,16 @@ class DownloaderBot:
 
                 file_name = self._extract_filename_from_url_or_header(final_download_url)
                 
-                self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{file_name}`")
-                downloaded_filename = self._download_file_with_aria2c([final_download_url], file_name)
+                self._edit_telegram_message(f"⬇️ **Memulai unduhan...**\nFile: `{file_name}`")
+                downloaded_filename = self._download_file([final_download_url], file_name)
                 
                 if downloaded_filename:
                     self._edit_telegram_message(f"✅ **MediaFire: Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
                     return downloaded_filename
                 else:
-                    raise Exception("Aria2c gagal mengunduh file.")
+                    raise Exception("Engine download gagal mengunduh file.")
             except Exception as e:
-                raise Exception(f"Gagal saat ekstraksi link atau pemanggilan Aria2c: {e}")
+                raise Exception(f"Gagal saat ekstraksi link atau proses unduhan: {e}")
             
         # --- LOGIKA GOFILE ATAU LOGIKA AGGRESIF UMUM ---
         # (Implementasi logika agresif di sini, untuk situs yang tidak spesifik)
@@ -431,9 +1147,9 @@ class DownloaderBot:
             
             if final_files_list:
                 latest_file_path = max([os.path.join(self.temp_download_dir, f) for f in final_files_list], key=os.path.getctime)
-                downloaded_filename = os.path.basename(latest_file_path)
+                downloaded_filename = self._output_path(os.path.basename(latest_file_path))
                 
-                shutil.move(latest_file_path, os.path.join(os.getcwd(), downloaded_filename))
+                shutil.move(latest_file_path, downloaded_filename)
                 
                 file_size = os.path.getsize(downloaded_filename)
                 self._edit_telegram_message(f"✅ **Unduhan selesai!**\nFile: `{downloaded_filename}` ({self._human_readable_size(file_size)})\n\n**➡️ Mulai UPLOADING...**")
@@ -446,7 +1162,7 @@ class DownloaderBot:
 
 
     def _process_sourceforge_download(self):
-        """Menangani SourceForge: Mendapatkan mirror URL dan memanggil aria2c."""
+        """Menangani SourceForge: Mendapatkan mirror URL dan memanggil engine download."""
         
         def source_url(download_url):
             parsed_url = urlparse(download_url)
@@ -487,8 +1203,8 @@ class DownloaderBot:
         
         download_urls = [set_url(ahref, 'use_mirror', mirror_id) for mirror_id in li_id]
         
-        self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{aname}`")
-        downloaded_filename = self._download_file_with_aria2c(download_urls, aname)
+        self._edit_telegram_message(f"⬇️ **Memulai unduhan...**\nFile: `{aname}`\nMenguji {len(download_urls)} mirror secara bersamaan...")
+        downloaded_filename = self._download_file(download_urls, aname)
         
         if downloaded_filename:
             self._edit_telegram_message(f"✅ **SourceForge: Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
@@ -587,64 +1303,82 @@ class DownloaderBot:
         except Exception as e:
             raise Exception(f"Gagal saat ekstraksi link dari Network Log: {e}")
         
-        # 3. PANGGIL ARIA2C
+        # 3. PANGGIL ENGINE DOWNLOAD
         file_name = self._extract_filename_from_url_or_header(final_download_url)
         
-        self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{file_name}`")
-        downloaded_filename = self._download_file_with_aria2c([final_download_url], file_name)
+        self._edit_telegram_message(f"⬇️ **Memulai unduhan...**\nFile: `{file_name}`")
+        downloaded_filename = self._download_file([final_download_url], file_name)
         
         if downloaded_filename:
             self._edit_telegram_message(f"✅ **[Apk Admin Mode] Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
             return downloaded_filename
         else:
-            raise Exception("Aria2c gagal mengunduh file.")
+            raise Exception("Engine download gagal mengunduh file.")
     # =========================================================
     # --- 4. MAIN ORCHESTRATOR (run) ---
     # =========================================================
 
     def run(self):
         """Titik masuk utama. Memproses URL dan mengarahkan ke handler yang tepat."""
+        get_telemetry().set_context(url=self.url)
         self._send_telegram_message(f"⏳ **Menganalisis URL...**\nURL: `{self.url}`")
         downloaded_filename = None
         
         try:
+            # 0a. RESULT STORE: file yang sama sudah pernah diunggah ke tujuan ini
+            if self._answer_from_result_store():
+                return None
+
+            # 0b. CACHE RESOLVER: halaman yang sama baru saja di-resolve
+            downloaded_filename = self._download_from_resolver_cache()
+            if downloaded_filename:
+                return downloaded_filename
+
             # 1. LOGIKA UTAMA (MEGA, PIXELDRAIN)
             if "mega.nz" in self.url:
-                downloaded_filename = self._download_file_with_megatools(self.url)
+                downloaded_filename = self._run_engine("mega", self._download_file_with_mega, self.url)
             
             elif "pixeldrain" in self.url:
-                file_id_match = re.search(r'pixeldrain\.com/(u|l|f)/([a-zA-Z0-9]+)', self.url)
-                if not file_id_match: raise ValueError("URL Pixeldrain tidak valid.")
-                file_id = file_id_match.group(2)
-                info_url = f"https://pixeldrain.com/api/file/{file_id}/info"
+                file_id = self._pixeldrain_file_id()
+                info_url = f"{PIXELDRAIN_BASE_URL}/api/file/{file_id}/info"
                 
                 self._edit_telegram_message(f"🔍 **Mendapatkan informasi file dari Pixeldrain...** ID: `{file_id}`")
                 
-                info_resp = requests.get(info_url, timeout=10)
-                info_resp.raise_for_status()
-                file_info = info_resp.json()
+                with get_telemetry().phase("resolve", method="api", host="Pixeldrain"):
+                    info_resp = get_http_session().get(info_url, timeout=10)
+                    info_resp.raise_for_status()
+                    file_info = info_resp.json()
 
                 filename = file_info.get('name', f"pixeldrain_download_{file_id}")
-                download_url = f"https://pixeldrain.com/api/file/{file_id}?download"
+                download_url = f"{PIXELDRAIN_BASE_URL}/api/file/{file_id}?download"
                 
-                self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{filename}`")
-                downloaded_filename = self._download_file_with_aria2c([download_url], filename)
+                self._edit_telegram_message(f"⬇️ **Memulai unduhan...**\nFile: `{filename}`")
+                downloaded_filename = self._download_file([download_url], filename)
                 
                 if downloaded_filename:
                     self._edit_telegram_message(f"✅ **Pixeldrain: Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
             
             # 2. LOGIKA SELENIUM
             elif "sourceforge" in self.url or "gofile" in self.url or "mediafire" in self.url or "apkadmin" in self.url or "http" in self.url:
-                
+
+                # Jalur cepat HTTP (MediaFire/Gofile); Selenium hanya jika gagal
+                downloaded_filename = self._download_with_http_resolver()
+                if downloaded_filename:
+                    return downloaded_filename
+
                 if not self._initialize_selenium_driver(): 
                     raise Exception("Gagal inisialisasi driver Selenium.")
                 
-                if "sourceforge" in self.url:
-                    downloaded_filename = self._process_sourceforge_download()
-                elif "apkadmin" in self.url:
-                     downloaded_filename = self._process_apkadmin_download()
-                else:
-                    downloaded_filename = self._process_selenium_download()
+                # Fase 'selenium' mencakup resolusi di browser dan fase 'download' di dalamnya
+                with get_telemetry().phase("selenium", host=urlparse(self.url).netloc) as span:
+                    if "sourceforge" in self.url:
+                        downloaded_filename = self._process_sourceforge_download()
+                    elif "apkadmin" in self.url:
+                         downloaded_filename = self._process_apkadmin_download()
+                    else:
+                        downloaded_filename = self._process_selenium_download()
+                    if not downloaded_filename:
+                        span.fail("resolusi Selenium tidak menghasilkan file")
             
             else:
                 raise ValueError("URL tidak dikenali atau tidak didukung.")
@@ -659,5 +1393,5 @@ class DownloaderBot:
             return None
             
         finally:
-            # Cleanup otomatis oleh __del__
-            pass
+            # Driver langsung kembali ke pool; folder temp dibersihkan oleh __del__
+            self._release_selenium_driver()
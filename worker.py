@@ -0,0 +1,390 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from resolver_cache import CACHE_DIR, normalize_page_url
+
+# =========================================================
+# KONFIGURASI EXECUTOR LOKAL
+# =========================================================
+# Alternatif repository_dispatch: bot menaruh job di antrean SQLite dan process pool
+# yang tetap hidup menjalankan DownloaderBot + uploader langsung, tanpa runner baru.
+
+WORKER_DB = os.environ.get("WORKER_DB", os.path.join(CACHE_DIR, "jobs.sqlite"))
+# Jumlah job yang berjalan bersamaan (satu proses per job)
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "2"))
+WORKER_JOBS_DIR = os.environ.get("WORKER_JOBS_DIR", "worker_jobs")
+# Tujuan jika permintaan tidak menyebut mode ('telegram' atau 'gdrive')
+WORKER_DEFAULT_MODE = os.environ.get("WORKER_DEFAULT_MODE", "telegram")
+# Simpan direktori kerja job setelah selesai (untuk debugging)
+WORKER_KEEP_FILES = os.environ.get("WORKER_KEEP_FILES") == "1"
+WORKER_POLL_INTERVAL = 2.0
+# Job yang terputus (proses mati) dicoba lagi paling banyak sekian kali
+WORKER_MAX_ATTEMPTS = 2
+
+# =========================================================
+# ANTREAN JOB DAN PENYIMPANAN TOKEN (SQLITE)
+# =========================================================
+
+class JobQueue:
+    """
+    Antrean job yang tahan restart: status queued -> running -> ok/cached/failed. Job yang
+    masih 'running' saat bot mati dikembalikan ke antrean oleh recover() saat start.
+    Permintaan untuk URL (dinormalkan) dan mode yang sama dengan job yang masih antre atau
+    berjalan tidak membuat job baru: pengirimnya dicatat sebagai pelanggan job tersebut.
+    Refresh token Drive disimpan di tabel terpisah (pengganti variabel GitHub per pengguna).
+    """
+
+    def __init__(self, path=WORKER_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, sender TEXT NOT NULL,"
+                " mode TEXT, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT, result TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, url_key TEXT)"
+            )
+            # Database dari versi tanpa penggabungan job
+            if "url_key" not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN url_key TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_url_key ON jobs (url_key, mode, status)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS subscribers ("
+                " job_id INTEGER NOT NULL, sender TEXT NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (job_id, sender))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                " sender TEXT PRIMARY KEY, refresh_token TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def enqueue(self, url, sender, mode=None):
+        """
+        Menambah job, atau menggabungkan ke job aktif dengan URL dan mode yang sama.
+        Hasil: (ID job, True jika digabung ke job yang sudah ada).
+        """
+        now = time.time()
+        url_key = normalize_page_url(url)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, sender FROM jobs WHERE url_key = ? AND mode IS ? AND status IN ('queued', 'running')"
+                " ORDER BY id LIMIT 1", (url_key, mode),
+            ).fetchone()
+            if row is not None:
+                if row["sender"] != str(sender):
+                    conn.execute("INSERT OR IGNORE INTO subscribers (job_id, sender, created_at) VALUES (?, ?, ?)",
+                                 (row["id"], str(sender), now))
+                conn.commit()
+                return row["id"], True
+            cursor = conn.execute(
+                "INSERT INTO jobs (url, url_key, sender, mode, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (url, url_key, str(sender), mode, now, now),
+            )
+            conn.commit()
+            return cursor.lastrowid, False
+
+    def subscribers(self, job_id):
+        """Pengirim lain yang menunggu hasil job ini (urut waktu bergabung)."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT sender FROM subscribers WHERE job_id = ? ORDER BY created_at", (job_id,)
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def claim(self):
+        """Mengambil job 'queued' tertua dan menandainya 'running' (atomik), atau None jika antrean kosong."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                         (time.time(), row["id"]))
+            conn.commit()
+            return dict(row, status="running", attempts=row["attempts"] + 1)
+
+    def finish(self, job_id, status, error=None, result=None):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE jobs SET status = ?, error = ?, result = ?, updated_at = ? WHERE id = ?",
+                         (status, error, json.dumps(result) if result is not None else None, time.time(), job_id))
+            conn.commit()
+
+    def recover(self, max_attempts=WORKER_MAX_ATTEMPTS):
+        """Job 'running' dari proses sebelumnya: antre ulang, atau gagal jika percobaan sudah habis. Hasil: jumlah job diantre ulang."""
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = 'failed', error = 'Terputus saat bot berhenti.', updated_at = ?"
+                         " WHERE status = 'running' AND attempts >= ?", (now, max_attempts))
+            requeued = conn.execute("UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+                                    (now,)).rowcount
+            conn.commit()
+            return requeued
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+
+    def position(self, job_id):
+        """Jumlah job 'queued' di depan job ini (0 = berikutnya dijalankan)."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)
+            ).fetchone()[0]
+
+    def recent(self, sender, limit=5):
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT * FROM jobs WHERE sender = ? OR id IN (SELECT job_id FROM subscribers WHERE sender = ?)"
+                " ORDER BY id DESC LIMIT ?", (str(sender), str(sender), limit)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    def set_refresh_token(self, sender, refresh_token):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO tokens (sender, refresh_token, updated_at) VALUES (?, ?, ?)",
+                         (str(sender), refresh_token, time.time()))
+            conn.commit()
+
+    def get_refresh_token(self, sender):
+        """Refresh token Drive milik pengirim; pemilik bot memakai DRIVE_REFRESH_TOKEN dari env jika belum /auth."""
+        with self._lock:
+            row = self._connect().execute("SELECT refresh_token FROM tokens WHERE sender = ?", (str(sender),)).fetchone()
+        if row:
+            return row[0]
+        if str(sender) == os.environ.get("OWNER_ID"):
+            return os.environ.get("DRIVE_REFRESH_TOKEN")
+        return None
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Mengembalikan antrean job bersama untuk proses ini."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+# =========================================================
+# EKSEKUSI JOB (DI DALAM PROCESS POOL)
+# =========================================================
+
+def _init_worker_process(cache_dir, telemetry_file):
+    """
+    Initializer proses pool: path cache dan telemetri dibuat absolut sebelum modul repo
+    di-import (job berjalan dengan chdir ke direktori kerjanya), lalu modul berat
+    dimuat sekali untuk semua job berikutnya di proses ini.
+    """
+    os.environ["SONTO_CACHE_DIR"] = cache_dir
+    os.environ["TELEMETRY_FILE"] = telemetry_file
+    if not os.environ.get("GOOGLE_CLIENT_ID") and os.environ.get("CLIENT_ID"):
+        os.environ["GOOGLE_CLIENT_ID"] = os.environ["CLIENT_ID"]
+        os.environ["GOOGLE_CLIENT_SECRET"] = os.environ.get("CLIENT_SECRET", "")
+    import utils, upload, telegram_upload  # noqa: F401
+
+def _delivery_payload(url, mode):
+    """Hasil yang bisa diteruskan ke pelanggan job (file_id Telegram atau link Drive) dari result store."""
+    from result_store import get_result_store
+    if mode not in ("telegram", "gdrive"):
+        return None
+    entry = get_result_store().get(url, mode)
+    return entry["payload"] if entry else None
+
+def _run_pipeline(job, refresh_token):
+    """Urutan yang sama dengan workflow: main.py (download), lalu telegram_upload.py atau upload.py."""
+    import upload
+    import telegram_upload
+    from utils import DownloaderBot
+    from main import write_download_markers, DRIVE_STREAM
+    from telemetry import get_telemetry
+
+    url, mode = job["url"], job["mode"]
+    downloader = DownloaderBot(url)
+    drive_service = None
+    if mode == "gdrive":
+        if not refresh_token:
+            return {"status": "failed", "error": "Belum ada refresh token Drive. Jalankan /auth terlebih dulu."}
+        drive_service = upload.authenticate_google_drive()
+        if DRIVE_STREAM:
+            downloader.stream_target = upload.DriveStreamTarget(drive_service, source_url=url)
+
+    with get_telemetry().phase("job", url=url, job=job["id"]) as span:
+        filename = downloader.run()
+        span.fields.update(cache_hit=downloader.cache_hit)
+        if not filename and not downloader.cache_hit:
+            span.fail("download tidak menghasilkan file")
+    if downloader.cache_hit:
+        return {"status": "cached", "delivery": _delivery_payload(url, mode)}
+    if not filename:
+        return {"status": "failed", "error": "Unduhan tidak menghasilkan file."}
+    write_download_markers(downloader, filename, url)
+
+    if mode == "gdrive":
+        target = downloader.stream_target
+        if target is not None and target.completed:
+            ok = target.succeeded
+        else:
+            ok = upload.upload_file_to_drive(drive_service, filename, upload.load_file_info(filename))
+    elif mode == "telegram":
+        ok = telegram_upload.upload_large_file_with_pyrogram(filename)
+    else:
+        ok = True
+    result = {"status": "ok" if ok else "failed", "filename": filename, "size": os.path.getsize(filename)}
+    if ok:
+        result["delivery"] = _delivery_payload(url, mode)
+    else:
+        result["error"] = "Upload gagal."
+    return result
+
+def execute_job(job, refresh_token=None):
+    """
+    Dijalankan di process pool, satu job per proses pada satu waktu: env dan konstanta
+    modul per pengirim di-set ulang, lalu pipeline berjalan di direktori kerja job sendiri.
+    """
+    import upload
+    import telegram_upload
+    from telemetry import get_telemetry
+
+    sender = job["sender"]
+    os.environ.update({
+        "PAYLOAD_SENDER": sender, "OWNER_ID": sender, "PAYLOAD_MODE": job["mode"] or "",
+        "PAYLOAD_URL": job["url"], "MEDIAFIRE_PAGE_URL": job["url"], "DRIVE_REFRESH_TOKEN": refresh_token or "",
+    })
+    # upload.py dan telegram_upload.py membaca kredensial saat import
+    upload.OWNER_ID = telegram_upload.OWNER_ID = sender
+    upload.REFRESH_TOKEN = refresh_token
+    get_telemetry().set_context(job=job["id"], url=job["url"])
+
+    job_dir = os.path.abspath(os.path.join(WORKER_JOBS_DIR, f"job-{job['id']:06d}"))
+    os.makedirs(job_dir, exist_ok=True)
+    previous_dir = os.getcwd()
+    started = time.time()
+    os.chdir(job_dir)
+    try:
+        result = _run_pipeline(job, refresh_token)
+    except BaseException as e:
+        # sys.exit() dari uploader (mis. token tidak valid) tidak boleh mematikan proses pool
+        result = {"status": "failed", "error": str(e) or type(e).__name__}
+    finally:
+        os.chdir(previous_dir)
+        if not WORKER_KEEP_FILES:
+            shutil.rmtree(job_dir, ignore_errors=True)
+    result["elapsed"] = round(time.time() - started, 2)
+    return result
+
+# =========================================================
+# EXECUTOR LOKAL (DI LOOP EVENT BOT)
+# =========================================================
+
+class LocalExecutor:
+    """
+    Menjalankan job dari JobQueue di process pool yang tetap hidup selama bot berjalan.
+    Proses memakai 'spawn' agar tidak mewarisi loop dan thread bot; cache HTTP, resolver,
+    dan pool Chrome di dalamnya tetap hangat dari job ke job. on_update(job, result)
+    dipanggil (coroutine) setiap job selesai.
+    """
+
+    def __init__(self, queue=None, concurrency=WORKER_CONCURRENCY, on_update=None):
+        self.queue = queue or get_job_queue()
+        self.concurrency = max(concurrency, 1)
+        self.on_update = on_update
+        self._pool = None
+        self._wakeup = None
+        self._tasks = []
+
+    async def start(self):
+        requeued = self.queue.recover()
+        if requeued:
+            print(f"🔁 {requeued} job yang terputus dikembalikan ke antrean.")
+        self._pool = self._make_pool()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        print(f"⚙️ Executor lokal aktif: {self.concurrency} job bersamaan.")
+
+    def _make_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker_process,
+            initargs=(os.path.abspath(CACHE_DIR),
+                      os.path.abspath(os.environ.get("TELEMETRY_FILE", "telemetry.jsonl"))),
+        )
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, url, sender, mode=None):
+        """
+        Menambah job ke antrean (atau bergabung ke job aktif untuk URL yang sama).
+        Hasil: (ID job, jumlah job yang antre di depannya, True jika digabung).
+        """
+        job_id, coalesced = self.queue.enqueue(url, sender, mode or WORKER_DEFAULT_MODE)
+        if self._wakeup is not None and not coalesced:
+            self._wakeup.set()
+        return job_id, self.queue.position(job_id), coalesced
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            print(f"▶️ Job #{job['id']} mulai: {job['url']}")
+            pool = self._pool
+            try:
+                result = await loop.run_in_executor(pool, execute_job, job,
+                                                    self.queue.get_refresh_token(job["sender"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Proses pool mati (mis. kehabisan memori); job dicatat gagal, pool dibuat ulang
+                result = {"status": "failed", "error": f"Proses worker berhenti: {e}"}
+                self._replace_pool(pool)
+            self.queue.finish(job["id"], result["status"], result.get("error"), result)
+            print(f"{'❌' if result['status'] == 'failed' else '✅'} Job #{job['id']} {result['status']}")
+            if self.on_update:
+                try:
+                    await self.on_update(job, result)
+                except Exception as e:
+                    print(f"⚠️ Gagal mengirim status job #{job['id']}: {e}")
+
+    def _replace_pool(self, broken):
+        """Pool yang rusak diganti sekali saja walau beberapa job gagal bersamaan karenanya."""
+        if self._pool is broken:
+            self._pool = self._make_pool()
+            broken.shutdown(wait=False, cancel_futures=True)